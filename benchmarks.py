@@ -0,0 +1,259 @@
+"""
+[PyWaveCLI Module]
+benchmarks.py -- Micro-benchmarks for the rendering hot paths, run on synthetic scenes against a fake terminal.
+Author: FrickTown (https://github.com/FrickTown/)
+
+Usage:
+    python benchmarks.py                  Run all benchmarks and compare them to the stored baseline
+    python benchmarks.py --save           Run all benchmarks and store the results as the new baseline
+    python benchmarks.py --filter menu    Only run benchmarks whose name contains "menu"
+Benchmarks that write frames also report the writes, flushes and bytes per frame.
+Exits with status 1 if any benchmark is slower than its baseline by more than the threshold, every time it is measured
+(see CONFIRM_RUNS), or writes a frame in more writes or flushes than OUTPUT_LIMITS allows, and with status 2 if there is
+no baseline. Timings depend on the machine, so the baseline isn't part of the repository: store one with --save on each
+machine before comparing against it.
+"""
+from __future__ import annotations
+import argparse
+import io
+import json
+import math
+import os
+import sys
+import time
+import main
+import menu
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks_baseline.json")
+THRESHOLD = 0.5 # Allowed slowdown relative to the baseline, as a fraction
+CONFIRM_RUNS = 2 # Times a regressed benchmark is measured again, it only fails if it regressed in all of them
+
+# Expressions the synthetic waves cycle through, all animated by their custom variables
+EXPRESSIONS = [
+    ("amp * math.sin(x * freq + shift)", {"amp": (3, 0), "freq": (1, 0), "shift": (0, math.pi/30)}),
+    ("math.cos(x - shift) * amp", {"shift": (0, math.pi/45), "amp": (5, 0)}),
+    ("math.sin(x + math.sin(shift)) * amp * math.sin(aMod + x) * x / 4", {"shift": (0, math.pi/45), "amp": (1, 0), "aMod": (0, math.pi/30)}),
+    ("math.tan(x + shift)", {"shift": (0, math.pi/45)}),
+    ("x * x / amp - shift", {"amp": (8, 0), "shift": (0, 0.01)}),
+]
+
+class FakeStream():
+    """A stream that counts the bytes, writes and flushes sent to it, and discards them or forwards them to another stream."""
+    def __init__(self, target = None):
+        self.target = target
+        self.bytes = 0
+        self.writes = 0
+        self.flushes = 0
+
+    def write(self, text: str):
+        self.bytes += len(text.encode())
+        self.writes += 1
+        if self.target:
+            self.target.write(text)
+
+    def flush(self):
+        self.flushes += 1
+        if self.target:
+            self.target.flush()
+
+    def isatty(self) -> bool:
+        return False
+
+    def fileno(self) -> int:
+        raise io.UnsupportedOperation("FakeStream has no file descriptor")
+
+
+class FakeTerminal(main.TerminalSpace):
+    """A TerminalSpace of a fixed size that writes to a FakeStream, or another stream if given."""
+    def __init__(self, width: int, height: int, stream = None):
+        self.fakeWidth = width
+        self.fakeHeight = height
+        super().__init__(kind="xterm-256color", stream=stream or FakeStream(), force_styling=True)
+
+    @property
+    def width(self) -> int:
+        return self.fakeWidth
+
+    @property
+    def height(self) -> int:
+        return self.fakeHeight
+
+
+def createWave(term: FakeTerminal, idx: int) -> main.Wave:
+    func, variables = EXPRESSIONS[idx % len(EXPRESSIONS)]
+    customVars = {name: {"value": value + idx * 0.1, "incr": incr} for name, (value, incr) in variables.items()}
+    return main.Wave(func, term.color_rgb(80 + idx * 37 % 175, 80 + idx * 59 % 175, 80 + idx * 83 % 175), customVars)
+
+def createScene(width: int, height: int, waveCount: int, ppc: int, stream = None) -> tuple[FakeTerminal, main.Graphspace]:
+    """Create a terminal with one graphspace of the given size, holding waveCount animated waves."""
+    term = FakeTerminal(width, height, stream)
+    graphspace = main.Graphspace(term, width, height-1, 15, 10, ppc)
+    term.addGraphspace(graphspace)
+    for idx in range(waveCount):
+        wave = createWave(term, idx)
+        graphspace.waves.append(wave) # Bypass addWave, rebuilding the menu per wave makes large scenes slow to set up
+        wave.customVars.setActive(True)
+    return (term, graphspace)
+
+def createMenuScene(entryCount: int) -> tuple[FakeTerminal, main.Graphspace]:
+    """Create a scene whose root menu holds entryCount wave entries."""
+    term, graphspace = createScene(200, 60, 0, 0)
+    for idx in range(entryCount):
+        entry = menu.WaveEntry(graphspace.menu, createWave(term, idx))
+        if(graphspace.menu.activeIndex is None):
+            entry.active = True
+            graphspace.menu.activeIndex = len(graphspace.menu.menuEntries)
+        graphspace.menu.menuEntries.append(entry)
+    graphspace.menu.generateMenu()
+    return (term, graphspace)
+
+
+def benchCartesianToGraphspace():
+    term, graphspace = createScene(160, 48, 0, 0)
+    points = [(x / 7 - 15, math.sin(x / 7) * 9) for x in range(1000)]
+    def run():
+        for x, y in points:
+            graphspace.cartesianToGraphspace(x, y)
+    return run, len(points), None
+
+def benchGetY(idx: int):
+    def setup():
+        term, graphspace = createScene(80, 24, 0, 0)
+        wave = createWave(term, idx)
+        xs = [x / 31 - 15 for x in range(1000)]
+        def run():
+            for x in xs:
+                wave.getY(x)
+        return run, len(xs), None
+    return setup
+
+def benchPrintWaves(width: int, height: int, waveCount: int, ppc: int, trails: int = 0):
+    def setup():
+        term, graphspace = createScene(width, height, waveCount, ppc)
+        if(trails):
+            graphspace.toggleTrails(trails)
+            for _ in range(trails): # Fill the rings, so that every frame composites a full trail
+                graphspace.printWaves()
+                graphspace.clearBuffer()
+        def run():
+            graphspace.printWaves()
+            graphspace.clearBuffer()
+        return run, 1, None
+    return setup
+
+def benchGenerateMenu(entryCount: int):
+    def setup():
+        term, graphspace = createMenuScene(entryCount)
+        return graphspace.menu.generateMenu, 1, None
+    return setup
+
+def benchRenderMenuToFrame(entryCount: int):
+    def setup():
+        term, graphspace = createMenuScene(entryCount)
+        return (lambda: graphspace.renderMenuToFrame(graphspace.menu)), 1, None
+    return setup
+
+def benchPrintBufferToTerminal(width: int, height: int, synchronized: bool = False):
+    def setup():
+        # Forwarded to a real, line buffered file like stdout on a terminal, so that every write and flush costs what it would there
+        stream = FakeStream(open(os.devnull, "w", buffering=1))
+        term, graphspace = createScene(width, height, 4, 4, stream)
+        term.synchronizedOutput = synchronized
+        graphspace.renderFrame()
+        term.buffer = graphspace.buffer
+        return term.printBufferToTerminal, 1, stream
+    return setup
+
+BENCHMARKS = {"cartesianToGraphspace[1000 points]": benchCartesianToGraphspace}
+OUTPUT_LIMITS: dict[str, int] = {} # The most writes and flushes per frame a benchmark may make, e.g. 1 so that a frame is never shown half drawn
+MIN_REPEATS: dict[str, int] = {} # Fewer timed calls for benchmarks that take seconds per call (the default is measure's minRepeats)
+for idx, (func, _) in enumerate(EXPRESSIONS):
+    BENCHMARKS[f"getY[{func}]x1000"] = benchGetY(idx)
+for width, height in ((80, 24), (160, 48), (400, 120)):
+    for waveCount in (1, 50, 500):
+        for ppc in (0, 4, 8):
+            if waveCount * width * 2 ** ppc > 500 * 160 * 2 ** 4: continue # Skip the scenes that would take seconds per frame
+            BENCHMARKS[f"printWaves[{width}x{height} waves={waveCount} ppc={ppc}]"] = benchPrintWaves(width, height, waveCount, ppc)
+for width, height in ((160, 48), (400, 120)):
+    BENCHMARKS[f"printWaves[{width}x{height} waves=4 ppc=4 trails=64]"] = benchPrintWaves(width, height, 4, 4, 64)
+for entryCount in (10, 500, 5000):
+    BENCHMARKS[f"generateMenu[entries={entryCount}]"] = benchGenerateMenu(entryCount)
+    BENCHMARKS[f"renderMenuToFrame[entries={entryCount}]"] = benchRenderMenuToFrame(entryCount)
+MIN_REPEATS["generateMenu[entries=5000]"] = 1 # Seconds per call, since every row looks its entry up among all of them
+for width, height in ((80, 24), (160, 48), (400, 120)):
+    BENCHMARKS[f"printBufferToTerminal[{width}x{height}]"] = benchPrintBufferToTerminal(width, height)
+    BENCHMARKS[f"printBufferToTerminal[{width}x{height} synchronized]"] = benchPrintBufferToTerminal(width, height, True)
+    OUTPUT_LIMITS[f"printBufferToTerminal[{width}x{height} synchronized]"] = 1
+
+
+def measure(setup, minTime: float = 0.2, minRepeats: int = 5) -> tuple[float, tuple[float, float, float]]:
+    """Return the fastest time in seconds of one call to the benchmarked function (divided by its inner iteration count),
+    and the writes, flushes and bytes per call if it writes to a FakeStream (None otherwise)."""
+    run, iterations, stream = setup()
+    run() # Warm up caches and lazily compiled code
+    if stream:
+        stream.bytes = stream.writes = stream.flushes = 0
+    timings = []
+    started = time.perf_counter()
+    while len(timings) < minRepeats or time.perf_counter() - started < minTime:
+        if len(timings) >= 3 and time.perf_counter() - started > minTime * 10: break # Slow benchmarks settle for fewer repeats
+        callStart = time.perf_counter()
+        run()
+        timings.append((time.perf_counter() - callStart) / iterations)
+    output = (stream.writes / len(timings), stream.flushes / len(timings), stream.bytes / len(timings)) if stream else None
+    return min(timings), output # The fastest run is the least disturbed by other processes
+
+def runBenchmarks():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for the PyWaveCLI rendering hot paths.")
+    parser.add_argument("--save", action="store_true", help="Store the results as the new baseline")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="The baseline file to compare with or save to")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD, help=f"Allowed slowdown relative to the baseline, as a fraction (default {THRESHOLD})")
+    parser.add_argument("--filter", default="", help="Only run benchmarks whose name contains this string")
+    args = parser.parse_args()
+
+    baseline = {}
+    if(not args.save and os.path.exists(args.baseline)):
+        with open(args.baseline) as baselineFile:
+            baseline = json.load(baselineFile)
+
+    results = {}
+    regressions = []
+    tooManyWrites = []
+    for name, setup in BENCHMARKS.items():
+        if args.filter not in name: continue
+        results[name], output = measure(setup, minRepeats=MIN_REPEATS.get(name, 5))
+        line = f"{name:<76} {results[name] * 1e6:>12.1f} us"
+        if name in baseline:
+            change = results[name] / baseline[name] - 1
+            for _ in range(CONFIRM_RUNS): # A one-off slowdown (e.g. another process waking up) isn't a regression
+                if change <= args.threshold: break
+                change = min(change, measure(setup, minRepeats=MIN_REPEATS.get(name, 5))[0] / baseline[name] - 1)
+            line += f"  {change:+7.1%}"
+            if change > args.threshold:
+                line += "  REGRESSION"
+                regressions.append(name)
+        if output:
+            writes, flushes, byteCount = output
+            line += f"  {writes:g} writes {flushes:g} flushes {byteCount:.0f} bytes per frame"
+            if name in OUTPUT_LIMITS and max(writes, flushes) > OUTPUT_LIMITS[name]:
+                line += "  TOO MANY WRITES"
+                tooManyWrites.append(name)
+        print(line)
+
+    if(args.save):
+        with open(args.baseline, "w") as baselineFile:
+            json.dump(results, baselineFile, indent=4)
+        print(f"Baseline saved to {args.baseline}")
+    elif(not baseline):
+        print(f"No baseline found at {args.baseline}, run with --save to create one for this machine")
+    if(tooManyWrites):
+        print(f"{len(tooManyWrites)} benchmark(s) wrote a frame in more than the allowed writes or flushes")
+    if(regressions):
+        print(f"{len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%}")
+    if(regressions or tooManyWrites):
+        sys.exit(1)
+    if(not args.save and not baseline):
+        sys.exit(2)
+
+if __name__ == "__main__":
+    runBenchmarks()
@@ -0,0 +1,107 @@
+"""
+[PyWaveCLI Module]
+broadcast.py -- Sharing one rendered session with any number of viewers over a local UNIX socket.
+Author: FrickTown (https://github.com/FrickTown/)
+"""
+from __future__ import annotations
+import select
+import socket
+import sys
+from unixsocket import SocketClient, UnixSocketServer
+
+RESET = "\x1b(B\x1b[m"
+
+def encodeKeyframe(frame: list[str]) -> bytes:
+    """Encode a full frame, which clears the viewer's screen and redraws every cell."""
+    rows = [f"\x1b[{rowIdx + 1};1H" + row for rowIdx, row in enumerate(frame)]
+    return (RESET + "\x1b[H\x1b[2J" + "".join(rows) + RESET).encode()
+
+def encodeDelta(previous: list[str], frame: list[str]) -> bytes:
+    """Encode only the rows that changed since the previous frame.
+
+    Whole rows are resent rather than runs of cells, since a cell may rely on the colors set by the cells before it in its row.
+    """
+    rows = [f"\x1b[{rowIdx + 1};1H" + RESET + row for rowIdx, (oldRow, row) in enumerate(zip(previous, frame)) if oldRow != row]
+    return ("".join(rows) + RESET).encode() if rows else b""
+
+
+class ViewerClient(SocketClient):
+    """The connection to one viewer, along with the encoded frames that haven't been sent to it yet."""
+    def __init__(self, connection: socket.socket):
+        super().__init__(connection)
+        self.needsKeyframe = True # Deltas are meaningless to a viewer that hasn't received a full frame since it (re)started
+
+    def skipToKeyframe(self):
+        """Drop every queued frame except the partially sent one, and send nothing but the next keyframe."""
+        while len(self.pending) > 1:
+            self.pendingBytes -= len(self.pending.pop())
+        self.needsKeyframe = True
+
+
+class BroadcastServer(UnixSocketServer):
+    """BroadcastServer sends every frame rendered by the TerminalSpace to the viewers connected to a UNIX socket, from a background thread.
+    Each frame is encoded once, as a delta of the rows that changed, and the same bytes are queued for every viewer."""
+    maxPendingBytes: int = 1024 * 1024 # A viewer this far behind has its queue dropped and is sent a keyframe (a full redraw) instead
+    keyframeInterval: int = 450 # Frames between keyframes to everyone, i.e. 5 seconds at 90 fps, so that viewers out of sync recover
+    threadName: str = "BroadcastServer"
+
+    def __init__(self, path: str):
+        """Create a new BroadcastServer.
+
+        Args:
+            path (str): The path of the UNIX socket to listen on
+        """
+        super().__init__(path)
+        self.previous: list[str] = None
+        self.framesSinceKeyframe = 0
+
+    def publish(self, frame: list[str]):
+        """Queue a rendered frame for every viewer. To be called once per frame, with the encoded rows written to the terminal."""
+        resized = self.previous is None or len(self.previous) != len(frame)
+        self.framesSinceKeyframe += 1
+        periodic = self.framesSinceKeyframe >= self.keyframeInterval
+        with self.lock:
+            if not self.clients:
+                self.previous = frame
+                return
+            keyframe = encodeKeyframe(frame) if resized or periodic or any(client.needsKeyframe for client in self.clients) else None
+            delta = None if resized or periodic else encodeDelta(self.previous, frame)
+            for client in self.clients:
+                if client.needsKeyframe or delta is None:
+                    client.queue(keyframe)
+                    client.needsKeyframe = False
+                elif delta:
+                    client.queue(delta)
+                if client.pendingBytes > self.maxPendingBytes:
+                    client.skipToKeyframe()
+        if periodic or resized:
+            self.framesSinceKeyframe = 0
+        self.previous = frame
+        self.wake()
+
+    def createClient(self, connection: socket.socket) -> ViewerClient:
+        return ViewerClient(connection)
+
+    def getStatus(self) -> str:
+        return f"[Sharing: {len(self.clients)} viewers]"
+
+
+def runViewer(path: str):
+    """Connect to a BroadcastServer and copy the frames it sends to this terminal until the server quits or Q is pressed."""
+    from blessed import Terminal
+    term = Terminal()
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    connection.connect(path)
+    out = sys.stdout.buffer
+    with term.fullscreen(), term.hidden_cursor(), term.cbreak():
+        while True:
+            readable, _, _ = select.select([connection, sys.stdin], [], [])
+            if sys.stdin in readable and term.inkey(timeout=0).lower() == "q":
+                break
+            if connection in readable:
+                data = connection.recv(65536)
+                if not data:
+                    break
+                out.write(data)
+                out.flush()
+    connection.close()
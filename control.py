@@ -0,0 +1,194 @@
+"""
+[PyWaveCLI Module]
+control.py -- A local UNIX socket through which other processes change waves and the viewport, in batches applied between frames.
+Author: FrickTown (https://github.com/FrickTown/)
+"""
+from __future__ import annotations
+import json
+import socket
+from metrics import METRICS
+from unixsocket import SocketClient, UnixSocketServer
+
+class ControlError(Exception):
+    """Raised for a command that can't be applied, which rejects the whole batch it is part of."""
+
+class ControlClient(SocketClient):
+    """The connection to one controlling process, along with its unparsed input and unsent replies."""
+    def __init__(self, connection: socket.socket):
+        super().__init__(connection)
+        self.received = bytearray()
+
+    def reply(self, reply: dict):
+        self.queue(json.dumps(reply).encode() + b"\n")
+
+
+# Every line sent to the socket is one batch: a JSON object holding one command, or a list of them. Waves are addressed by
+# their position in the graphspace (starting at 0, i.e. one less than the number shown in the menu). The commands are:
+#     {"cmd": "set", "wave": 0, "var": "amp", "value": 1.5, "incr": 0.01}  Set the value and/or increment of a custom variable
+#     {"cmd": "func", "wave": 0, "func": "math.sin(x - shift)"}            Replace the function of a wave
+#     {"cmd": "visible", "wave": 0, "visible": false}                       Show or hide a wave, or toggle it if "visible" is left out
+#     {"cmd": "zoom", "xRange": 20, "yRange": 10}                           Set the cartesian range from the centre to the edges
+# A batch is applied completely or not at all, and answered with a line {"ok": true} or {"ok": false, "error": ...}.
+
+class ControlServer(UnixSocketServer):
+    """ControlServer accepts batches of commands on a UNIX socket from a background thread, and applies them to a graphspace
+    on the render loop's thread in applyPending, so that a frame never shows half a batch."""
+    maxLineBytes: int = 1024 * 1024 # Clients sending longer lines are disconnected
+    threadName: str = "ControlServer"
+    socketMode: int = 0o600 # Commands can evaluate arbitrary Python, so only the user running the session may connect
+
+    def __init__(self, path: str, terminal):
+        """Create a new ControlServer.
+
+        Args:
+            path (str): The path of the UNIX socket to listen on
+            terminal (TerminalSpace): The terminal whose first graphspace is controlled
+        """
+        super().__init__(path)
+        self.terminal = terminal
+        self.batches: list[tuple[ControlClient, list[dict], str]] = [] # (client, commands, error if the line couldn't be parsed)
+
+    def createClient(self, connection: socket.socket) -> ControlClient:
+        return ControlClient(connection)
+
+    def receive(self, client: ControlClient) -> bool:
+        """Read what a client sent, and queue every complete line as a batch. Returns False if the client was disconnected."""
+        try:
+            data = client.connection.recv(65536)
+        except BlockingIOError:
+            return True
+        except OSError:
+            data = b""
+        if not data:
+            self.disconnect(client)
+            return False
+        client.received += data
+        *lines, rest = client.received.split(b"\n")
+        client.received = bytearray(rest)
+        if len(client.received) > self.maxLineBytes:
+            self.disconnect(client)
+            return False
+        batches = []
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                commands = json.loads(line)
+            except ValueError as e:
+                batches.append((client, [], f"Invalid JSON: {e}")) # Replied to in order with the other batches
+                continue
+            batches.append((client, commands if isinstance(commands, list) else [commands], None))
+        with self.lock:
+            self.batches.extend(batches)
+        return True
+
+    def applyPending(self) -> int:
+        """Apply every batch received since the last call. To be called by the render loop between frames.
+        The batches are merged first: every field is written once with its last value, and each distinct function is compiled once.
+
+        Returns:
+            int: The number of commands applied
+        """
+        with self.lock:
+            batches, self.batches = self.batches, []
+        if not batches:
+            return 0
+        graphspace = self.terminal.graphspaces[0]
+        plan: dict[tuple, object] = {} # (wave, field) or (wave, variable, key) or ("zoom", axis): final value
+        compiled: dict[tuple, tuple] = {}
+        replies = []
+        applied = 0
+        for client, commands, error in batches:
+            changes = {}
+            try:
+                if error:
+                    raise ControlError(error)
+                for command in commands:
+                    self.planCommand(graphspace, command, plan, changes, compiled)
+            except ControlError as e:
+                replies.append((client, {"ok": False, "error": str(e)}))
+                continue
+            plan.update(changes)
+            applied += len(commands)
+            replies.append((client, {"ok": True}))
+
+        if plan:
+            if self.terminal.lookahead:
+                self.terminal.lookahead.discard() # Frames rendered ahead show the state from before the batches
+            self.applyPlan(graphspace, plan, compiled)
+        METRICS.increment("pywavecli_control_commands", applied)
+        with self.lock:
+            for client, reply in replies:
+                client.reply(reply)
+        self.wake()
+        return applied
+
+    def getWave(self, graphspace, command: dict):
+        index = command.get("wave")
+        if not isinstance(index, int) or not 0 <= index < len(graphspace.waves):
+            raise ControlError(f"No wave at position {index!r}")
+        return graphspace.waves[index]
+
+    def planCommand(self, graphspace, command: dict, plan: dict, changes: dict, compiled: dict):
+        """Validate one command and add the fields it sets to changes, compiling any new function.
+
+        Raises:
+            ControlError: If the command can't be applied
+        """
+        if not isinstance(command, dict):
+            raise ControlError(f"Commands must be objects, got {command!r}")
+        kind = command.get("cmd")
+        if kind == "set":
+            wave = self.getWave(graphspace, command)
+            if command.get("var") not in wave.customVars:
+                raise ControlError(f"Wave {command['wave']} has no variable {command.get('var')!r}")
+            for key in ("value", "incr"):
+                if key in command:
+                    if not isinstance(command[key], (int, float)) or isinstance(command[key], bool):
+                        raise ControlError(f"{key} must be a number")
+                    changes[(wave, command["var"], key)] = float(command[key])
+        elif kind == "func":
+            wave = self.getWave(graphspace, command)
+            func = command.get("func")
+            if not isinstance(func, str):
+                raise ControlError("func must be a string")
+            if (wave, func) not in compiled:
+                try:
+                    compiled[(wave, func)] = wave.compileFunction(func)
+                except Exception as e:
+                    raise ControlError(f"Can't evaluate {func!r}: {e}")
+            changes[(wave, "func")] = func
+        elif kind == "visible":
+            wave = self.getWave(graphspace, command)
+            current = changes.get((wave, "visible"), plan.get((wave, "visible"), wave.visible))
+            changes[(wave, "visible")] = bool(command.get("visible", not current))
+        elif kind == "zoom":
+            for axis in ("xRange", "yRange"):
+                if axis in command:
+                    if not isinstance(command[axis], (int, float)) or isinstance(command[axis], bool) or command[axis] <= 0:
+                        raise ControlError(f"{axis} must be a positive number")
+                    changes[("zoom", axis)] = command[axis]
+        else:
+            raise ControlError(f"Unknown command {kind!r}")
+
+    def applyPlan(self, graphspace, plan: dict, compiled: dict):
+        """Write the final value of every planned field, and rebuild the menu once if any function changed.
+        Nothing is recorded in the graphspace's History, so that a steady stream of batches can't push the user's own edits out of it."""
+        functionChanged = False
+        for key, value in plan.items():
+            if key[0] == "zoom":
+                current = graphspace.xRange if key[1] == "xRange" else graphspace.yRange
+                if value != current:
+                    graphspace.rescale(key[1][0], value - current)
+            elif len(key) == 3:
+                key[0].customVars[key[1]][key[2]] = value
+            elif key[1] == "visible":
+                key[0].visible = value
+            elif key[0].func != value:
+                key[0].setFunction(value, compiled[(key[0], value)])
+                functionChanged = True
+        if functionChanged:
+            graphspace.menu.recursiveSubMenuFetch().refreshSelfAndParents()
+
+    def getStatus(self) -> str:
+        return f"[Control: {len(self.clients)} clients]"
@@ -3,7 +3,7 @@
 examples.py -- A few lines of code demonstrating the uppermost layer of interfacing with the core.
 Author: FrickTown (https://github.com/FrickTown/)
 """
-from main import TerminalSpace, Wave, Graphspace
+from main import TerminalSpace, Wave, WaveFamily, FieldWave, Graphspace
 import math
 
 def addWaves(term: TerminalSpace):
@@ -49,4 +49,19 @@ def addWaves(term: TerminalSpace):
     # Constant function demo
     term.graphspaces[0].addWave(Wave("x * x", term.bright_green, {
         "radius": {"value": 5, "incr": 0},
-        }, visible=False))
\ No newline at end of file
+        }, visible=False))
+    # Wave family demo: one function swept over 48 amplitudes, evaluated in a single broadcast pass and colored along a ramp
+    term.graphspaces[0].addWave(WaveFamily("amp * math.sin(x - shift) / (1 + abs(x))", term.colorRamp((40, 80, 255), (255, 60, 120), 12), {
+        "shift": {"value": 0, "incr": math.pi/40},
+        }, {"amp": [a / 4 for a in range(1, 49)]}, visible=False))
+
+    # Implicit curve demo: a pulsating ellipse, plotted wherever f(x, y) = 0
+    term.graphspaces[0].addWave(FieldWave("(x / 2) ** 2 + y ** 2 - (radius + math.sin(pulse)) ** 2", [term.bright_cyan], {
+        "radius": {"value": 5, "incr": 0},
+        "pulse": {"value": 0, "incr": math.pi/40},
+        }, mode="implicit", visible=False))
+
+    # Heatmap demo: interfering ripples, colored along a ramp
+    term.graphspaces[0].addWave(FieldWave("math.sin(math.hypot(x - 4, y) - phase) + math.sin(math.hypot(x + 4, y) - phase)", term.colorRamp((10, 10, 60), (255, 200, 60), 16), {
+        "phase": {"value": 0, "incr": math.pi/30},
+        }, mode="heatmap", valueRange=(-2, 2), visible=False))
@@ -0,0 +1,202 @@
+"""
+[PyWaveCLI Module]
+export.py -- Offline export of a graphspace to PPM/PGM images far larger than the terminal, rasterized into a memory-mapped file.
+Author: FrickTown (https://github.com/FrickTown/)
+"""
+from __future__ import annotations
+import concurrent.futures
+import os
+import re
+import numpy
+import main
+import params
+import vecmath
+
+TRUECOLOR_PATTERN = re.compile(r"\x1b\[38;2;(\d+);(\d+);(\d+)m")
+COLOR256_PATTERN = re.compile(r"\x1b\[38;5;(\d+)m")
+BASIC_COLORS = [(0, 0, 0), (205, 0, 0), (0, 205, 0), (205, 205, 0), (0, 0, 238), (205, 0, 205), (0, 205, 205), (229, 229, 229),
+                (127, 127, 127), (255, 0, 0), (0, 255, 0), (255, 255, 0), (92, 92, 255), (255, 0, 255), (0, 255, 255), (255, 255, 255)]
+BACKGROUND = (3, 3, 3)
+AXIS_COLOR = (110, 110, 110)
+
+def parseColor(termColor: str) -> tuple[int, int, int]:
+    """Convert a foreground color sequence (truecolor or 256 colors) to RGB. Anything else, e.g. an unstyled terminal's empty string, becomes white."""
+    match = TRUECOLOR_PATTERN.search(termColor)
+    if match:
+        return tuple(int(value) for value in match.groups())
+    match = COLOR256_PATTERN.search(termColor)
+    if not match:
+        return (255, 255, 255)
+    index = int(match.group(1))
+    if index < 16:
+        return BASIC_COLORS[index]
+    if index < 232:
+        index -= 16
+        return tuple(0 if level == 0 else 55 + level * 40 for level in (index // 36, index // 6 % 6, index % 6))
+    return (8 + (index - 232) * 10,) * 3
+
+def getFramePath(path: str, frameIdx: int, frameCount: int) -> str:
+    """Number the frames of a sequence, e.g. scene.ppm becomes scene_0000.ppm, scene_0001.ppm, ..."""
+    if frameCount == 1:
+        return path
+    root, extension = os.path.splitext(path)
+    return f"{root}_{frameIdx:0{max(4, len(str(frameCount - 1)))}d}{extension}"
+
+
+class ImageExporter():
+    """ImageExporter rasterizes the visible waves of a graphspace, with the live view's ranges and pan, into a PPM (or .pgm) file.
+    The image is written through a numpy.memmap in strips rasterized by a thread pool, so memory use depends on the strip size only."""
+    stripHeight: int = 256
+
+    def __init__(self, graphspace: main.Graphspace, width: int, height: int, workers: int = None):
+        """Create a new ImageExporter.
+
+        Args:
+            graphspace (main.Graphspace): The graphspace whose waves, ranges and pan are exported
+            width (int): The width of the image in pixels
+            height (int): The height of the image in pixels
+            workers (int, optional): The number of strips rasterized in parallel. Defaults to the number of CPUs.
+        """
+        self.graphspace = graphspace
+        self.width = width
+        self.height = height
+        self.workers = workers or os.cpu_count() or 1
+        self.lineWidth = max(1, round(height / 1000))
+        # The viewport, centered on the pan like the live view
+        xCentre = graphspace.xPan * (graphspace.xRange * 2) / graphspace.xCellCount
+        yCentre = graphspace.yPan * (graphspace.yRange * 2) / graphspace.yCellCount
+        self.xStart = xCentre - graphspace.xRange
+        self.yTop = yCentre + graphspace.yRange
+        self.dx = graphspace.xRange * 2 / width
+        self.dy = graphspace.yRange * 2 / height
+
+    def exportSequence(self, path: str, frameCount: int = 1, progress = None) -> list[str]:
+        """Export frameCount frames, advancing the variables of every wave by their increments between frames like the live view does.
+        The variables are restored afterwards. The caches of the live view (sample pyramids, field tiles and the frame cache) need
+        no invalidation: they are keyed by the variable values, so once those are restored their entries are valid again.
+
+        Args:
+            path (str): The image path. Frames of a sequence are numbered, see getFramePath.
+            frameCount (int, optional): Defaults to 1.
+            progress (callable, optional): Called with the path of every finished frame.
+
+        Returns:
+            list[str]: The paths of the written frames
+        """
+        store = params.STORE
+        values = store.values[:store.size].copy()
+        paths = []
+        try:
+            with concurrent.futures.ThreadPoolExecutor(self.workers) as executor:
+                for frameIdx in range(frameCount):
+                    paths.append(getFramePath(path, frameIdx, frameCount))
+                    self.exportFrame(paths[-1], executor)
+                    if progress:
+                        progress(paths[-1])
+                    store.step()
+        finally:
+            store.values[:len(values)] = values
+        return paths
+
+    def exportFrame(self, path: str, executor: concurrent.futures.Executor = None):
+        """Rasterize the current state of the graphspace into one image file.
+
+        Args:
+            path (str): The image path
+            executor (concurrent.futures.Executor, optional): The pool the waves are evaluated and the strips rasterized in. Defaults to a new one.
+        """
+        if executor is None:
+            with concurrent.futures.ThreadPoolExecutor(self.workers) as executor:
+                return self.exportFrame(path, executor)
+        gray = path.lower().endswith(".pgm")
+        header = f"{'P5' if gray else 'P6'}\n{self.width} {self.height}\n255\n".encode()
+        with open(path, "wb") as imageFile:
+            imageFile.write(header)
+            imageFile.truncate(len(header) + self.width * self.height * (1 if gray else 3))
+        image = numpy.memmap(path, dtype=numpy.uint8, mode="r+", offset=len(header), shape=(self.height, self.width, 1 if gray else 3))
+
+        visibleWaves = [wave for wave in self.graphspace.waves if wave.visible]
+        fields = [wave for wave in visibleWaves if isinstance(wave, main.FieldWave)]
+        # Every wave is evaluated in parallel first, since all strips need all of them
+        curves = [executor.submit(self.getCurve, wave) for wave in visibleWaves if wave not in fields]
+        fieldRanges = [executor.submit(self.getFieldRange, field) for field in fields]
+        curves = [curve.result() for curve in curves]
+        fieldRanges = [fieldRange.result() for fieldRange in fieldRanges]
+        strips = [executor.submit(self.rasterizeStrip, image, rowStart, min(rowStart + self.stripHeight, self.height), fields, fieldRanges, curves, gray)
+                  for rowStart in range(0, self.height, self.stripHeight)]
+        for strip in strips:
+            strip.result() # Re-raise any exception from the strip
+        image.flush()
+        del image
+
+    def getCurve(self, wave: main.Wave) -> tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]:
+        """Evaluate a wave (or every member of a family) once per pixel column.
+
+        Returns:
+            tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]: The first and last pixel row the line covers in each column, (members, width) each, and the RGB color of each member
+        """
+        xs = self.xStart + (numpy.arange(self.width) + 0.5) * self.dx
+        ys = numpy.atleast_2d(wave.getYs(xs))
+        with numpy.errstate(invalid="ignore", over="ignore"):
+            rows = numpy.clip((self.yTop - ys) / self.dy - 0.5, -2, self.height + 1) # Clipping keeps poles (e.g. of tan) from overflowing
+            # Each column covers the rows from halfway to its left neighbor to halfway to its right neighbor
+            left = numpy.concatenate([rows[:, :1], (rows[:, :-1] + rows[:, 1:]) / 2], axis=1)
+            right = numpy.concatenate([(rows[:, :-1] + rows[:, 1:]) / 2, rows[:, -1:]], axis=1)
+            low = numpy.floor(numpy.fmin(numpy.fmin(left, rows), right)) # fmin and fmax ignore a NaN neighbor
+            high = numpy.ceil(numpy.fmax(numpy.fmax(left, rows), right))
+        missing = ~numpy.isfinite(rows)
+        low[missing], high[missing] = self.height + 1, -2 # Empty spans for samples that failed to evaluate
+        colors = numpy.array([parseColor(sign) for sign in wave.getPointSigns("")], dtype=numpy.uint8)
+        return (low - self.lineWidth // 2, high + (self.lineWidth - 1) // 2, colors)
+
+    def getFieldRange(self, field: main.FieldWave) -> tuple[float, float]:
+        """The values mapped to the ends of a heatmap's color ramp, from a coarse pass over the whole image if the field doesn't set them."""
+        if field.mode != "heatmap" or field.valueRange:
+            return field.valueRange
+        values = self.evaluateField(field, numpy.linspace(0, self.width, 257), numpy.linspace(0, self.height, 129))
+        finite = values[numpy.isfinite(values)]
+        return (finite.min(), finite.max()) if finite.size else (0.0, 1.0)
+
+    def evaluateField(self, field: main.FieldWave, cols: numpy.ndarray, rows: numpy.ndarray) -> numpy.ndarray:
+        """Evaluate a field at fractional pixel positions, returning a (len(rows), len(cols)) matrix."""
+        xs = self.xStart + cols * self.dx
+        ys = self.yTop - rows * self.dy
+        return vecmath.evaluate(field.asVectorFunction, field.asFunction, xs[None, :], [ys[:, None]] + field.getArgs()[1:])
+
+    def rasterizeStrip(self, image: numpy.memmap, rowStart: int, rowStop: int, fields: list, fieldRanges: list, curves: list, gray: bool):
+        strip = numpy.empty((rowStop - rowStart, self.width, 3), dtype=numpy.uint8)
+        strip[:] = BACKGROUND
+        # The axes, where they are in view
+        originCol = round(-self.xStart / self.dx)
+        originRow = round(self.yTop / self.dy)
+        if 0 <= originCol < self.width:
+            strip[:, max(0, originCol - self.lineWidth // 2):originCol + (self.lineWidth + 1) // 2] = AXIS_COLOR
+        if rowStart <= originRow < rowStop:
+            strip[max(0, originRow - rowStart - self.lineWidth // 2):originRow - rowStart + (self.lineWidth + 1) // 2] = AXIS_COLOR
+
+        cols = numpy.arange(self.width)
+        rows = numpy.arange(rowStart, rowStop)
+        for field, valueRange in zip(fields, fieldRanges):
+            if field.mode == "heatmap":
+                values = self.evaluateField(field, cols + 0.5, rows + 0.5)
+                finite = numpy.isfinite(values)
+                ramp = numpy.array([parseColor(color) for color in field.termColors], dtype=numpy.uint8)
+                low, high = valueRange
+                with numpy.errstate(invalid="ignore"):
+                    scaled = (numpy.clip(values, low, high) - low) / ((high - low) or 1)
+                strip[finite] = ramp[numpy.rint(scaled[finite] * (len(ramp) - 1)).astype(int)]
+            else:
+                # A pixel is on the curve if the sign changes across its corners
+                signs = numpy.sign(self.evaluateField(field, numpy.arange(self.width + 1), numpy.arange(rowStart, rowStop + 1)))
+                corners = numpy.stack([signs[:-1, :-1], signs[:-1, 1:], signs[1:, :-1], signs[1:, 1:]])
+                with numpy.errstate(invalid="ignore"):
+                    strip[corners.max(axis=0) > corners.min(axis=0)] = parseColor(field.termColor)
+        for low, high, colors in curves:
+            for member in range(low.shape[0]): # Later members and waves are drawn on top of earlier ones, like in the live view
+                covered = (rows[:, None] >= low[member]) & (rows[:, None] <= high[member])
+                strip[covered] = colors[member]
+
+        if gray:
+            image[rowStart:rowStop, :, 0] = (strip @ numpy.array([0.299, 0.587, 0.114])).round().astype(numpy.uint8)
+        else:
+            image[rowStart:rowStop] = strip
@@ -0,0 +1,132 @@
+"""
+[PyWaveCLI Module]
+exprgraph.py -- A shared evaluation graph, which evaluates the subexpressions that several waves have in common only once.
+Author: FrickTown (https://github.com/FrickTown/)
+"""
+from __future__ import annotations
+import ast
+import functools
+import operator
+import numpy
+from vecmath import VECTOR_MATH
+
+BINARY_OPERATORS = {
+    ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul, ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv, ast.Mod: operator.mod, ast.Pow: operator.pow,
+}
+COMMUTATIVE_OPERATORS = (ast.Add, ast.Mult) # Swapping the operands of these gives bit-identical results
+UNARY_OPERATORS = {ast.USub: operator.neg, ast.UAdd: operator.pos}
+BUILTINS = {"abs": abs}
+
+class UnsupportedExpression(Exception):
+    """Raised for expressions the graph can't represent, which are evaluated on their own instead."""
+
+@functools.lru_cache(maxsize=256)
+def parseExpression(func: str) -> ast.expr:
+    return ast.parse(func, mode="eval").body
+
+class EvaluationGraph():
+    """EvaluationGraph merges the expressions of several waves into one DAG and evaluates every distinct node once.
+    Custom variables are bound to their current values, so the graph is meant to be rebuilt every frame."""
+    def __init__(self):
+        self.nodeIds: dict[tuple, int] = {}
+        self.operations: list[tuple] = []  # (function, child node ids) per node, None for leaves
+        self.values: list = []             # Value of every node, known up front for leaves and constants
+        self.dependsOnX: list[bool] = []
+        self.roots: list[int] = []
+        self.unsharedEvaluations = 0       # Nodes that depend on x, counted once per occurrence in each expression
+
+    def addNode(self, key: tuple, operation: tuple = None, value = None, dependsOnX: bool = False) -> int:
+        nodeId = self.nodeIds.get(key)
+        if nodeId is None:
+            nodeId = len(self.operations)
+            self.nodeIds[key] = nodeId
+            self.operations.append(operation)
+            self.values.append(value)
+            self.dependsOnX.append(dependsOnX)
+        if dependsOnX and operation is not None:
+            self.unsharedEvaluations += 1
+        return nodeId
+
+    def addConstant(self, value) -> int:
+        if not isinstance(value, (int, float, numpy.floating)):
+            raise UnsupportedExpression(f"Unsupported constant {value!r}")
+        return self.addNode(("const", type(value).__name__, float(value).hex() if isinstance(value, float) else repr(value)), value=value)
+
+    def addOperation(self, kind: str, function, childIds: list[int]) -> int:
+        """Add a node applying function to the values of its children, folding it into a constant if none of them depend on x."""
+        if not any(self.dependsOnX[childId] for childId in childIds):
+            try:
+                with numpy.errstate(all="ignore"):
+                    value = function(*[self.values[childId] for childId in childIds])
+            except Exception as e:
+                raise UnsupportedExpression(str(e)) # Left to the per-wave fallback, which turns the failure into NaN
+            return self.addConstant(value.item() if isinstance(value, numpy.ndarray) and value.ndim == 0 else value)
+        return self.addNode((kind, *childIds), (function, childIds), dependsOnX=True)
+
+    def addExpression(self, node: ast.expr, bindings: dict[str, float]) -> int:
+        """Add an expression tree to the graph, returning the id of its root node."""
+        if isinstance(node, ast.Name):
+            if node.id == "x":
+                return self.addNode(("x",), dependsOnX=True)
+            if node.id in bindings:
+                return self.addConstant(bindings[node.id])
+            raise UnsupportedExpression(f"Unknown name {node.id}")
+        if isinstance(node, ast.Constant):
+            return self.addConstant(node.value)
+        if isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name) and node.value.id == "math":
+            attribute = getattr(VECTOR_MATH, node.attr, None)
+            if attribute is None or callable(attribute):
+                raise UnsupportedExpression(f"Unsupported attribute math.{node.attr}")
+            return self.addConstant(attribute)
+        if isinstance(node, ast.BinOp) and type(node.op) in BINARY_OPERATORS:
+            childIds = [self.addExpression(node.left, bindings), self.addExpression(node.right, bindings)]
+            if isinstance(node.op, COMMUTATIVE_OPERATORS):
+                childIds.sort()
+            return self.addOperation(type(node.op).__name__, BINARY_OPERATORS[type(node.op)], childIds)
+        if isinstance(node, ast.UnaryOp) and type(node.op) in UNARY_OPERATORS:
+            return self.addOperation(type(node.op).__name__, UNARY_OPERATORS[type(node.op)], [self.addExpression(node.operand, bindings)])
+        if isinstance(node, ast.Call) and not node.keywords:
+            if isinstance(node.func, ast.Attribute) and isinstance(node.func.value, ast.Name) and node.func.value.id == "math":
+                name, function = f"math.{node.func.attr}", getattr(VECTOR_MATH, node.func.attr, None)
+            elif isinstance(node.func, ast.Name) and node.func.id in BUILTINS:
+                name, function = node.func.id, BUILTINS[node.func.id]
+            else:
+                raise UnsupportedExpression("Unsupported call")
+            if not callable(function):
+                raise UnsupportedExpression(f"Unsupported call to {name}")
+            return self.addOperation(name, function, [self.addExpression(arg, bindings) for arg in node.args])
+        raise UnsupportedExpression(f"Unsupported expression {type(node).__name__}")
+
+    def addWave(self, wave) -> bool:
+        """Add a wave's expression as a root of the graph. Returns False (leaving the graph as it was) if it can't be represented."""
+        state = (dict(self.nodeIds), len(self.operations), self.unsharedEvaluations)
+        try:
+            self.roots.append(self.addExpression(parseExpression(wave.func), dict(zip(wave.getArgNames(), wave.getArgs()))))
+            return True
+        except (UnsupportedExpression, SyntaxError, RecursionError):
+            self.nodeIds, nodeCount, self.unsharedEvaluations = state
+            del self.operations[nodeCount:], self.values[nodeCount:], self.dependsOnX[nodeCount:]
+            return False
+
+    def evaluate(self, xs: numpy.ndarray) -> list[numpy.ndarray]:
+        """Evaluate every node that depends on x once over xs, in the order they were added (children always precede their parents).
+
+        Returns:
+            list[numpy.ndarray]: The values of each root, in the order their waves were added
+        """
+        values = list(self.values)
+        with numpy.errstate(all="ignore"):
+            for nodeId, operation in enumerate(self.operations):
+                if operation is None:
+                    if self.dependsOnX[nodeId]:
+                        values[nodeId] = xs
+                    continue
+                function, childIds = operation
+                values[nodeId] = function(*[values[childId] for childId in childIds])
+        return [numpy.broadcast_to(numpy.asarray(values[root], dtype=float), numpy.shape(xs)) for root in self.roots]
+
+    def getSavedEvaluations(self, sampleCount: int) -> int:
+        """The number of samples not evaluated thanks to sharing, compared to evaluating every expression on its own."""
+        sharedEvaluations = sum(1 for operation, dependsOnX in zip(self.operations, self.dependsOnX) if operation is not None and dependsOnX)
+        return (self.unsharedEvaluations - sharedEvaluations) * sampleCount
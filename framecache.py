@@ -0,0 +1,147 @@
+"""
+[PyWaveCLI Module]
+framecache.py -- Detection of periodic animations, whose frames are served from a cache once the animation has come full circle.
+Author: FrickTown (https://github.com/FrickTown/)
+"""
+from __future__ import annotations
+import ast
+import functools
+import math
+import sys
+import numpy
+from metrics import METRICS
+
+FRAME_CACHE_MEMORY = 64 * 1024 * 1024 # Default maximum size, in bytes, of the cached frames
+TAU = 2 * math.pi
+PERIODIC_FUNCTIONS = ("sin", "cos", "tan") # Functions f with f(a + 2pi) == f(a)
+
+def isPhaseTerm(node: ast.AST, name: str) -> bool:
+    """True if node is the variable, or a whole multiple of it, e.g. shift, -shift or 2 * shift."""
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.UAdd, ast.USub)):
+        return isPhaseTerm(node.operand, name)
+    if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Mult):
+        for factor, other in ((node.left, node.right), (node.right, node.left)):
+            if isinstance(other, ast.Constant) and isinstance(other.value, int) and not isinstance(other.value, bool):
+                return isPhaseTerm(factor, name)
+        return False
+    return isinstance(node, ast.Name) and node.id == name
+
+def isPhaseOf(node: ast.AST, name: str) -> bool:
+    """True if node is a sum of terms, where the terms using the variable are all phase terms (see isPhaseTerm)."""
+    if isinstance(node, ast.BinOp) and isinstance(node.op, (ast.Add, ast.Sub)):
+        return isPhaseOf(node.left, name) and isPhaseOf(node.right, name)
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.UAdd, ast.USub)):
+        return isPhaseOf(node.operand, name)
+    return isPhaseTerm(node, name) or not any(isinstance(child, ast.Name) and child.id == name for child in ast.walk(node))
+
+def isPeriodicIn(node: ast.AST, name: str) -> bool:
+    """True if every use of the variable is in the phase of a sin, cos or tan, so that the expression repeats when it changes by 2pi."""
+    if isinstance(node, ast.Call) and len(node.args) == 1 and not node.keywords:
+        funcName = node.func.attr if isinstance(node.func, ast.Attribute) else getattr(node.func, "id", None)
+        if funcName in PERIODIC_FUNCTIONS and isPhaseOf(node.args[0], name):
+            return True
+    if isinstance(node, ast.Name):
+        return node.id != name
+    return all(isPeriodicIn(child, name) for child in ast.iter_child_nodes(node))
+
+@functools.lru_cache(maxsize=1024)
+def getPhaseVariables(func: str, names: tuple[str, ...]) -> tuple[bool, ...]:
+    """Return, for each of the variables, whether the function is periodic in it with a period of 2pi. False for functions that can't be parsed."""
+    try:
+        tree = ast.parse(func, mode="eval")
+    except SyntaxError:
+        return (False,) * len(names)
+    return tuple(isPeriodicIn(tree, name) for name in names)
+
+class CachedFrame():
+    """A rendered frame: the cells of its first row, which the status line is written over, and every other row already encoded."""
+    __slots__ = ("firstRow", "rows", "verified", "hits", "size")
+
+    def __init__(self, firstRow: list[str], rows: list[str]):
+        self.firstRow = firstRow
+        self.rows = rows
+        self.verified = False
+        self.hits = 0
+        self.size = sum(sys.getsizeof(row) for row in rows) + 8 * len(firstRow) # The cells of the first row are shared with the waves
+
+class FrameCache():
+    """FrameCache replays the frames of periodic animations, keyed by the variable values of every visible wave (modulo 2pi for phases).
+    A repeated state is rendered once more and compared before its frame is replayed, since rounding can make states collide."""
+    precision: int = 6 # Decimals the variable values are rounded to
+    verifyInterval: int = 256 # Hits after which a cached frame is rendered and compared again
+    maxMismatches: int = 4 # Frames that didn't match their cached state, after which caching is disabled until the scene changes
+
+    def __init__(self, memoryCap: int = FRAME_CACHE_MEMORY):
+        self.memoryCap = memoryCap
+        self.frames: dict[bytes, CachedFrame] = {}
+        self.size = 0
+        self.enabled = True
+        self.mismatches = 0
+        self.sceneKey: str = None
+
+    def clear(self):
+        """Forget all frames and try detecting a period again, e.g. after the scene was edited."""
+        self.frames.clear()
+        self.size = 0
+        self.enabled = True
+        self.mismatches = 0
+
+    def getStateKey(self, terminal) -> bytes:
+        """Return a key identifying the variable values of the terminal's next frame, or None if it shouldn't be cached."""
+        if any(graphspace.showMenu or graphspace.trails for graphspace in terminal.graphspaces): # Trails depend on the frames before, not just the state
+            if self.frames or not self.enabled:
+                self.clear()
+            return None
+        scene = [terminal.width, terminal.height]
+        values = []
+        for graphspace in terminal.graphspaces:
+            scene.append((graphspace.xCellCount, graphspace.yCellCount, graphspace.xRange, graphspace.yRange,
+                          graphspace.ppcMagnitude, graphspace.xPan, graphspace.yPan, graphspace.densityMode))
+            for wave in graphspace.waves:
+                if not wave.visible:
+                    continue
+                scene.append((id(wave), wave.func, wave.termColor, tuple(getattr(wave, "termColors", ())), wave.ppcMagnitude))
+                variables = wave.customVars
+                periodic = numpy.array(getPhaseVariables(wave.func, tuple(variables.keys())), dtype=bool)
+                values.append(numpy.where(periodic & (variables.store.incrs[variables.slots] != 0),
+                                          numpy.mod(variables.getValues(), TAU), variables.getValues()))
+        sceneKey = repr(scene)
+        if sceneKey != self.sceneKey:
+            self.clear()
+            self.sceneKey = sceneKey
+        if not self.enabled:
+            return None
+        rounded = numpy.round(numpy.concatenate(values), self.precision) if values else numpy.empty(0)
+        return (rounded + 0.0).tobytes() # Adding 0.0 turns -0.0 into 0.0
+
+    def get(self, key: bytes) -> CachedFrame:
+        """Return the cached frame for a state, if it has been verified, and count the hit."""
+        frame = self.frames.get(key)
+        if frame is None or not frame.verified:
+            return None
+        frame.hits += 1
+        if frame.hits % self.verifyInterval == 0:
+            frame.verified = False # Rendered again, and compared in store
+            return None
+        METRICS.increment("pywavecli_frame_cache_hits")
+        return frame
+
+    def store(self, key: bytes, firstRow: list[str], rows: list[str]):
+        """Cache a freshly rendered frame, or verify it against the frame already cached for the same state."""
+        cached = self.frames.get(key)
+        if cached is not None:
+            if cached.rows == rows and cached.firstRow == firstRow:
+                cached.verified = True
+                return
+            self.mismatches += 1
+            if self.mismatches >= self.maxMismatches:
+                self.frames.clear()
+                self.size = 0
+                self.enabled = False
+                return
+            del self.frames[key] # Replaced by the new frame, which has to be verified in turn
+            self.size -= cached.size
+        frame = CachedFrame(firstRow, rows)
+        if self.size + frame.size <= self.memoryCap: # Once full, keeping a long cycle's first frames beats evicting the next one needed
+            self.frames[key] = frame
+            self.size += frame.size
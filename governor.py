@@ -0,0 +1,202 @@
+"""
+[PyWaveCLI Module]
+governor.py -- Governors that adapt the output of PyWaveCLI to the resources available to it.
+Author: FrickTown (https://github.com/FrickTown/)
+"""
+from __future__ import annotations
+import re
+import math
+import numpy
+import time
+
+TRUECOLOR_PATTERN = re.compile(r"\x1b\[(38|48);2;(\d+);(\d+);(\d+)m")
+SGR_PATTERN = re.compile(r"\x1b\[[0-9;]*m|\x1b\(B")
+
+def parseByteRate(text: str) -> int:
+    """Parse a byte rate such as "64000", "200k" or "1.5M" into bytes per second."""
+    multipliers = {"k": 1000, "m": 1000 * 1000}
+    suffix = text[-1].lower()
+    if suffix in multipliers:
+        return int(float(text[:-1]) * multipliers[suffix])
+    return int(text)
+
+class OutputGovernor():
+    """OutputGovernor keeps the bytes written to the terminal within a bytes/sec budget, e.g. for SSH sessions.
+    Once per window it steps along LEVELS, reducing the colors and the frame rate, based on the bytes written and the time spent blocked."""
+    # (label, color mode, frame rate divisor), from the richest output to the cheapest
+    LEVELS = [
+        ("full", "truecolor", 1),
+        ("256c", "256", 1),
+        ("256c", "256", 2),
+        ("mono", "mono", 2),
+        ("mono", "mono", 4),
+    ]
+    windowLength: float = 1.0   # Seconds of measurements per decision
+    headroom: float = 0.5       # Only step up when using less than this fraction of the budget...
+    upgradeWindows: int = 3     # ...for this many windows in a row
+    maxBlocking: float = 0.25   # Step down if more than this fraction of the window was spent blocked on writes
+
+    def __init__(self, terminal, budget: int, framerate: int):
+        """Create a new OutputGovernor.
+
+        Args:
+            terminal (TerminalSpace): The terminal whose output is governed, used for color conversion
+            budget (int): The output budget in bytes per second
+            framerate (int): The maximum frame rate when the budget allows it
+        """
+        self.terminal = terminal
+        self.budget = budget
+        self.framerate = framerate
+        self.level = 0
+        self.windowStart = time.perf_counter()
+        self.windowBytes = 0
+        self.windowBlocking = 0.0
+        self.calmWindows = 0
+        self.bytesPerSecond = 0.0
+        self.colorCache: dict[tuple[str, str, str, str], str] = {}
+
+    def frameInterval(self) -> float:
+        """The time to wait between frames at the current level."""
+        return self.LEVELS[self.level][2] / self.framerate
+
+    def filterFrame(self, frame: str) -> str:
+        """Reduce the color depth of an encoded frame according to the current level."""
+        colorMode = self.LEVELS[self.level][1]
+        if colorMode == "256":
+            return TRUECOLOR_PATTERN.sub(self.downconvert, frame)
+        elif colorMode == "mono":
+            return SGR_PATTERN.sub("", frame)
+        return frame
+
+    def downconvert(self, match: re.Match) -> str:
+        key = match.groups()
+        if key not in self.colorCache:
+            self.colorCache[key] = f"\x1b[{key[0]};5;{self.terminal.rgb_downconvert(*map(int, key[1:]))}m"
+        return self.colorCache[key]
+
+    def recordWrite(self, byteCount: int, blockingTime: float):
+        """Account for one written frame, and adapt the level once a full window has been measured."""
+        self.windowBytes += byteCount
+        self.windowBlocking += blockingTime
+        now = time.perf_counter()
+        elapsed = now - self.windowStart
+        if elapsed < self.windowLength:
+            return
+        self.bytesPerSecond = self.windowBytes / elapsed
+        blockedFraction = self.windowBlocking / elapsed
+        if (self.bytesPerSecond > self.budget or blockedFraction > self.maxBlocking) and self.level < len(self.LEVELS) - 1:
+            self.level += 1
+            self.calmWindows = 0
+        elif self.bytesPerSecond < self.budget * self.headroom and blockedFraction < self.maxBlocking / 2 and self.level > 0:
+            self.calmWindows += 1
+            if self.calmWindows >= self.upgradeWindows:
+                self.level -= 1
+                self.calmWindows = 0
+        else:
+            self.calmWindows = 0
+        self.windowStart = now
+        self.windowBytes = 0
+        self.windowBlocking = 0.0
+
+    def getStatus(self) -> str:
+        label, _, divisor = self.LEVELS[self.level]
+        return f"[Out: {self.bytesPerSecond / 1000:.0f}/{self.budget / 1000:.0f} kB/s {label} {self.framerate // divisor}fps]"
+
+
+class QualityGovernor():
+    """QualityGovernor keeps the time spent sampling and plotting waves within a per-frame CPU budget, by giving every visible wave
+    its own ppcMagnitude. These stay a whole number of levels from the graphspace's, so that their SamplePyramid levels share samples."""
+    minPPC: int = 0
+    maxPPC: int = 8
+    smoothing: float = 0.3      # Weight of the newest measurement in the moving average of each wave's cost
+    headroom: float = 0.7       # Only raise a wave if the frame is predicted to stay below this fraction of the budget
+    cooldownFrames: int = 3     # Frames between two adjustments
+    holdFrames: int = 15        # Frames before an adjusted wave may be adjusted again
+
+    def __init__(self, budget: float):
+        """Create a new QualityGovernor.
+
+        Args:
+            budget (float): The time per frame, in seconds, that may be spent sampling and plotting waves
+        """
+        self.budget = budget
+        self.costs: dict[int, float] = {}
+        self.complexities: dict[int, float] = {}
+        self.holds: dict[int, int] = {}
+        self.cooldown = 0
+        self.frameCost = 0.0
+
+    def measure(self, wave, seconds: float, ys, cellPointHeight: float, yCellCount: int):
+        """Record the cost and complexity (the mean number of rows crossed between neighboring samples) of one wave's samples in the current frame."""
+        key = id(wave)
+        self.costs[key] = seconds if key not in self.costs else self.costs[key] + self.smoothing * (seconds - self.costs[key])
+        rows = numpy.rint(numpy.clip(ys, -yCellCount * cellPointHeight, yCellCount * cellPointHeight) / cellPointHeight)
+        with numpy.errstate(invalid="ignore"):
+            steps = numpy.abs(numpy.diff(rows, axis=-1))
+        self.complexities[key] = float(numpy.nanmean(steps)) if numpy.isfinite(steps).any() else 0.0
+
+    def adjust(self, waves: list, baseline: float):
+        """Pick at most one wave and lower or raise its ppcMagnitude, based on the measurements of the last frame.
+
+        Args:
+            waves (list[Wave]): The visible waves that were measured this frame
+            baseline (float): The graphspace's own ppcMagnitude, which waves are restored to before anything else
+        """
+        for wave in waves:
+            if wave.ppcMagnitude is None:
+                wave.ppcMagnitude = baseline
+            elif not float(wave.ppcMagnitude - baseline).is_integer(): # The baseline was changed, keep the number of levels closest to before
+                wave.ppcMagnitude = baseline + max(round(wave.ppcMagnitude - baseline), math.ceil(self.minPPC - baseline))
+        measured = [wave for wave in waves if id(wave) in self.costs]
+        self.frameCost = sum(self.costs[id(wave)] for wave in measured)
+        for wave in measured:
+            self.holds[id(wave)] = max(0, self.holds.get(id(wave), 0) - 1)
+        if self.cooldown > 0:
+            self.cooldown -= 1
+            return
+        free = [wave for wave in measured if self.holds[id(wave)] == 0]
+
+        if self.frameCost > self.budget: # Lower the most expensive, flattest wave
+            candidates = [wave for wave in free if wave.ppcMagnitude - 1 >= self.minPPC]
+            if candidates:
+                chosen = max(candidates, key=lambda w: self.costs[id(w)] / max(self.complexities[id(w)], 0.05))
+                chosen.ppcMagnitude -= 1
+                self.costs[id(chosen)] /= 2
+                self.holdAndCool(chosen)
+            return
+
+        candidates = [wave for wave in free if wave.ppcMagnitude + 1 <= self.maxPPC and self.frameCost + self.costs[id(wave)] < self.budget * self.headroom]
+        # Raise waves that were lowered below the baseline first, then waves that still show gaps
+        restorable = [wave for wave in candidates if wave.ppcMagnitude < baseline]
+        gappy = [wave for wave in candidates if self.complexities[id(wave)] > 1]
+        if restorable or gappy:
+            chosen = max(restorable or gappy, key=lambda w: self.complexities[id(w)] / max(self.costs[id(w)], 1e-6))
+            chosen.ppcMagnitude += 1
+            self.costs[id(chosen)] *= 2
+            self.holdAndCool(chosen)
+
+    def snapshot(self, waves: list) -> tuple:
+        """Capture the measurements, holds and cooldown, along with the ppcMagnitude of the given waves, for restore."""
+        return (dict(self.costs), dict(self.complexities), dict(self.holds), self.cooldown, self.frameCost, [(wave, wave.ppcMagnitude) for wave in waves])
+
+    def restore(self, state: tuple):
+        """Return to a state captured by snapshot, e.g. to forget frames that were rendered ahead but never shown."""
+        costs, complexities, holds, self.cooldown, self.frameCost, ppcs = state
+        self.costs, self.complexities, self.holds = dict(costs), dict(complexities), dict(holds)
+        for wave, ppcMagnitude in ppcs:
+            wave.ppcMagnitude = ppcMagnitude
+
+    def holdAndCool(self, wave):
+        self.holds[id(wave)] = self.holdFrames
+        self.cooldown = self.cooldownFrames
+
+    def release(self, waves: list):
+        """Hand control of the sampling density back to the graphspace."""
+        for wave in waves:
+            wave.ppcMagnitude = None
+        self.costs.clear()
+        self.complexities.clear()
+        self.holds.clear()
+
+    def getStatus(self) -> str:
+        return f"[Auto PPC: {self.frameCost * 1000:.1f}/{self.budget * 1000:.1f} ms]"
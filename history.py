@@ -0,0 +1,169 @@
+"""
+[PyWaveCLI Module]
+history.py -- Undo and redo of scene edits, recorded as immutable states of only the waves (and viewport) an edit changed.
+Author: FrickTown (https://github.com/FrickTown/)
+"""
+from __future__ import annotations
+import collections
+import contextlib
+import math
+import time
+from typing import NamedTuple
+
+class WaveState(NamedTuple):
+    """The editable state of a wave at one point in time. Strings and tuples are shared with the wave and other states, never copied."""
+    func: str
+    originalFunc: str
+    termColor: str
+    termColors: tuple[str, ...]
+    visible: bool
+    index: int                                          # Position in the graphspace's waves, -1 if the wave isn't part of the scene
+    variables: tuple[tuple[str, int, float, float], ...] # (name, slot, value, incr) of every custom variable, in argument order
+
+class ViewportState(NamedTuple):
+    xRange: float
+    yRange: float
+    xPan: int
+    yPan: int
+    ppcMagnitude: float
+
+class Edit(NamedTuple):
+    """One undoable step: the states before and after it of every wave it changed, and of the viewport if that changed."""
+    waves: tuple[tuple[object, WaveState, WaveState], ...]
+    viewport: tuple[ViewportState, ViewportState]
+    time: float
+
+class History():
+    """History keeps the undo and redo stacks of one graphspace, as the states of only the waves each edit changed (see History.edit).
+    Every edit holds a reference to the variable slots in its states, so that a removed variable's slot isn't reused while it can be undone."""
+    maxEdits: int = 500          # Older edits are forgotten
+    viewportCoalesce: float = 1.0 # Viewport changes less than this many seconds apart are undone as one step (e.g. holding a zoom key)
+
+    def __init__(self, graphspace):
+        """Create a new History.
+
+        Args:
+            graphspace (Graphspace): The graphspace whose waves and viewport are edited
+        """
+        self.graphspace = graphspace
+        self.undoStack: collections.deque[Edit] = collections.deque(maxlen=self.maxEdits)
+        self.redoStack: list[Edit] = []
+        self.editing = False # Set inside an edit, whose changes include those of any edits nested in it
+
+    def captureWave(self, wave) -> WaveState:
+        waves = self.graphspace.waves
+        return WaveState(wave.func, wave.originalFunc, wave.termColor, tuple(getattr(wave, "termColors", ())), wave.visible,
+                         waves.index(wave) if wave in waves else -1,
+                         tuple((name, view.slot, view["value"], view["incr"]) for name, view in wave.customVars.items()))
+
+    def captureViewport(self) -> ViewportState:
+        graphspace = self.graphspace
+        return ViewportState(graphspace.xRange, graphspace.yRange, graphspace.xPan, graphspace.yPan, graphspace.ppcMagnitude)
+
+    @contextlib.contextmanager
+    def edit(self, waves: list = (), viewport: bool = False):
+        """Record the changes made inside the with block to the given waves (and the viewport) as one undoable edit.
+        Nothing is recorded if nothing changed, e.g. because the input was rejected.
+
+        Args:
+            waves (list[Wave], optional): The waves the edit may change, including waves it adds to or removes from the scene
+            viewport (bool, optional): Whether the edit may change the viewport. Defaults to False.
+        """
+        if self.editing:
+            yield
+            return
+        self.editing = True
+        waveStates = [(wave, self.captureWave(wave)) for wave in waves]
+        captured = Edit(tuple((wave, state, state._replace(variables=())) for wave, state in waveStates), None, 0)
+        self.retainSlots(captured, True) # Keeps the slots of variables removed during the edit from being reused before it is pushed
+        try:
+            viewportState = self.captureViewport() if viewport else None
+            try:
+                yield
+            finally:
+                self.editing = False
+            changes = tuple((wave, before, after) for wave, before in waveStates if (after := self.captureWave(wave)) != before)
+            viewportChange = (viewportState, self.captureViewport()) if viewport else None
+            if viewportChange and viewportChange[0] == viewportChange[1]:
+                viewportChange = None
+            if changes or viewportChange:
+                self.push(Edit(changes, viewportChange, time.perf_counter()))
+        finally:
+            self.retainSlots(captured, False)
+
+    def push(self, edit: Edit):
+        previous = self.undoStack[-1] if self.undoStack else None
+        if(not edit.waves and previous and not previous.waves and previous.viewport and edit.time - previous.time < self.viewportCoalesce):
+            edit = Edit((), (previous.viewport[0], edit.viewport[1]), edit.time)
+            self.undoStack.pop()
+        self.retainSlots(edit, True)
+        if len(self.undoStack) == self.undoStack.maxlen:
+            self.retainSlots(self.undoStack[0], False)
+        self.undoStack.append(edit)
+        for redoable in self.redoStack:
+            self.retainSlots(redoable, False)
+        self.redoStack.clear()
+
+    def retainSlots(self, edit: Edit, retain: bool):
+        """Add (or drop) a reference to the variable slots of both states of every wave an edit changed."""
+        for wave, before, after in edit.waves:
+            slots = [slot for state in (before, after) for _, slot, _, _ in state.variables]
+            (wave.customVars.store.retain if retain else wave.customVars.store.release)(slots)
+
+    def undo(self) -> bool:
+        """Revert the most recent edit. Returns False if there is nothing to undo."""
+        if not self.undoStack:
+            return False
+        edit = self.undoStack.pop()
+        self.apply(edit, False)
+        self.redoStack.append(edit)
+        return True
+
+    def redo(self) -> bool:
+        """Make the most recently undone edit again. Returns False if there is nothing to redo."""
+        if not self.redoStack:
+            return False
+        edit = self.redoStack.pop()
+        self.apply(edit, True)
+        self.undoStack.append(edit)
+        return True
+
+    def apply(self, edit: Edit, forward: bool):
+        """Move every wave (and the viewport) the edit changed from one of its states to the other."""
+        changes = edit.waves if forward else edit.waves[::-1]
+        for wave, before, after in changes:
+            self.applyWaveState(wave, *((before, after) if forward else (after, before)))
+        if edit.viewport:
+            self.applyViewportState(edit.viewport[1 if forward else 0])
+        self.graphspace.menu.syncWaveEntries([wave for wave, _, _ in changes])
+
+    def applyWaveState(self, wave, current: WaveState, target: WaveState):
+        renamed = [variable[:2] for variable in target.variables] != [variable[:2] for variable in current.variables]
+        if renamed:
+            wave.customVars.restore({name: slot for name, slot, _, _ in target.variables})
+        currentValues = {slot: (value, incr) for _, slot, value, incr in current.variables}
+        for name, slot, value, incr in target.variables:
+            currentValue, currentIncr = currentValues.get(slot, (None, None))
+            if currentValue != value: # Only what the edit itself changed, e.g. not the value of a variable whose increment was edited
+                wave.customVars[name]["value"] = value
+            if currentIncr != incr:
+                wave.customVars[name]["incr"] = incr
+        wave.originalFunc = target.originalFunc
+        wave.termColor = target.termColor
+        if target.termColors:
+            wave.termColors = list(target.termColors)
+        wave.visible = target.visible
+        if target.func != wave.func or renamed:
+            wave.func = target.func
+            wave.refreshWaveFunction()
+        if current.index == -1 and target.index != -1:
+            self.graphspace.waves.insert(target.index, wave)
+            wave.customVars.setActive(True)
+        elif current.index != -1 and target.index == -1:
+            self.graphspace.removeWave(wave)
+
+    def applyViewportState(self, target: ViewportState):
+        graphspace = self.graphspace
+        graphspace.xRange, graphspace.yRange, graphspace.xPan, graphspace.yPan = target.xRange, target.yRange, target.xPan, target.yPan
+        graphspace.ppcMagnitude = target.ppcMagnitude
+        graphspace.stepSize = 1/math.pow(2, target.ppcMagnitude)
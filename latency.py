@@ -0,0 +1,112 @@
+"""
+[PyWaveCLI Module]
+latency.py -- Tracing the time from a keystroke arriving until the frame reflecting it reaches the terminal.
+Author: FrickTown (https://github.com/FrickTown/)
+"""
+from __future__ import annotations
+import collections
+import select
+import socket
+import threading
+import time
+import numpy
+from blessed import keyboard
+from metrics import METRICS, QUANTILES
+
+def getKeyType(keystroke: keyboard.Keystroke) -> str:
+    """The label a keystroke's latency is recorded under: the name of special keys (e.g. KEY_TAB), otherwise the character itself."""
+    return keystroke.name or str(keystroke)
+
+
+class KeyArrivalWatcher():
+    """KeyArrivalWatcher notes the moment input becomes readable on the keyboard's file descriptor, without reading it.
+    Keys pressed during a render are timestamped when they arrive rather than when the render loop reads them."""
+    def __init__(self, fd: int):
+        self.fd = fd
+        self.lock = threading.Lock()
+        self.arrival: float = None
+        self.consumed = threading.Event() # Set by the render loop once it has read the input the arrival belongs to
+        self.running = threading.Event()
+        self.wakeReader, self.wakeWriter = socket.socketpair()
+        self.thread: threading.Thread = None
+
+    def start(self):
+        self.running.set()
+        self.thread = threading.Thread(target=self.watchLoop, name="KeyArrivalWatcher", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running.clear()
+        self.wakeWriter.send(b"\0")
+        self.consumed.set()
+        self.thread.join()
+
+    def watchLoop(self):
+        while self.running.is_set():
+            readable, _, _ = select.select([self.fd, self.wakeReader], [], [])
+            if self.wakeReader in readable or not self.running.is_set():
+                continue
+            with self.lock:
+                if self.arrival is None:
+                    self.arrival = time.perf_counter()
+            self.consumed.wait() # The descriptor stays readable until the input is read, so don't watch it again before then
+            self.consumed.clear()
+
+    def takeArrival(self) -> float:
+        """Return when the input read since the last call arrived (or None if it wasn't seen), and start watching for the next."""
+        with self.lock:
+            arrival, self.arrival = self.arrival, None
+        self.consumed.set()
+        return arrival
+
+
+class LatencyTracer():
+    """LatencyTracer follows every keystroke from its arrival until the next frame, the first to reflect it, is flushed to the terminal.
+    The latencies are recorded in the METRICS summaries, per key type."""
+    window: int = 256 # Keystrokes the status line percentiles are computed over
+
+    def __init__(self, keyboardFd: int = None):
+        """Create a new LatencyTracer.
+
+        Args:
+            keyboardFd (int, optional): The terminal's keyboard file descriptor to watch for arriving input. Defaults to None,
+                in which case keystrokes are stamped when they are read, and the time they spent queued isn't known.
+        """
+        self.watcher = KeyArrivalWatcher(keyboardFd) if keyboardFd is not None else None
+        self.pending: list[tuple[str, float, float]] = [] # (key type, arrival, read) of keystrokes not yet on screen
+        self.latencies: collections.deque[float] = collections.deque(maxlen=self.window)
+        self.queued: collections.deque[float] = collections.deque(maxlen=self.window)
+        self.status = "[Key latency: -]"
+
+    def start(self):
+        if self.watcher:
+            self.watcher.start()
+
+    def stop(self):
+        if self.watcher:
+            self.watcher.stop()
+
+    def keyRead(self, keystroke: keyboard.Keystroke):
+        """Stamp a keystroke returned by the render loop's wait for input. To be called after every wait, with or without a key."""
+        readTime = time.perf_counter()
+        arrival = self.watcher.takeArrival() if self.watcher else None
+        if keystroke:
+            self.pending.append((getKeyType(keystroke), min(arrival or readTime, readTime), readTime))
+
+    def frameFlushed(self):
+        """Complete the trace of every pending keystroke. To be called once a frame has been written and flushed."""
+        if not self.pending:
+            return
+        flushTime = time.perf_counter()
+        for keyType, arrival, readTime in self.pending:
+            labels = (("key", keyType),)
+            METRICS.observe("pywavecli_input_latency_seconds", flushTime - arrival, labels)
+            METRICS.observe("pywavecli_input_queued_seconds", readTime - arrival, labels)
+            self.latencies.append(flushTime - arrival)
+            self.queued.append(readTime - arrival)
+        self.pending.clear()
+        latencies = numpy.quantile(self.latencies, (QUANTILES[0], QUANTILES[-1])) * 1000
+        self.status = f"[Key latency: p50 {latencies[0]:.1f} ms | p99 {latencies[1]:.1f} ms | queued p50 {numpy.median(self.queued) * 1000:.1f} ms]"
+
+    def getStatus(self) -> str:
+        return self.status
@@ -0,0 +1,110 @@
+"""
+[PyWaveCLI Module]
+lookahead.py -- A bounded queue of frames rendered ahead of time on a background thread, while the main loop presents the ones before them.
+Author: FrickTown (https://github.com/FrickTown/)
+"""
+from __future__ import annotations
+import collections
+import threading
+import numpy
+import params
+from metrics import METRICS
+
+class LookaheadQueue():
+    """LookaheadQueue produces frames ahead of the one on screen on a background thread, so that a slow frame is absorbed by the queue.
+    The state from before each frame is kept alongside it, so that discarding the queue is exact."""
+    def __init__(self, terminal, depth: int, store: params.ParameterStore = params.STORE):
+        """Create a new LookaheadQueue.
+
+        Args:
+            terminal (TerminalSpace): The terminal whose frames are produced ahead
+            depth (int): The maximum number of queued frames
+            store (params.ParameterStore, optional): The store holding the variables that producing a frame advances. Defaults to params.STORE.
+        """
+        self.terminal = terminal
+        self.depth = depth
+        self.store = store
+        self.frames: collections.deque[tuple[numpy.ndarray, list[tuple], tuple]] = collections.deque()
+        self.condition = threading.Condition()
+        self.running = False   # Whether frames may be produced, i.e. whether the render loop's thread leaves the scene alone
+        self.producing = False # Set while a frame is being produced
+        self.closed = False
+        self.error: BaseException = None # Raised again by pop, on the render loop's thread
+        self.thread: threading.Thread = None
+
+    def start(self):
+        """Produce frames until the queue is full. The scene must not be changed until pause is called."""
+        with self.condition:
+            self.running = True
+            self.condition.notify_all()
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.produceLoop, name="LookaheadQueue", daemon=True)
+            self.thread.start()
+
+    def pause(self):
+        """Stop producing frames, waiting for the one being produced to be queued, so that the scene can be changed."""
+        with self.condition:
+            self.running = False
+            self.condition.wait_for(lambda: not self.producing)
+
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.closed = True
+            self.condition.notify_all()
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+
+    def produceLoop(self):
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.closed or (self.running and len(self.frames) < self.depth and not self.error))
+                if self.closed:
+                    return
+                self.producing = True
+            frame = None
+            try:
+                frame = self.produce()
+            except BaseException as e:
+                self.error = e
+            finally:
+                with self.condition:
+                    if frame:
+                        self.frames.append(frame)
+                    self.producing = False
+                    self.condition.notify_all()
+
+    def produce(self) -> tuple:
+        """Produce the frame after the last queued one, along with the state from before it."""
+        values = self.store.values[:self.store.size].copy()
+        graphspaceStates = [(graphspace.trails.frame if graphspace.trails else None,
+                             graphspace.qualityGovernor.snapshot(graphspace.waves) if graphspace.qualityGovernor else None)
+                            for graphspace in self.terminal.graphspaces]
+        return (values, graphspaceStates, self.terminal.produceFrame())
+
+    def pop(self) -> tuple:
+        """Return the oldest queued frame, as returned by TerminalSpace.produceFrame, waiting for it if it is being produced.
+        Returns None if the queue is empty and paused."""
+        with self.condition:
+            self.condition.wait_for(lambda: self.frames or self.error or not (self.running or self.producing))
+            if self.error:
+                error, self.error = self.error, None
+                raise error
+            return self.frames.popleft()[2] if self.frames else None
+
+    def discard(self):
+        """Pause, then drop every queued frame and rewind the variables, quality governors and trails to the first of them.
+        The OutputGovernor only measures frames as they are written, so it never saw them."""
+        self.pause()
+        if not self.frames:
+            return
+        values, graphspaceStates, _ = self.frames[0]
+        self.store.values[:len(values)] = values
+        for graphspace, (trailFrame, governorState) in zip(self.terminal.graphspaces, graphspaceStates):
+            if graphspace.trails and trailFrame is not None:
+                graphspace.trails.rewind(trailFrame)
+            if graphspace.qualityGovernor and governorState is not None:
+                graphspace.qualityGovernor.restore(governorState)
+        METRICS.increment("pywavecli_lookahead_discarded", len(self.frames))
+        self.frames.clear()
@@ -6,13 +6,41 @@ Author: FrickTown (https://github.com/FrickTown/)
 from __future__ import annotations
 from blessed import Terminal, keyboard
 import os
+import sys
+import contextlib
 import menu
+import vecmath
+import params
 import copy
 import math
 import signal
+import numpy
+import time
+import argparse
+from governor import OutputGovernor, QualityGovernor, parseByteRate
+from samplecache import SamplePyramid
+from profiler import SamplingProfiler
+from metrics import METRICS, MetricsExporter
+from broadcast import BroadcastServer, runViewer
+from framecache import FrameCache, FRAME_CACHE_MEMORY
+from exprgraph import EvaluationGraph
+from preview import PREVIEW
+from lookahead import LookaheadQueue
+from history import History
+from control import ControlServer
+from latency import LatencyTracer
+from trails import PersistenceTrails
 
 FRAMERATE = 90 # Set maximum FPS (frames per second)
+PAN_STEP = (4, 2) # Columns and rows to move the viewport per arrow key press
+QUALITY_BUDGET = 0.5 / FRAMERATE # Time per frame that automatic PPC may spend on sampling and plotting waves
 POINTSIGN = "0"
+SYNC_BEGIN = "\x1b[?2026h" # Begin and end synchronized update, the terminal holds back drawing in between
+SYNC_END = "\x1b[?2026l"
+GHOSTSIGN = "·" # Marks the preview of a function that is being edited
+DENSITYSIGNS = ".:-=+*#%@" # Density mode's shading ramp, from a single sample in a cell to the most samples in any cell
+TRAIL_FRAMES = 64 # Frames that persistence trails fade out over
+KEY_BINDINGS = "[Menu: M] [Quit: Q] [Zoom: +/- ?/_] [PPC: K/k L/l] [Auto PPC: A] [Pan: Arrows/O] [Profile: P] [Density: H] [Trails: T] [Undo/Redo: U/Y] [Export: X]"
 
 class TerminalSpace(Terminal):
     """A TerminalSpace is the context object for manipulating the terminal's cells and cursor.
@@ -20,6 +48,15 @@ class TerminalSpace(Terminal):
     """
     buffer: list[list[str]] = []
     graphspaces: list[Graphspace] = []
+    governor: OutputGovernor = None
+    profiler: SamplingProfiler = None
+    broadcaster: BroadcastServer = None
+    frameCache: FrameCache = None
+    lookahead: LookaheadQueue = None
+    control: ControlServer = None
+    latencyTracer: LatencyTracer = None
+    notice: tuple[str, float] = None # Message about the last written profile or image, and until when to show it
+    synchronizedOutput: bool = False # Wrap every frame in DEC private mode 2026 (synchronized update), see probeSynchronizedOutput
 
     def __init__(self, kind = None, stream = None, force_styling = False):
         """Create a new TerminalSpace object.
@@ -31,6 +68,7 @@ class TerminalSpace(Terminal):
         """
         super().__init__(kind, stream, force_styling)
         self.buffer = [[" " for _ in range(self.width)] for _ in range(self.height-1)]
+        self.graphspaces = []
     
     # TODO: Handle resizing
     def handleResize(self, sig, action):
@@ -48,18 +86,144 @@ class TerminalSpace(Terminal):
         """
         Render a full frame to the TerminalSpace's buffer by rendering each graphspace and mapping them
         """
-        for gSpaceID, graphspace in enumerate(self.graphspaces, 1):
-            graphspace.renderFrame()
-            for idx, id in enumerate(graphspace.buffer):
-                self.buffer[idx] = id
-            graphspace.clearBuffer()
+        frame = self.lookahead.pop() if self.lookahead else None
+        self.presentFrame(*(frame or self.produceFrame()))
+
+    def produceFrame(self) -> tuple[list[str], list[str], float]:
+        """Render the next frame of every graphspace and advance the variables of every wave past it.
+
+        Returns:
+            tuple[list[str], list[str], float]: The cells of the first row (which the status line is written over), the other rows encoded, and the time it took
+        """
+        frameStart = time.perf_counter()
+        # Frames of a periodic animation that has already come full circle are replayed from the frame cache
+        stateKey = self.frameCache.getStateKey(self) if self.frameCache else None
+        cached = self.frameCache.get(stateKey) if stateKey else None
+        if(cached):
+            firstRow = cached.firstRow
+            rows = cached.rows
+        else:
+            for gSpaceID, graphspace in enumerate(self.graphspaces, 1):
+                graphspace.renderFrame()
+                for idx, id in enumerate(graphspace.buffer):
+                    self.buffer[idx] = id
+                graphspace.clearBuffer()
+            firstRow = list(self.buffer[0])
+            rows = self.encodeRows(self.buffer[1:])
+            if(stateKey):
+                self.frameCache.store(stateKey, firstRow, rows)
+
+        # Advance the variables of every wave in one vectorized step
+        params.STORE.step()
+        return (firstRow, rows, time.perf_counter() - frameStart)
+
+    def presentFrame(self, firstRow: list[str], rows: list[str], productionTime: float):
+        """Write the status line over a produced frame, and print it to the terminal (and any viewers)."""
+        presentStart = time.perf_counter()
+        statusRow = list(firstRow) # The status line is written into a copy, so cached rows (and the buffer of a frame being produced ahead) stay untouched
 
         # Render menu info in top left corner last
-        menubuffer = [self.underline + x + self.normal for x in list("[Menu: M] | [Quit: Q] | [Zoom-X: (+/-)] | [Zoom-Y: (?/_)] | [Adjust PPC: (K|k / L|l)]")]
-        for idx, id in enumerate(menubuffer):
-            self.buffer[0][idx] = id
+        menubuffer = [self.underline + x + self.normal for x in list(self.getStatusText())]
+        for idx, id in enumerate(menubuffer[:len(statusRow)]):
+            statusRow[idx] = id
         
-        self.printBufferToTerminal()
+        rows = self.encodeRows([statusRow]) + rows
+        self.printBufferToTerminal(rows)
+        if(self.latencyTracer):
+            self.latencyTracer.frameFlushed()
+        if(self.broadcaster):
+            self.broadcaster.publish(rows)
+        METRICS.recordFrame(productionTime + time.perf_counter() - presentStart, self.frameInterval())
+
+    def waitForInput(self, timeout: float) -> keyboard.Keystroke:
+        """Wait up to timeout seconds for a keystroke, while the lookahead queue keeps producing frames in the background.
+
+        Any keystroke discards the queue, since it may change what the next frames look like.
+        """
+        if(not self.lookahead):
+            return self.inkey(timeout=timeout)
+        if(not any(graphspace.showMenu for graphspace in self.graphspaces)): # Menus show the variables' current values
+            self.lookahead.start()
+        val = self.inkey(timeout=timeout)
+        if(val):
+            self.lookahead.discard()
+        return val
+
+    def getStatusText(self) -> str:
+        """Return the text of the status line: the state of any active governors and servers first, so that narrow terminals
+        cut off the key bindings rather than the state."""
+        statuses = []
+        if(self.governor):
+            statuses.append(self.governor.getStatus())
+        for graphspace in self.graphspaces:
+            if(graphspace.qualityGovernor):
+                statuses.append(graphspace.qualityGovernor.getStatus())
+            if(graphspace.trails):
+                statuses.append(graphspace.trails.getStatus())
+        if(self.broadcaster):
+            statuses.append(self.broadcaster.getStatus())
+        if(self.control):
+            statuses.append(self.control.getStatus())
+        if(self.latencyTracer):
+            statuses.append(self.latencyTracer.getStatus())
+        if(self.profiler):
+            statuses.append(self.profiler.getStatus())
+        if(self.notice and time.time() < self.notice[1]):
+            statuses.append(self.notice[0])
+        return " | ".join(statuses + [KEY_BINDINGS])
+
+    def toggleProfiler(self, prefix: str = None):
+        """Start sampling the calling thread, or stop sampling and write the profile to disk."""
+        if(self.profiler):
+            collapsedPath, summaryPath = self.profiler.stop()
+            self.profiler = None
+            self.notice = (f"[Profile written: {summaryPath}]", time.time() + 5)
+        else:
+            self.profiler = SamplingProfiler(prefix)
+            self.profiler.start()
+
+    def exportImage(self, graphspace: Graphspace, size: tuple[int, int]):
+        """Export a graphspace as it is shown to a PPM image named after the current time, in the working directory."""
+        from export import ImageExporter
+        path = f"pywavecli-{time.strftime('%Y%m%d-%H%M%S')}.ppm"
+        try:
+            ImageExporter(graphspace, *size).exportSequence(path)
+        except OSError as e:
+            self.notice = (f"[Export failed: {e.strerror}]", time.time() + 5)
+            return
+        self.notice = (f"[Image written: {path}]", time.time() + 5)
+
+    def probeSynchronizedOutput(self, timeout: float = 0.2) -> bool:
+        """Ask the terminal whether it supports synchronized updates (DEC private mode 2026), and use them if it does.
+        Terminals that don't answer within the timeout, and versions of blessed that can't ask, are assumed not to support them.
+        """
+        probe = getattr(self, "does_synchronized_output", None)
+        try:
+            self.synchronizedOutput = bool(probe and self.is_a_tty and probe(timeout=timeout))
+        except Exception:
+            self.synchronizedOutput = False
+        return self.synchronizedOutput
+
+    def frameInterval(self) -> float:
+        """The time to wait for input between frames."""
+        return self.governor.frameInterval() if self.governor else 1/FRAMERATE
+
+    def colorRamp(self, start: tuple[int, int, int], end: tuple[int, int, int], steps: int) -> list[str]:
+        """Create a list of terminal colors linearly interpolated between two RGB values.
+
+        Args:
+            start (tuple[int, int, int]): The RGB value of the first color
+            end (tuple[int, int, int]): The RGB value of the last color
+            steps (int): The amount of colors in the ramp
+
+        Returns:
+            list[str]: The ANSI codes of each color in the ramp
+        """
+        ramp = []
+        for step in range(steps):
+            t = step / (steps - 1) if steps > 1 else 0
+            ramp.append(self.color_rgb(*[round(a + (b - a) * t) for a, b in zip(start, end)]))
+        return ramp
 
     def addGraphspace(self, graphspace: Graphspace):
         """
@@ -69,13 +233,29 @@ class TerminalSpace(Terminal):
         """
         self.graphspaces.append(graphspace)
     
-    def printBufferToTerminal(self):
-        """Render the TerminalSpace's buffer to the terminal. To be called only when the frame has been fully rendered to the buffer."""
-        with self.location(0, 0):
-            for y in range(len(self.buffer)):
-                for x in range(len(self.buffer[y])):
-                    print(self.buffer[y][x], end="")
-                print("", end="\n")
+    def encodeRows(self, rows: list[list[str]]) -> list[str]:
+        return ["".join(row) for row in rows]
+
+    def printBufferToTerminal(self, rows: list[str] = None):
+        """Render the TerminalSpace's buffer to the terminal. To be called only when the frame has been fully rendered to the buffer.
+
+        Args:
+            rows (list[str], optional): The already encoded rows of the buffer (see encodeRows). Defaults to encoding them from the buffer.
+        """
+        frame = "".join([row + "\n" for row in (self.encodeRows(self.buffer) if rows is None else rows)])
+        if(self.governor):
+            frame = self.governor.filterFrame(frame)
+        # The cursor is hidden, so rather than saving and restoring it around the frame (which takes writes of their own), it's just sent home.
+        # The frame goes out in a single write, and with synchronized output the terminal only shows it once it has all of it.
+        frame = f"{SYNC_BEGIN}{self.home}{frame}{SYNC_END}" if self.synchronizedOutput else f"{self.home}{frame}"
+        writeStart = time.perf_counter()
+        self.stream.write(frame)
+        self.stream.flush()
+        writeTime = time.perf_counter() - writeStart
+        byteCount = len(frame.encode())
+        METRICS.increment("pywavecli_tty_bytes_written", byteCount)
+        if(self.governor):
+            self.governor.recordWrite(byteCount, writeTime)
      
     def printGraphSpace(self, xPos: int, yPos: int, graphspace: Graphspace | menu.Menu):
         """
@@ -104,15 +284,23 @@ class Graphspace():
     buffer: list[list[str]] = []
     showMenu: bool = False
     menu: menu.Menu = None
+    qualityGovernor: QualityGovernor = None
+    history: History = None
+    trails: PersistenceTrails = None
+    densityMode: bool = False # Shade cells by how many samples land in them, instead of marking every cell that is hit
 
     def __init__(self, parent: TerminalSpace, xCellCount: int, yCellCount: int, xRange:float, yRange: float, ppcMag: int):
         self.parentTerminal = parent
+        self.waves = []
         self.xCellCount = xCellCount
         self.yCellCount = yCellCount if (yCellCount % 2 != 0) else yCellCount - 1
         self.ppcMagnitude = 0 if ppcMag < 0 else ppcMag
         self.xRange = xRange
         self.yRange = yRange
+        self.xPan = 0 # The viewport's centre, in columns and rows away from the origin
+        self.yPan = 0
         self.stepSize = 1/math.pow(2, ppcMag)
+        self.history = History(self)
         self.clearBuffer()
         self.menu = menu.SelectionMenu(self)
         self.menu.addInfoEntry("   General   | Option:  (Up/Down) | Edit:        (E) |", parent.cadetblue1)
@@ -124,16 +312,38 @@ class Graphspace():
     def cartesianToGraphspace(self, x: float, y: float) -> tuple[int, int]:
         """Convert cartesian coordinates (x, y) to a column and row cell coordinate."""
         cellPointWidth = (self.xRange * 2) / self.xCellCount
-        xInCells = round(x / cellPointWidth)
+        xInCells = round(x / cellPointWidth) - self.xPan
         xAdjusted = int(round(self.xCellCount / 2) + xInCells)
 
         cellPointHeight = (self.yRange * 2)/(self.yCellCount)
-        yInCells = round(y / cellPointHeight)
+        yInCells = round(y / cellPointHeight) - self.yPan
         yAdjusted = int(round((self.yCellCount / 2)) - yInCells)
 
         if (yAdjusted < 0 or yAdjusted >= self.yCellCount or xAdjusted < 0 or xAdjusted >= self.xCellCount):
             return None
         return(xAdjusted, yAdjusted)
+
+    def cartesianToAbsolute(self, xs: numpy.ndarray, ys: numpy.ndarray) -> tuple[numpy.ndarray, numpy.ndarray]:
+        """Convert arrays of cartesian coordinates to absolute cells, i.e. columns and rows counted from the origin rather than the viewport.
+        Absolute cells only depend on the cell size, so they stay valid when panning."""
+        xs, ys = numpy.broadcast_arrays(xs, ys)
+        cellPointWidth = (self.xRange * 2) / self.xCellCount
+        cellPointHeight = (self.yRange * 2) / self.yCellCount
+        with numpy.errstate(invalid="ignore", over="ignore"):
+            return (numpy.rint(xs / cellPointWidth), numpy.rint(ys / cellPointHeight))
+
+    def absoluteToCells(self, absCols: numpy.ndarray, absRows: numpy.ndarray) -> tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]:
+        """Offset absolute cells by the viewport's centre, returning the columns, the rows and a mask of which cells fall inside the graphspace."""
+        with numpy.errstate(invalid="ignore"):
+            cols = round(self.xCellCount / 2) + absCols - self.xPan
+            rows = round(self.yCellCount / 2) - absRows + self.yPan
+            inside = (rows >= 0) & (rows < self.yCellCount) & (cols >= 0) & (cols < self.xCellCount) # NaN compares False and falls out here
+        return (numpy.where(inside, cols, 0).astype(int), numpy.where(inside, rows, 0).astype(int), inside)
+
+    def getSampleRange(self, stepSize: float) -> tuple[int, int]:
+        """Return the first and one-past-last grid position k (where x = k * stepSize) that lies within the viewport."""
+        xCentre = self.xPan * (self.xRange * 2) / self.xCellCount
+        return (math.ceil((xCentre - self.xRange) / stepSize), math.ceil((xCentre + self.xRange) / stepSize))
     
     def addWave(self, wave: Wave):
         """ Helper function for adding a wave function to the GraphSpace
@@ -141,14 +351,17 @@ class Graphspace():
             wave: The wave to add
         """
         self.waves.append(wave)
+        wave.customVars.setActive(True)
         self.menu.addWaveEntry(wave)
         self.menu.generateMenu()
     
     def addWaveFromEntry(self, waveEntry: menu.WaveEntry):
         self.waves.append(waveEntry.wave)
+        waveEntry.wave.customVars.setActive(True)
     
     def removeWave(self, wave: Wave):
         self.waves.pop(self.waves.index(wave))
+        wave.customVars.setActive(False)
 
     def clearBuffer(self):
         # Reset the graphics buffer
@@ -158,123 +371,374 @@ class Graphspace():
         self.printUIToBuffer()
         self.printWaves()
         if(self.showMenu):
+            self.printPreview()
             self.renderMenuToFrame(self.menu)
-        for wave in self.waves:
-            wave.updateVariables()
 
     def renderMenuToFrame(self, curMenu: menu.Menu):
         if(curMenu.activeSubmenu):
             self.renderMenuToFrame(curMenu.activeSubmenu)
-        for rowIdx, rowVal in enumerate(curMenu.buffer):
-            for colIdx, colVal in enumerate(rowVal):
-                self.buffer[curMenu.yRenderOffset + rowIdx+1][curMenu.xRenderOffset + colIdx] = colVal
+        for rowIdx, rowVal in enumerate(curMenu.buffer[:max(0, self.yCellCount - curMenu.yRenderOffset - 1)]): # Menus taller or wider than the graphspace are cut off
+            bufferRow = self.buffer[curMenu.yRenderOffset + rowIdx+1]
+            for colIdx, colVal in enumerate(rowVal[:max(0, self.xCellCount - curMenu.xRenderOffset)]):
+                bufferRow[curMenu.xRenderOffset + colIdx] = colVal
         if(curMenu.inputWindowOverride):
             men: menu.SelectionMenu = curMenu
             self.renderMenuToFrame(men.getSelectedEntry().inputWindow)
 
     
     def printWaves(self):
-        """Print all waves to the buffer for all values of x from -xRange to +xRange with a fixed stepSize."""
-        x = -self.xRange
-        while (x < self.xRange):
-            for wave in self.waves:
-                if not wave.visible: continue
-                cellPos = self.cartesianToGraphspace(x, wave.getY(x))
-                if cellPos != None: self.buffer[cellPos[1]][cellPos[0]] = f"{wave.termColor}{POINTSIGN}{self.parentTerminal.normal}"
-            x += self.stepSize
+        """Print all waves to the buffer for all values of x within the viewport, with each wave's stepSize.
+        Waves whose variables don't change reuse any samples they have cached at this or another sampling density,
+        and animated waves sampled on the same grid share the evaluation of the subexpressions they have in common."""
+        visibleWaves = [wave for wave in self.waves if wave.visible]
+        sharedYs, sharedCosts = self.evaluateSharedWaves(visibleWaves)
+        densityLayers = []
+        if(self.trails):
+            self.trails.begin(self)
+            self.trails.draw(self)
+        for wave in visibleWaves:
+            if(isinstance(wave, FieldWave)):
+                self.plotField(wave)
+                continue
+            stepSize = self.getStepSize(wave)
+            kStart, kStop = self.getSampleRange(stepSize)
+            waveStart = time.perf_counter() - sharedCosts.get(wave, 0)
+            if(wave.customVars.isStatic()):
+                ys, absCols, absRows = wave.samplePyramid.fetch((wave.func, tuple(wave.getArgs())), (self.xRange, self.yRange, self.xCellCount, self.yCellCount),
+                                                               self.getPPC(wave), kStart, kStop, wave.getYs, self.cartesianToAbsolute)
+            else:
+                xs = numpy.arange(kStart, kStop) * stepSize
+                ys = sharedYs[wave] if wave in sharedYs else wave.getYs(xs)
+                absCols, absRows = self.cartesianToAbsolute(xs, ys)
+            if(self.trails):
+                cols, rows, inside = self.absoluteToCells(absCols, absRows)
+                self.trails.record(wave, (rows * self.xCellCount + cols)[inside])
+            if(self.densityMode):
+                densityLayers.append((wave, absCols, absRows))
+            else:
+                self.plotCells(absCols, absRows, wave.getPointSigns(self.parentTerminal.normal))
+            if(self.qualityGovernor):
+                self.qualityGovernor.measure(wave, time.perf_counter() - waveStart, ys, (self.yRange * 2) / self.yCellCount, self.yCellCount)
+        if(densityLayers):
+            self.plotDensity(densityLayers)
+        if(self.trails):
+            self.trails.end()
+        if(self.qualityGovernor):
+            self.qualityGovernor.adjust(visibleWaves, self.ppcMagnitude)
+
+    def plotDensity(self, layers: list[tuple[Wave, numpy.ndarray, numpy.ndarray]]):
+        """Rasterize the samples of every wave as hit counts per cell, shaded along DENSITYSIGNS.
+
+        All samples are counted in a single bincount over (wave, cell) pairs. The shade of a cell is relative to the busiest cell,
+        on a logarithmic scale, and its color is that of the wave with the most samples in it.
+
+        Args:
+            layers (list[tuple[Wave, numpy.ndarray, numpy.ndarray]]): Each wave with the absolute columns and rows of its samples
+        """
+        cellCount = self.xCellCount * self.yCellCount
+        cellIds = []
+        for layerIdx, (wave, absCols, absRows) in enumerate(layers):
+            cols, rows, inside = self.absoluteToCells(absCols, absRows)
+            cellIds.append(layerIdx * cellCount + (rows * self.xCellCount + cols)[inside])
+        hits = numpy.bincount(numpy.concatenate(cellIds), minlength=len(layers) * cellCount).reshape(len(layers), cellCount)
+        totals = hits.sum(axis=0)
+        if not totals.any(): return
+        shades = numpy.floor(numpy.log(numpy.maximum(totals, 1)) / math.log(max(totals.max(), 2)) * (len(DENSITYSIGNS) - 1)).astype(int)
+        owners = hits.argmax(axis=0)
+        normal = self.parentTerminal.normal
+        signs = [[f"{wave.termColor}{sign}{normal}" for sign in DENSITYSIGNS] for wave, _, _ in layers]
+        for cellId in numpy.flatnonzero(totals).tolist():
+            self.buffer[cellId // self.xCellCount][cellId % self.xCellCount] = signs[owners[cellId]][shades[cellId]]
+
+    def toggleDensityMode(self):
+        self.densityMode = not self.densityMode
+
+    def toggleTrails(self, depth: int = TRAIL_FRAMES):
+        """Start or stop fading out the last frames of every wave behind the current one."""
+        self.trails = None if self.trails else PersistenceTrails(depth)
+
+    def printPreview(self):
+        """Print a ghost curve of the function being typed into an InputWindow, as last compiled in the background."""
+        deepestMenu = self.menu.recursiveSubMenuFetch()
+        if(not deepestMenu.inputWindowOverride):
+            return
+        inputWindow = deepestMenu.getSelectedEntry().inputWindow
+        functions = PREVIEW.getResult(inputWindow) if inputWindow and inputWindow.previewWave else None
+        if(functions is None or isinstance(inputWindow.previewWave, FieldWave)):
+            return
+        stepSize = self.getStepSize(inputWindow.previewWave)
+        xs = numpy.arange(*self.getSampleRange(stepSize)) * stepSize
+        ys = numpy.atleast_2d(inputWindow.previewWave.getYs(xs, functions))
+        self.plotSamples(xs, ys, [f"{self.parentTerminal.gray50}{GHOSTSIGN}{self.parentTerminal.normal}"] * ys.shape[0])
+
+    def evaluateSharedWaves(self, waves: list[Wave]) -> tuple[dict[Wave, numpy.ndarray], dict[Wave, float]]:
+        """Evaluate the animated waves that are sampled on the same grid through one EvaluationGraph per grid.
+
+        Returns:
+            tuple[dict[Wave, numpy.ndarray], dict[Wave, float]]: The samples of every wave evaluated through a graph, and each wave's share of the time it took
+        """
+        grids: dict[tuple[float, int, int], list[Wave]] = {}
+        for wave in waves:
+            if(type(wave) is Wave and not wave.customVars.isStatic()): # Families and fields bind arrays to their variables
+                stepSize = self.getStepSize(wave)
+                grids.setdefault((stepSize, *self.getSampleRange(stepSize)), []).append(wave)
+        sharedYs = {}
+        sharedCosts = {}
+        for (stepSize, kStart, kStop), gridWaves in grids.items():
+            if(len(gridWaves) < 2):
+                continue
+            graphStart = time.perf_counter()
+            graph = EvaluationGraph()
+            addedWaves = [wave for wave in gridWaves if graph.addWave(wave)]
+            if(len(addedWaves) < 2):
+                continue
+            xs = numpy.arange(kStart, kStop) * stepSize
+            try:
+                ysList = graph.evaluate(xs)
+            except Exception:
+                continue # Left to each wave's own evaluation, which falls back to the scalar function where needed
+            METRICS.increment("pywavecli_evaluations_saved", graph.getSavedEvaluations(len(xs)))
+            cost = (time.perf_counter() - graphStart) / len(addedWaves)
+            for wave, ys in zip(addedWaves, ysList):
+                METRICS.recordEvaluation(wave.func, ys)
+                sharedYs[wave] = ys
+                sharedCosts[wave] = cost
+        return (sharedYs, sharedCosts)
+
+    def getPPC(self, wave: Wave) -> float:
+        """Return the ppcMagnitude of a wave, which has its own when automatic PPC is active."""
+        return self.ppcMagnitude if wave.ppcMagnitude is None else wave.ppcMagnitude
+
+    def getStepSize(self, wave: Wave) -> float:
+        """Return the distance between samples of a wave."""
+        return 1/math.pow(2, self.getPPC(wave))
+
+    def toggleAutoPPC(self):
+        """Switch between the manual, global ppcMagnitude and a QualityGovernor picking one per wave."""
+        if(self.qualityGovernor):
+            self.qualityGovernor.release(self.waves)
+            self.qualityGovernor = None
+        else:
+            self.qualityGovernor = QualityGovernor(QUALITY_BUDGET)
+
+    def plotField(self, field: FieldWave):
+        """Print a FieldWave to the buffer, either as a heatmap or as the implicit curve f(x, y) = 0."""
+        cellPointWidth = (self.xRange * 2) / self.xCellCount
+        cellPointHeight = (self.yRange * 2) / self.yCellCount
+        # The absolute column and row of the top left cell. Rows count downwards, so that row index and y grow in opposite directions.
+        colStart = self.xPan - round(self.xCellCount / 2)
+        rowStart = -self.yPan - round(self.yCellCount / 2)
+        if(field.mode == "heatmap"):
+            values = field.evaluateGrid(cellPointWidth, -cellPointHeight, 0, 0, colStart, rowStart, self.xCellCount, self.yCellCount)
+            finite = numpy.isfinite(values)
+            if not finite.any(): return
+            low, high = field.valueRange if field.valueRange else (values[finite].min(), values[finite].max())
+            scaled = (numpy.clip(values, low, high) - low) / ((high - low) or 1)
+            rampIdx = numpy.where(finite, numpy.rint(scaled * (len(field.termColors) - 1)), -1).astype(int).tolist()
+            signs = [f"{color}█{self.parentTerminal.normal}" for color in field.termColors]
+            for rowIdx, row in enumerate(rampIdx):
+                bufferRow = self.buffer[rowIdx]
+                for colIdx, idx in enumerate(row):
+                    if idx >= 0: bufferRow[colIdx] = signs[idx]
+        else:
+            # Sample the cell corners, a cell is on the curve if the sign changes across it
+            signs = numpy.sign(field.evaluateGrid(cellPointWidth, -cellPointHeight, -cellPointWidth / 2, cellPointHeight / 2, colStart, rowStart, self.xCellCount + 1, self.yCellCount + 1))
+            corners = numpy.stack([signs[:-1, :-1], signs[:-1, 1:], signs[1:, :-1], signs[1:, 1:]])
+            with numpy.errstate(invalid="ignore"):
+                onCurve = corners.max(axis=0) > corners.min(axis=0) # NaN corners compare False
+            if(self.trails):
+                self.trails.record(field, numpy.flatnonzero(onCurve))
+            pointSign = f"{field.termColor}{POINTSIGN}{self.parentTerminal.normal}"
+            for rowIdx, colIdx in zip(*numpy.nonzero(onCurve)):
+                self.buffer[rowIdx][colIdx] = pointSign
+
+    def plotSamples(self, xs: numpy.ndarray, ys: numpy.ndarray, pointSigns: list[str]):
+        """Rasterize sampled values to the buffer.
+
+        Args:
+            xs (numpy.ndarray): The x values that were sampled
+            ys (numpy.ndarray): The sampled y values. Either one row per x, or a (members, x) matrix for wave families
+            pointSigns (list[str]): The (colored) string to print for each member. Later members are printed on top of earlier ones.
+        """
+        self.plotCells(*self.cartesianToAbsolute(xs, ys), pointSigns)
+
+    def plotCells(self, absCols: numpy.ndarray, absRows: numpy.ndarray, pointSigns: list[str]):
+        """Rasterize absolute cells (see cartesianToAbsolute) to the buffer, in the same layout as the samples passed to plotSamples."""
+        absCols, absRows = numpy.atleast_2d(absCols, absRows)
+        cols, rows, inside = self.absoluteToCells(absCols, absRows)
+        members = numpy.broadcast_to(numpy.arange(absRows.shape[0])[:, None], absRows.shape)
+        owner = numpy.full(self.xCellCount * self.yCellCount, -1)
+        numpy.maximum.at(owner, (rows * self.xCellCount + cols)[inside], members[inside])
+        for cellId in numpy.flatnonzero(owner >= 0).tolist():
+            self.buffer[cellId // self.xCellCount][cellId % self.xCellCount] = pointSigns[owner[cellId]]
     
     def printUIToBuffer(self):
         """Print the x and y axis, as well as other GUI elements."""
         width = len(self.buffer[0])
         height = len(self.buffer)
         
-        # Print the y-axis
-        for y in range(0,height):
-            self.buffer[y][round(width/2)] = "|"
+        # Print the y-axis and x-axis where the origin is, if it's in view
+        originX = round(width/2) - self.xPan
+        originY = round(height/2) + self.yPan
+        if(0 <= originX < width):
+            for y in range(0,height):
+                self.buffer[y][originX] = "|"
 
-        # Print the x-axis
-        for x in range(0, width):
-            self.buffer[round(height/2)][x] = "—"
+        if(0 <= originY < height):
+            for x in range(0, width):
+                self.buffer[originY][x] = "—"
 
         # Print the origin
-        self.buffer[round((height)/2)][round(width/2)] = "+"
+        if(0 <= originX < width and 0 <= originY < height):
+            self.buffer[originY][originX] = "+"
 
-        # Print the legend
-        rangeS = str(self.yRange)                                       # Get yRange as a string
-        rangeChars = list(rangeS)                                       # Turn the string into a list of chars
+        # Print the legend, showing the cartesian values at the edges of the viewport
+        xCentre = self.xPan * (self.xRange * 2) / self.xCellCount
+        yCentre = self.yPan * (self.yRange * 2) / self.yCellCount
         legendPadding = 0                                               # Allow for padding (So that the value is not directly on the edge of the screen)
-        xStart = round(width/2) - round(len(rangeS) / 2) - 1            # Find out where we're going to start mapping
-        for idx, x in enumerate(range(xStart, xStart + len(rangeS))):   # Map the values of rangeChars onto the GraphSpace buffer
-            self.buffer[0 + legendPadding][x] = rangeChars[idx]
-            self.buffer[-(1 + legendPadding)][x] = rangeChars[idx]
-        self.buffer[-(1 + legendPadding)][xStart-1] = '-'               # Remember negative sign
-
-        rangeS = str(self.xRange)                                       # Get xRange as a string
-        rangeChars = list(rangeS)                                       # Turn the string into a list of chars
-        xStart1 = 1                                                     # Decide the x coordinate for the negative xRange string
-        xStart2 = width - len(rangeChars)                               # Decide the x coordinate for the positive xRange string
+        for row, value in ((0 + legendPadding, yCentre + self.yRange), (-(1 + legendPadding), yCentre - self.yRange)):
+            rangeS = self.formatLegend(value)                           # Get the value as a string
+            digits = len(rangeS.lstrip("-"))
+            xStart = round(width/2) - round(digits / 2) - 1 - (len(rangeS) - digits) # Find out where we're going to start mapping, keeping any negative sign in front
+            for idx, x in enumerate(range(xStart, xStart + len(rangeS))): # Map the characters onto the GraphSpace buffer
+                self.buffer[row][x] = rangeS[idx]
+
         yVal = round(height/2) + 1                                      # (Change to - 1 to place text above the x-axis) (or 0 to place *on* the x-axis)
-        for idx, x in enumerate(range(0, len(rangeS))):                 # Map the values of rangeChars onto the GraphSpace buffer
-            self.buffer[yVal][xStart1 + x] = rangeChars[idx]
-            self.buffer[yVal][xStart2 + x] = rangeChars[idx]
-        self.buffer[yVal][xStart1-1] = '-'                              # Remember negative sign
+        leftS = self.formatLegend(xCentre - self.xRange)
+        rightS = self.formatLegend(xCentre + self.xRange)
+        for idx, x in enumerate(range(0, len(leftS))):
+            self.buffer[yVal][x] = leftS[idx]
+        for idx, x in enumerate(range(width - len(rightS), width)):
+            self.buffer[yVal][x] = rightS[idx]
+
+    def formatLegend(self, value: float) -> str:
+        return f"{round(value, 2):g}"
         
     def alterScale(self, xy: str, delta: int):
+        with self.history.edit(viewport=True):
+            self.rescale(xy, delta)
+
+    def rescale(self, xy: str, delta: float):
+        """Change the range of an axis without recording it in the history, e.g. for the control socket."""
+        # Keep the viewport centred on the same cartesian point, as closely as the new cell size allows
         if(xy == "x"):
+            xCentre = self.xPan * (self.xRange * 2) / self.xCellCount
             self.xRange += delta
+            self.xPan = round(xCentre / ((self.xRange * 2) / self.xCellCount))
         elif(xy == "y"):
+            yCentre = self.yPan * (self.yRange * 2) / self.yCellCount
             self.yRange += delta
+            self.yPan = round(yCentre / ((self.yRange * 2) / self.yCellCount))
+
+    def pan(self, columns: int, rows: int):
+        """Move the viewport's centre by a number of columns (rightwards) and rows (upwards)."""
+        with self.history.edit(viewport=True):
+            self.xPan += columns
+            self.yPan += rows
+
+    def resetPan(self):
+        with self.history.edit(viewport=True):
+            self.xPan = 0
+            self.yPan = 0
     
     def alterPPC(self, delta: int):
-        self.ppcMagnitude += delta if self.ppcMagnitude + delta >= 0 else 0
-        self.stepSize = 1/math.pow(2, self.ppcMagnitude)
+        with self.history.edit(viewport=True):
+            self.ppcMagnitude += delta if self.ppcMagnitude + delta >= 0 else 0
+            self.stepSize = 1/math.pow(2, self.ppcMagnitude)
 
 class Wave():
     """ Wave Class : Contains a function f(x) and methods to evaluate it."""
     def __init__(self, func: str, termColor: str, customVars: dict[dict[str, "value": float, "incr": float]], visible: bool = True):
         self.func = func
         self.termColor = termColor
-        self.customVars: dict = customVars
-        self.originalVars: dict = copy.deepcopy(customVars)
+        self.customVars: params.VariablesView = params.VariablesView(customVars)
         self.originalFunc = str(func)
-        lambdafied = "lambda x, "
-        for av in customVars.keys():
-            lambdafied += f"{av},"
-        lambdafied = lambdafied[:-1] + ":"
-        self.lambdafied = lambdafied + func
+        self.lambdafied = self.getLambdafied(func)
         self.asFunction = eval(self.lambdafied)
+        self.asVectorFunction = vecmath.compileVectorized(self.lambdafied)
         self.visible = visible
+        self.ppcMagnitude: float = None # Set by a QualityGovernor, otherwise the graphspace's ppcMagnitude is used
+        self.samplePyramid = SamplePyramid()
+
+    def getArgNames(self) -> list[str]:
+        """Return the names of the arguments that follow x in the wave's lambda function."""
+        return list(self.customVars.keys())
+
+    def getArgs(self) -> list:
+        """Return the current values of the arguments that follow x in the wave's lambda function."""
+        return self.customVars.getValues().tolist()
+
+    def getLambdafied(self, func: str) -> str:
+        """Turn a function string into the source of a lambda taking x and each custom variable."""
+        lambdafied = "lambda x, "
+        for av in self.getArgNames():
+            lambdafied += f"{av},"
+        return lambdafied[:-1] + ":" + func
     
     def getY(self, x):
-        vars = [x] + [l[1]["value"] for l in self.customVars.items()] # Fetch the current value of x and each custom variable into a list of strings 
+        vars = [x] + self.getArgs() # Fetch the current value of x and each custom variable into a list of strings 
         return self.asFunction(*vars) # Unpack the list into the lambda function to get the current value of the function
-        
+
+    def getYs(self, xs: numpy.ndarray, functions: tuple = None) -> numpy.ndarray:
+        """Evaluate the wave for every x in xs in one vectorized call. Samples that can't be evaluated are NaN.
+
+        Args:
+            xs (numpy.ndarray): The x values to sample at
+            functions (tuple, optional): A (vector function, scalar function) pair from compileFunction to evaluate instead of the wave's own.
+        """
+        return self.evaluate(xs, self.getArgs(), functions)
+
+    def evaluate(self, xs: numpy.ndarray, args: list, functions: tuple = None) -> numpy.ndarray:
+        """Evaluate the wave function with vecmath.evaluate, recording the number of samples (and failed samples) in the metrics."""
+        if functions is not None:
+            return vecmath.evaluate(*functions, xs, args)
+        ys = vecmath.evaluate(self.asVectorFunction, self.asFunction, xs, args)
+        METRICS.recordEvaluation(self.func, ys)
+        return ys
+
+    def getPointSigns(self, normal: str) -> list[str]:
+        """Return the string(s) to print in the cells that the wave passes through, one per row of getYs."""
+        return [f"{self.termColor}{POINTSIGN}{normal}"]
+
+    def getMenuText(self) -> str:
+        return self.func
     
     def updateVariables(self):
-        for key in self.customVars.keys():
-            self.customVars[key].update({"value": self.customVars[key]["value"] + self.customVars[key]["incr"]})
+        self.customVars.step()
 
     def resetWave(self):
         self.func = str(self.originalFunc)
-        for var in self.originalVars.keys():
-            for key in self.originalVars[var]:
-                self.customVars[var][key] = self.originalVars[var][key]
+        self.customVars.reset()
         self.refreshWaveFunction()
     
     def refreshWaveFunction(self):
-        lambdafied = "lambda x, "
-        for av in self.customVars.keys():
-            lambdafied += f"{av},"
-        lambdafied = lambdafied[:-1] + ":"
-        self.lambdafied = lambdafied + self.func
+        self.lambdafied = self.getLambdafied(self.func)
         self.asFunction = eval(self.lambdafied)
+        self.asVectorFunction = vecmath.compileVectorized(self.lambdafied)
     
     def getCopy(self):
-        return copy.deepcopy(self)
+        duplicate = copy.copy(self) # Strings and compiled functions are immutable and can be shared, the variables can not
+        duplicate.customVars = self.customVars.copy()
+        duplicate.samplePyramid = SamplePyramid()
+        return duplicate
 
     def getFunc(self):
         return self.func()
     
+    def compileFunction(self, func: str) -> tuple:
+        """Compile a function string against the wave's variables and test-call it, raising an exception if it can't be evaluated.
+
+        Returns:
+            tuple: The vector function and the scalar function, in the order taken by vecmath.evaluate
+        """
+        lambdafied = self.getLambdafied(func)
+        asFunction = eval(lambdafied)
+        asVectorFunction = vecmath.compileVectorized(lambdafied)
+        vars = [0] + self.getArgs()
+        tryCalling = asFunction(*vars)
+        tryCalling / 10
+        return (asVectorFunction, asFunction)
+
     def tryUpdateWaveFunction(self, newFunc: str, newVars: dict[str:dict[str:float]]) -> bool:
         """Try to set a new wave function.
 
@@ -285,29 +749,217 @@ class Wave():
         Returns:
             bool: If the new wave function is evaluatable by eval, returns True. Else False.
         """
-        lambdafied = "lambda x "
-        for av in self.customVars.keys():
-            lambdafied += f",{av} "
-        lambdafied = lambdafied[:-1] + ":"
-        lambdafied = lambdafied + newFunc
         try: 
-            asFunction = eval(lambdafied)
-            vars = [0] + [l[1]["value"] for l in self.customVars.items()]
-            tryCalling = asFunction(*vars)
-            tryCalling / 10
-            pass
-
+            functions = self.compileFunction(newFunc)
         except Exception as e:
             return False
-        self.lambdafied = lambdafied
-        self.func = newFunc
-        self.asFunction = asFunction
+        self.setFunction(newFunc, functions)
         return True
 
+    def setFunction(self, func: str, functions: tuple):
+        """Replace the wave function with one already compiled by compileFunction."""
+        self.lambdafied = self.getLambdafied(func)
+        self.func = func
+        self.asVectorFunction, self.asFunction = functions
+
+
+class WaveFamily(Wave):
+    """ WaveFamily Class : A single function f(x) plotted once for every member of a parameter sweep, evaluated in one broadcast pass."""
+    def __init__(self, func: str, termColors: list[str], customVars: dict[dict[str, "value": float, "incr": float]], sweepVars: dict[str, list[float]], visible: bool = True):
+        """Create a new WaveFamily.
+
+        Args:
+            func (str): The function shared by all members
+            termColors (list[str]): The color ramp that members are mapped onto, e.g. from TerminalSpace.colorRamp
+            customVars (dict): The animated variables shared by all members, in the same format as for Wave
+            sweepVars (dict[str, list[float]]): The per-member values of each swept variable. All lists must be of equal length.
+            visible (bool, optional): Defaults to True.
+        """
+        self.sweepNames = list(sweepVars.keys())
+        self.sweepValues = numpy.array([sweepVars[name] for name in self.sweepNames], dtype=float).T.reshape(-1, len(self.sweepNames))
+        self.memberCount = self.sweepValues.shape[0]
+        self.termColors = termColors
+        super().__init__(func, termColors[0], customVars, visible)
+
+    def getArgNames(self) -> list[str]:
+        return super().getArgNames() + self.sweepNames
+
+    def getArgs(self) -> list:
+        return super().getArgs() + [float(v) for v in self.sweepValues[0]] # Scalar evaluation uses the first member
+
+    def getYs(self, xs: numpy.ndarray, functions: tuple = None) -> numpy.ndarray:
+        """Evaluate every member of the family in one broadcast pass, returning a (members, len(xs)) matrix."""
+        sweepColumns = [self.sweepValues[:, idx][:, None] for idx in range(len(self.sweepNames))]
+        args = super().getArgs() + sweepColumns
+        return self.evaluate(numpy.asarray(xs)[None, :], args, functions)
+
+    def getPointSigns(self, normal: str) -> list[str]:
+        return [f"{self.termColors[idx * len(self.termColors) // self.memberCount]}{POINTSIGN}{normal}" for idx in range(self.memberCount)]
+
+    def getMenuText(self) -> str:
+        return f"{self.func} [{self.memberCount}x]"
+
+    def getSweepInfo(self) -> list[str]:
+        """Describe the range of each swept variable, for display in the menu."""
+        return [f"{name}: {self.sweepValues[:, idx].min():.3f} .. {self.sweepValues[:, idx].max():.3f}" for idx, name in enumerate(self.sweepNames)]
+
+
+class FieldWave(Wave):
+    """ FieldWave Class : Contains a function f(x, y), plotted over the whole graphspace as a heatmap or as the implicit curve f(x, y) = 0.
+    It is evaluated in cached tiles of cells, which are reused while panning."""
+    tileWidth: int = 64
+    tileHeight: int = 32
+
+    def __init__(self, func: str, termColors: list[str], customVars: dict[dict[str, "value": float, "incr": float]], mode: str = "implicit", valueRange: tuple[float, float] = None, visible: bool = True):
+        """Create a new FieldWave.
+
+        Args:
+            func (str): The function of x and y
+            termColors (list[str]): The color ramp that values are mapped onto in heatmap mode. The first color is used in implicit mode.
+            customVars (dict): The custom variables, in the same format as for Wave
+            mode (str, optional): "heatmap" or "implicit". Defaults to "implicit".
+            valueRange (tuple[float, float], optional): The values mapped to the ends of the color ramp. Defaults to None, the range of the visible values.
+            visible (bool, optional): Defaults to True.
+        """
+        self.termColors = termColors
+        self.mode = mode
+        self.valueRange = valueRange
+        self.tileCache: dict[tuple[int, int], numpy.ndarray] = {}
+        self.tileCacheKey = None
+        super().__init__(func, termColors[0], customVars, visible)
+
+    def getArgNames(self) -> list[str]:
+        return ["y"] + super().getArgNames()
+
+    def getArgs(self) -> list:
+        return [0.0] + super().getArgs() # Scalar evaluation happens along the x-axis
+
+    def getMenuText(self) -> str:
+        return f"{self.func} = 0" if self.mode == "implicit" else f"heatmap: {self.func}"
+
+    def getCopy(self):
+        duplicate = super().getCopy()
+        duplicate.tileCache = {}
+        duplicate.tileCacheKey = None
+        return duplicate
+
+    def evaluateGrid(self, dx: float, dy: float, xOffset: float, yOffset: float, colStart: int, rowStart: int, colCount: int, rowCount: int) -> numpy.ndarray:
+        """Evaluate the function over a window of the global grid x = col * dx + xOffset, y = row * dy + yOffset, one tile at a time.
+
+        Tiles are aligned to the global grid rather than the window, so a window that has moved (e.g. by panning)
+        only evaluates the tiles it doesn't share with the previous one. Tiles that fall out of the window are dropped.
+
+        Args:
+            dx (float): The distance in x between grid columns
+            dy (float): The distance in y between grid rows
+            xOffset (float): The x of grid column 0
+            yOffset (float): The y of grid row 0
+            colStart (int): The grid column of the window's first column
+            rowStart (int): The grid row of the window's first row
+            colCount (int): The width of the window
+            rowCount (int): The height of the window
+
+        Returns:
+            numpy.ndarray: A (rowCount, colCount) matrix of values
+        """
+        args = super().getArgs()
+        cacheKey = (self.func, tuple(args), dx, dy, xOffset, yOffset)
+        if(cacheKey != self.tileCacheKey):
+            self.tileCache.clear()
+            self.tileCacheKey = cacheKey
+        grid = numpy.empty((rowCount, colCount))
+        usedTiles = {}
+        for tileRow in range(rowStart // self.tileHeight, (rowStart + rowCount - 1) // self.tileHeight + 1):
+            for tileCol in range(colStart // self.tileWidth, (colStart + colCount - 1) // self.tileWidth + 1):
+                tile = self.tileCache.get((tileRow, tileCol))
+                if tile is None:
+                    tileXs = (numpy.arange(self.tileWidth) + tileCol * self.tileWidth) * dx + xOffset
+                    tileYs = (numpy.arange(self.tileHeight) + tileRow * self.tileHeight) * dy + yOffset
+                    tile = self.evaluate(tileXs[None, :], [tileYs[:, None]] + args)
+                usedTiles[(tileRow, tileCol)] = tile
+                # Copy the part of the tile that overlaps the window
+                r0, c0 = tileRow * self.tileHeight, tileCol * self.tileWidth
+                top, left = max(r0, rowStart), max(c0, colStart)
+                bottom, right = min(r0 + self.tileHeight, rowStart + rowCount), min(c0 + self.tileWidth, colStart + colCount)
+                grid[top - rowStart:bottom - rowStart, left - colStart:right - colStart] = tile[top - r0:bottom - r0, left - c0:right - c0]
+        self.tileCache = usedTiles
+        return grid
+
+
+def parseImageSize(text: str) -> tuple[int, int]:
+    """Parse an image size such as "1920x1080" into its width and height."""
+    width, height = (int(size) for size in text.lower().split("x"))
+    if width <= 0 or height <= 0:
+        raise ValueError(f"Image sizes must be positive, got {text}")
+    return (width, height)
+
+def parseArgs() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Mathematical plotting in the terminal.")
+    parser.add_argument("--bandwidth", type=parseByteRate, default=None, metavar="BYTES",
+                        help="Keep terminal output below this many bytes per second (e.g. 200k), for slow remote sessions.")
+    parser.add_argument("--profile", nargs="?", const="", default=None, metavar="PREFIX",
+                        help="Start the sampling profiler (also toggled with P) at launch. Output goes to PREFIX.collapsed and PREFIX.txt.")
+    parser.add_argument("--metrics-file", metavar="PATH", help="Periodically write render metrics to PATH in the Prometheus text format.")
+    parser.add_argument("--metrics-socket", metavar="PATH", help="Serve render metrics in the Prometheus text format on a UNIX socket at PATH.")
+    parser.add_argument("--serve", metavar="PATH", help="Share the session with viewers connecting to a UNIX socket at PATH.")
+    parser.add_argument("--alternate-screen", action="store_true",
+                        help="Render on the alternate screen, leaving the shell's screen untouched, with synchronized updates if the terminal supports them.")
+    parser.add_argument("--trace-latency", action="store_true",
+                        help="Measure the time from each keystroke until it shows on screen, in the status line and the metrics.")
+    parser.add_argument("--control", metavar="PATH", help="Accept batches of commands changing the waves and viewport on a UNIX socket at PATH (see control.py).")
+    parser.add_argument("--view", metavar="PATH", help="Instead of running a session, view the one shared on the UNIX socket at PATH. Press Q to stop viewing.")
+    parser.add_argument("--frame-cache", nargs="?", type=parseByteRate, const=FRAME_CACHE_MEMORY, default=0, metavar="BYTES",
+                        help="Replay the frames of periodic animations from a cache of at most BYTES (default 64M).")
+    parser.add_argument("--trails", nargs="?", type=int, const=TRAIL_FRAMES, default=None, metavar="FRAMES",
+                        help=f"Show persistence trails (also toggled with T) at launch, fading out over FRAMES frames (default {TRAIL_FRAMES}).")
+    parser.add_argument("--lookahead", type=int, default=0, metavar="FRAMES",
+                        help="Render up to this many frames ahead on a background thread, so that slow frames don't cause stutter.")
+    parser.add_argument("--export", metavar="PATH", help="Instead of running a session, export the example scene to a PPM (or .pgm) image at PATH.")
+    parser.add_argument("--export-size", type=parseImageSize, default="3840x2160", metavar="WIDTHxHEIGHT",
+                        help="The size of the images exported with --export or the X key (default 3840x2160).")
+    parser.add_argument("--export-frames", type=int, default=1, metavar="FRAMES", help="Export an animation of this many frames as a numbered image sequence.")
+    parser.add_argument("--cache-memory", type=parseByteRate, default=SamplePyramid.memoryCap, metavar="BYTES",
+                        help="Maximum size of the samples cached per static wave (e.g. 16M).")
+    return parser.parse_args()
+
+def exportScene(args: argparse.Namespace):
+    """Export the example scene, with the same waves and ranges as the live view, to one or more image files."""
+    from export import ImageExporter
+    from examples import addWaves
+    term = TerminalSpace(force_styling=True) # Colors are read from the styled sequences of the waves
+    addWaves(term)
+    width, height = args.export_size
+    exporter = ImageExporter(term.graphspaces[0], width, height)
+    started = time.perf_counter()
+    paths = exporter.exportSequence(args.export, args.export_frames, lambda path: print(f"Wrote {path}"))
+    print(f"Exported {len(paths)} frame(s) of {width}x{height} in {time.perf_counter() - started:.1f} s")
 
 def main():
+    args = parseArgs()
+    if(args.view):
+        runViewer(args.view)
+        return
+    if(args.export):
+        exportScene(args)
+        return
+    SamplePyramid.memoryCap = args.cache_memory
     term = TerminalSpace()
-    with term.hidden_cursor():
+    if(args.bandwidth):
+        term.governor = OutputGovernor(term, args.bandwidth, FRAMERATE)
+    if(args.frame_cache):
+        term.frameCache = FrameCache(args.frame_cache)
+    if(args.lookahead > 0):
+        term.lookahead = LookaheadQueue(term, args.lookahead)
+    exporters = [MetricsExporter(path, useSocket) for path, useSocket in ((args.metrics_file, False), (args.metrics_socket, True)) if path]
+    for exporter in exporters:
+        exporter.start()
+    if(args.serve):
+        term.broadcaster = BroadcastServer(args.serve)
+        term.broadcaster.start()
+    if(args.control):
+        term.control = ControlServer(args.control, term)
+        term.control.start()
+    with term.hidden_cursor(), (term.fullscreen() if args.alternate_screen else contextlib.nullcontext()):
         
         if(os.name != "nt"): # Resize event handler only available on Linux / MacOS
             signal.signal(signal.SIGWINCH, term.handleResize)
@@ -319,8 +971,17 @@ def main():
         addWaves(term)
 
         with term.cbreak():
+            if(args.alternate_screen):
+                term.probeSynchronizedOutput()
+            if(args.trace_latency): # Started after probing, whose answer would otherwise look like a keystroke
+                term.latencyTracer = LatencyTracer(sys.stdin.fileno() if sys.stdin.isatty() else None)
+                term.latencyTracer.start()
+            if(args.profile is not None):
+                term.toggleProfiler(args.profile or None)
             val = keyboard.Keystroke("")
             mainGS = term.graphspaces[0]
+            if(args.trails):
+                mainGS.toggleTrails(args.trails)
             while True:
                 deepestMenu = mainGS.menu.recursiveSubMenuFetch()
                 # Root (no menu) functionality keybinds
@@ -344,13 +1005,55 @@ def main():
                         mainGS.alterPPC(0.1)
                     elif(val.lower() == "l"):
                         mainGS.alterPPC(0.5)
+                    elif(val.lower() == "a"):
+                        mainGS.toggleAutoPPC()
+                    elif(val.lower() == "o"):
+                        mainGS.resetPan()
+                    elif(val.lower() == "p"):
+                        term.toggleProfiler()
+                    elif(val.lower() == "h"):
+                        mainGS.toggleDensityMode()
+                    elif(val.lower() == "t"):
+                        mainGS.toggleTrails(args.trails or TRAIL_FRAMES)
+                    elif(val.lower() == "u"):
+                        mainGS.history.undo()
+                    elif(val.lower() == "y"):
+                        mainGS.history.redo()
+                    elif(val.lower() == "x"):
+                        term.exportImage(mainGS, args.export_size)
+                elif(val.name and not mainGS.showMenu): # Arrow keys pan the viewport while the menu is hidden
+                    if(val.name == "KEY_LEFT"):
+                        mainGS.pan(-PAN_STEP[0], 0)
+                    elif(val.name == "KEY_RIGHT"):
+                        mainGS.pan(PAN_STEP[0], 0)
+                    elif(val.name == "KEY_UP"):
+                        mainGS.pan(0, PAN_STEP[1])
+                    elif(val.name == "KEY_DOWN"):
+                        mainGS.pan(0, -PAN_STEP[1])
                 if(mainGS.showMenu and val != ""):
                     mainGS.menu.handleInput(val)
                 if(mainGS.showMenu and val == "" and type(deepestMenu.getSelectedEntry()) is menu.ArgValEntry):
                     deepestMenu.generateMenu()
 
+                if(term.control): # Batches received during the last frame are applied together, right before the next one
+                    term.control.applyPending()
                 term.render()
-                val = term.inkey(timeout=(1/FRAMERATE))
-            os.system("cls||clear")
+                val = term.waitForInput(term.frameInterval())
+                if(term.latencyTracer):
+                    term.latencyTracer.keyRead(val)
+            if(term.profiler):
+                term.toggleProfiler()
+            for exporter in exporters:
+                exporter.stop()
+            if(term.broadcaster):
+                term.broadcaster.stop()
+            if(term.control):
+                term.control.stop()
+            if(term.latencyTracer):
+                term.latencyTracer.stop()
+            if(term.lookahead):
+                term.lookahead.stop()
+            if(not args.alternate_screen): # Leaving the alternate screen restores the shell's screen by itself
+                os.system("cls||clear")
 if __name__ == "__main__":
     main()
\ No newline at end of file
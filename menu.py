@@ -6,8 +6,9 @@ Author: FrickTown (https://github.com/FrickTown/)
 from __future__ import annotations
 from blessed import keyboard
 import math
-import copy
 import main
+from metrics import METRICS
+from preview import PREVIEW
 from abc import ABC, abstractmethod
 
 class Menu(ABC):
@@ -101,6 +102,7 @@ class SelectionMenu(Menu):
 
     def generateMenu(self):
         """ Uses all current menu data to generate a frame buffer. Should only be called when menu's data has changed in any way."""
+        METRICS.increment("pywavecli_menu_rebuilds", labels=(("menu", "selection"),))
         if(self.parentMenu):
             self.xRenderOffset = self.parentMenu.xRenderOffset + len(self.parentMenu.buffer[0])
         self.buffer = []
@@ -236,6 +238,29 @@ class SelectionMenu(Menu):
 
         self.generateMenu()
     
+    def syncWaveEntries(self, changedWaves: list[main.Wave]):
+        """Bring the wave entries of the root menu in line with the graphspace's waves, after they were changed outside of the menu (e.g. by an undo).
+
+        Args:
+            changedWaves (list[main.Wave]): The waves whose entries and submenus are out of date
+        """
+        entries = {entry.wave: entry for entry in self.menuEntries if type(entry) is WaveEntry}
+        selected = self.getSelectedEntry()
+        self.activeSubmenu = None # The submenu may belong to a wave that is gone, or list variables that are
+        if any(wave not in entries or wave not in self.graphSpace.waves for wave in changedWaves):
+            self.menuEntries = [entry for entry in self.menuEntries if type(entry) is not WaveEntry] + [entries.get(wave) or WaveEntry(self, wave) for wave in self.graphSpace.waves]
+            for entry in self.menuEntries:
+                entry.active = False
+            selectable = self.getSelectableEntries()
+            self.activeIndex = None
+            if selectable:
+                self.selectIndex(self.menuEntries.index(selected if selected in selectable else selectable[-1]))
+        for entry in self.menuEntries:
+            if type(entry) is WaveEntry and entry.wave in changedWaves:
+                entry.color = entry.wave.termColor
+                entry.createSubMenu()
+        self.generateMenu()
+
     # TODO: If the input concerns entries of a specific type, pass it along to that entry instead of cluttering this method.
     def handleInput(self, keyval: keyboard.Keystroke):
         """Defines the input handling for this Menu subclass (SelectionMenu)
@@ -270,19 +295,22 @@ class SelectionMenu(Menu):
             elif(keyname == "KEY_TAB"):
                 if(type(self.getSelectedEntry()) is WaveEntry):
                     sel: WaveEntry = self.getSelectedEntry()
-                    sel.wave.visible = not sel.wave.visible
+                    with self.graphSpace.history.edit([sel.wave]):
+                        sel.wave.visible = not sel.wave.visible
                 return
             elif(keyname == "KEY_DELETE"):
                 if(type(self.getSelectedEntry()) is WaveEntry):
                     sel: WaveEntry = self.getSelectedEntry()
-                    self.graphSpace.removeWave(sel.wave)
+                    with self.graphSpace.history.edit([sel.wave]):
+                        self.graphSpace.removeWave(sel.wave)
                     self.removeEntry(sel)
                 return
         
         if(keyval.lower() == "r"):
             if(type(self.getSelectedEntry()) is WaveEntry):
                 wav: WaveEntry = self.getSelectedEntry()
-                wav.wave.resetWave()
+                with self.graphSpace.history.edit([wav.wave]):
+                    wav.wave.resetWave()
                 self.generateMenu()
 
         elif(keyval.lower() == " "):
@@ -323,7 +351,9 @@ class SelectionMenu(Menu):
         elif(keyval.lower() == "d"):
             if(type(self.getSelectedEntry()) is WaveEntry):
                 selected: WaveEntry = self.getSelectedEntry()
-                self.graphSpace.addWave(selected.wave.getCopy())
+                duplicate = selected.wave.getCopy()
+                with self.graphSpace.history.edit([duplicate]):
+                    self.graphSpace.addWave(duplicate)
                 self.generateMenu()
 
     def select(self, change: int):
@@ -413,6 +443,7 @@ class InputWindow(Menu):
         self.xRenderOffset = round(self.graphSpace.xCellCount / 2) - round(self.minWidth/2) - self.hPadding
         self.yRenderOffset = round(self.graphSpace.yCellCount / 2) - round(self.minHeight/2) + self.vPadding
         self.invalid = False
+        self.previewWave: main.Wave = None # If set, the text is previewed as a function of this wave while typing
     
     def generateDecorations(self):
         self.decorations = {
@@ -454,6 +485,7 @@ class InputWindow(Menu):
 
     def generateMenu(self):
         """ Uses all current menu data to generate a frame buffer. Should only be called when menu's data has changed in any way."""
+        METRICS.increment("pywavecli_menu_rebuilds", labels=(("menu", "input"),))
         self.buffer = []
 
         if(len(self.valueBuffer)+1 > self.minWidth):
@@ -490,6 +522,7 @@ class InputWindow(Menu):
         keyword arguments:
             keyval -- The keystroke read from stdin
         """
+        previousValue = "".join(self.valueBuffer)
         if(keyval.name):
             keyname = keyval.name
             if(keyname == "KEY_ENTER"):
@@ -516,6 +549,9 @@ class InputWindow(Menu):
         elif(keyval.isprintable()):
             self.invalid = False
             self.addToVal(keyval.lower())
+        value = "".join(self.valueBuffer)
+        if(self.previewWave and self.parentEntry.inputWindow is self and value != previousValue):
+            PREVIEW.submit(self, lambda: self.previewWave.compileFunction(value)) # Compiled in the background, see Graphspace.printPreview
         self.generateMenu()
 
 
@@ -604,7 +640,7 @@ class WaveEntry(SelectableEntry):
         self.colorAsRGB: tuple[int,int,int] = (-1,-1,-1)
     
     def getEntryText(self):
-        return self.wave.func
+        return self.wave.getMenuText()
 
     def getMenuRow(self):
         padOut = [" " for _ in range((self.parent.minWidth) - len(self.getEntryText()))] # How many additional whitespaces do we need to print from the end of the function string to the end of the menu?
@@ -622,6 +658,11 @@ class WaveEntry(SelectableEntry):
         self.subMenu.addInfoEntry(f"Custom variables:", self.parent.graphSpace.parentTerminal.color_rgb(180,180,255))
         for var in self.wave.customVars.keys():
             self.subMenu.addArgEntry(self.wave, var)
+        if(isinstance(self.wave, main.WaveFamily)):
+            self.subMenu.addInfoEntry(f"", self.parent.graphSpace.parentTerminal.color_rgb(180,180,225))
+            self.subMenu.addInfoEntry(f"Swept variables ({self.wave.memberCount} members):", self.parent.graphSpace.parentTerminal.color_rgb(180,180,255))
+            for info in self.wave.getSweepInfo():
+                self.subMenu.addInfoEntry(info, self.parent.graphSpace.parentTerminal.color_rgb(180,180,225))
         self.subMenu.addInfoEntry(f"", self.parent.graphSpace.parentTerminal.color_rgb(180,180,225))
         self.subMenu.addInfoEntry(f"New: (N) | Edit: (E)", self.parent.graphSpace.parentTerminal.color_rgb(180,180,225))
         self.subMenu.generateMenu()
@@ -632,6 +673,8 @@ class WaveEntry(SelectableEntry):
             if len(values) != 3 or len(input) > 11:
                 return False 
             self.wave.termColor = self.parent.graphSpace.parentTerminal.color_rgb(*values)
+            if(isinstance(self.wave, main.WaveFamily)):
+                self.wave.termColors = [self.wave.termColor] # A set color replaces the family's color ramp
             self.color = self.wave.termColor
             self.colorAsRGB = values
         except Exception:
@@ -639,6 +682,7 @@ class WaveEntry(SelectableEntry):
         return True
 
     def onInputWindowConfirm(self, input: str, args: tuple) -> bool:
+        with self.parent.graphSpace.history.edit([self.wave]): # Covers edits, color changes and newly added waves
             if(len(args)):
                 if(args[0] == "color" and not self.tryUpdateColor(input)):
                    return False
@@ -665,6 +709,7 @@ class WaveEntry(SelectableEntry):
         self.inputWindow = InputWindow(self, title, *args)
         if not (len(args) and args[0] == "color"):
             self.inputWindow.setValueBuffer(list(self.wave.func))
+            self.inputWindow.previewWave = self.wave
         else:
             self.inputWindow.setValueBuffer(list("255,255,255") if self.colorAsRGB[0] == -1 else list(",".join(self.colorAsRGB)))
 
@@ -707,16 +752,17 @@ class ArgEntry(SelectableEntry):
         if(len(args)):
             if(args[0] == "newVar" or args[0] == "edit"):
                 if (not (input.isalpha())) or len(input) < 1 or input == "x" or len(input.split(" ")) != 1: return False # Don't allow funky characters, blank, or x as variable names (messes with eval)
-                if(self.wave.customVars.__contains__(input)): return False
-                self.wave.customVars.update({input: self.argRow})
-                self.wave.originalVars.update({input: self.argRow})
-                if(args[0] == "edit" and self.argName != input):
-                    self.wave.func = self.wave.func.replace(self.argName, input)
-                    self.wave.originalFunc = self.wave.originalFunc.replace(self.argName, input)
-                    self.wave.originalVars.pop(self.argName)
-                    self.wave.customVars.pop(self.argName)
-                self.argName = input
-                self.wave.refreshWaveFunction()
+                if(self.wave.getArgNames().__contains__(input)): return False
+                with self.parent.graphSpace.history.edit([self.wave]):
+                    if(args[0] == "newVar"):
+                        self.wave.customVars.add(input, self.argRow["value"], self.argRow["incr"])
+                        self.argRow = self.wave.customVars[input]
+                    if(args[0] == "edit" and self.argName != input):
+                        self.wave.func = self.wave.func.replace(self.argName, input)
+                        self.wave.originalFunc = self.wave.originalFunc.replace(self.argName, input)
+                        self.wave.customVars.rename(self.argName, input)
+                    self.argName = input
+                    self.wave.refreshWaveFunction()
                 self.createSubMenu()
             self.parent.refreshSelfAndParents()
             
@@ -751,7 +797,7 @@ class ArgValEntry(SelectableEntry):
         return self.argEntry.argRow[self.argKey]
     
     def setValue(self, val):
-        self.argEntry.wave.customVars[self.argEntry.argName].update({self.argKey: val})
+        self.argEntry.argRow[self.argKey] = val
 
     def getEntryText(self):
         return (self.argKey, '{0:.5f}'.format(self.getValue()))
@@ -779,7 +825,8 @@ class ArgValEntry(SelectableEntry):
             newValue = tryParse()
         except Exception:
             return False
-        self.setValue(newValue)
+        with self.parent.graphSpace.history.edit([self.argEntry.wave]):
+            self.setValue(newValue)
         self.parent.inputWindowOverride = False
         self.inputWindow = None
         self.parent.generateMenu()
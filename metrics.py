@@ -0,0 +1,209 @@
+"""
+[PyWaveCLI Module]
+metrics.py -- Counters and gauges describing the health of the render loop, exported in the Prometheus text format.
+Author: FrickTown (https://github.com/FrickTown/)
+"""
+from __future__ import annotations
+import collections
+import os
+import socket
+import threading
+import time
+import numpy
+
+# name: (type, help). Counters are exported with the _total suffix, in their HELP and TYPE lines as well as in their samples.
+METRIC_INFO = {
+    "pywavecli_frames_rendered": ("counter", "Frames rendered and written to the terminal."),
+    "pywavecli_frames_dropped": ("counter", "Frame intervals missed because rendering a frame took longer than the frame interval."),
+    "pywavecli_frame_seconds": ("summary", "Time spent rendering and writing a frame, over the most recent frames."),
+    "pywavecli_wave_evaluations": ("counter", "Samples evaluated, per wave function."),
+    "pywavecli_wave_evaluations_per_second": ("gauge", "Samples evaluated per second over the last export interval, per wave function."),
+    "pywavecli_wave_evaluation_errors": ("counter", "Samples that evaluated to NaN or infinity, e.g. math domain errors, per wave function."),
+    "pywavecli_tty_bytes_written": ("counter", "Bytes written to the terminal."),
+    "pywavecli_menu_rebuilds": ("counter", "Calls to generateMenu, per kind of menu."),
+    "pywavecli_evaluations_saved": ("counter", "Samples not evaluated because waves on the same grid shared a common subexpression."),
+    "pywavecli_lookahead_discarded": ("counter", "Frames rendered ahead that were discarded because of input."),
+    "pywavecli_frame_cache_hits": ("counter", "Frames of a periodic animation replayed from the frame cache instead of being rendered."),
+    "pywavecli_control_commands": ("counter", "Commands received on the control socket and applied."),
+    "pywavecli_input_latency_seconds": ("summary", "Time from a keystroke arriving until the frame reflecting it was flushed to the terminal, per key, over the most recent keystrokes."),
+    "pywavecli_input_queued_seconds": ("summary", "Part of the input latency a keystroke spent waiting to be read, e.g. behind a frame being rendered, per key."),
+    "pywavecli_trail_bytes": ("gauge", "Memory taken up by the frames kept for persistence trails."),
+}
+QUANTILES = (0.5, 0.9, 0.99)
+
+def formatLabels(labels: tuple[tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    escaped = [(key, str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")) for key, value in labels]
+    return "{" + ",".join(f"{key}=\"{value}\"" for key, value in escaped) + "}"
+
+class Metrics():
+    """Metrics collects counters and frame times from the render loop, under a lock that is never held during I/O.
+    Formatting and writing them is left to a MetricsExporter."""
+    frameWindow: int = 1024 # Frames the frame time quantiles are computed over
+    observationWindow: int = 256 # Observations the quantiles of other summaries are computed over, per label set
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters: dict[tuple[str, tuple], float] = collections.defaultdict(float)
+        self.gauges: dict[tuple[str, tuple], float] = {}
+        self.frameTimes: collections.deque[float] = collections.deque(maxlen=self.frameWindow)
+        self.frameTimeSum = 0.0
+        self.observations: dict[tuple[str, tuple], collections.deque[float]] = {}
+        self.observationTotals: dict[tuple[str, tuple], list[float]] = collections.defaultdict(lambda: [0.0, 0]) # [sum, count]
+
+    def increment(self, name: str, amount: float = 1, labels: tuple[tuple[str, str], ...] = ()):
+        with self.lock:
+            self.counters[(name, labels)] += amount
+
+    def recordFrame(self, seconds: float, frameInterval: float):
+        """Account for one rendered frame, counting every frame interval it overran as a dropped frame."""
+        with self.lock:
+            self.counters[("pywavecli_frames_rendered", ())] += 1
+            self.counters[("pywavecli_frames_dropped", ())] += int(seconds // frameInterval) if frameInterval > 0 else 0
+            self.frameTimes.append(seconds)
+            self.frameTimeSum += seconds
+
+    def recordEvaluation(self, func: str, ys: numpy.ndarray):
+        """Account for the samples of one evaluation of a wave function, counting the ones that aren't finite as errors."""
+        labels = (("wave", func),)
+        errors = ys.size - numpy.count_nonzero(numpy.isfinite(ys))
+        with self.lock:
+            self.counters[("pywavecli_wave_evaluations", labels)] += ys.size
+            self.counters[("pywavecli_wave_evaluation_errors", labels)] += errors
+
+    def observe(self, name: str, value: float, labels: tuple[tuple[str, str], ...] = ()):
+        """Add an observation to a summary, such as pywavecli_input_latency_seconds."""
+        with self.lock:
+            if (name, labels) not in self.observations:
+                self.observations[(name, labels)] = collections.deque(maxlen=self.observationWindow)
+            self.observations[(name, labels)].append(value)
+            totals = self.observationTotals[(name, labels)]
+            totals[0] += value
+            totals[1] += 1
+
+    def setGauge(self, name: str, value: float, labels: tuple[tuple[str, str], ...] = ()):
+        with self.lock:
+            self.gauges[(name, labels)] = value
+
+    def snapshot(self) -> tuple[dict, dict, list[float], float, dict]:
+        """Copy the current values, so that they can be formatted without holding the lock."""
+        with self.lock:
+            observations = {key: (list(values), *self.observationTotals[key]) for key, values in self.observations.items()}
+            return (dict(self.counters), dict(self.gauges), list(self.frameTimes), self.frameTimeSum, observations)
+
+    def format(self) -> str:
+        """Return all metrics in the Prometheus text exposition format."""
+        counters, gauges, frameTimes, frameTimeSum, observations = self.snapshot()
+        samples: dict[str, list[str]] = collections.defaultdict(list)
+        for (name, labels), value in sorted(counters.items()):
+            samples[name].append(f"{name}_total{formatLabels(labels)} {value:g}")
+        for (name, labels), value in sorted(gauges.items()):
+            samples[name].append(f"{name}{formatLabels(labels)} {value:g}")
+        name = "pywavecli_frame_seconds"
+        if frameTimes:
+            for quantile, value in zip(QUANTILES, numpy.quantile(frameTimes, QUANTILES)):
+                samples[name].append(f"{name}{formatLabels((('quantile', quantile),))} {value:.6f}")
+        samples[name].append(f"{name}_sum {frameTimeSum:.6f}")
+        samples[name].append(f"{name}_count {counters.get(('pywavecli_frames_rendered', ()), 0):g}")
+        for (name, labels), (values, total, count) in sorted(observations.items()):
+            for quantile, value in zip(QUANTILES, numpy.quantile(values, QUANTILES)):
+                samples[name].append(f"{name}{formatLabels(labels + (('quantile', quantile),))} {value:.6f}")
+            samples[name].append(f"{name}_sum{formatLabels(labels)} {total:.6f}")
+            samples[name].append(f"{name}_count{formatLabels(labels)} {count:g}")
+
+        lines = []
+        for name, (metricType, description) in METRIC_INFO.items():
+            family = f"{name}_total" if metricType == "counter" else name # The family has to match the name of its samples
+            lines.append(f"# HELP {family} {description}")
+            lines.append(f"# TYPE {family} {metricType}")
+            lines.extend(samples[name])
+        return "\n".join(lines) + "\n"
+
+METRICS = Metrics()
+
+
+class MetricsExporter():
+    """MetricsExporter publishes a Metrics instance from a background thread, either to a file replaced atomically once per interval
+    (e.g. for the node_exporter textfile collector) or over a UNIX socket answering with HTTP (`curl --unix-socket <path> http://localhost/metrics`)."""
+    interval: float = 1.0 # Seconds between file writes and evaluation rate updates
+
+    def __init__(self, path: str, useSocket: bool = False, metrics: Metrics = METRICS):
+        """Create a new MetricsExporter.
+
+        Args:
+            path (str): The file to write to, or the path of the UNIX socket to listen on
+            useSocket (bool, optional): Serve the metrics over a UNIX socket rather than writing them to a file. Defaults to False.
+            metrics (Metrics, optional): The metrics to export. Defaults to the global METRICS.
+        """
+        self.path = path
+        self.useSocket = useSocket
+        self.metrics = metrics
+        self.running = threading.Event()
+        self.thread: threading.Thread = None
+        self.server: socket.socket = None
+        self.lastRateUpdate = time.perf_counter()
+        self.lastEvaluations: dict[tuple, float] = {}
+
+    def start(self):
+        if self.useSocket:
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+            self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.server.bind(self.path)
+            self.server.listen()
+            self.server.settimeout(self.interval)
+        self.running.set()
+        self.thread = threading.Thread(target=self.exportLoop, name="MetricsExporter", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running.clear()
+        self.thread.join()
+        if self.server:
+            self.server.close()
+            os.unlink(self.path)
+
+    def exportLoop(self):
+        while self.running.is_set():
+            if time.perf_counter() - self.lastRateUpdate >= self.interval:
+                self.updateRates()
+                if not self.useSocket:
+                    self.writeFile()
+            if self.useSocket:
+                self.serveConnection()
+            else:
+                time.sleep(self.interval / 4)
+
+    def updateRates(self):
+        """Derive the evaluations per second of each wave function from the counters since the last update."""
+        now = time.perf_counter()
+        elapsed = now - self.lastRateUpdate
+        counters = self.metrics.snapshot()[0]
+        evaluations = {labels: value for (name, labels), value in counters.items() if name == "pywavecli_wave_evaluations"}
+        for labels, value in evaluations.items():
+            self.metrics.setGauge("pywavecli_wave_evaluations_per_second", (value - self.lastEvaluations.get(labels, 0)) / elapsed, labels)
+        self.lastEvaluations = evaluations
+        self.lastRateUpdate = now
+
+    def writeFile(self):
+        temporaryPath = f"{self.path}.{os.getpid()}.tmp"
+        with open(temporaryPath, "w") as metricsFile:
+            metricsFile.write(self.metrics.format())
+        os.replace(temporaryPath, self.path)
+
+    def serveConnection(self):
+        """Answer at most one connection, waiting no longer than the interval for it."""
+        try:
+            connection, _ = self.server.accept()
+        except socket.timeout:
+            return
+        with connection:
+            try:
+                connection.settimeout(self.interval)
+                connection.recv(4096) # The request itself is ignored, every path returns the metrics
+                body = self.metrics.format().encode()
+                header = f"HTTP/1.0 200 OK\r\nContent-Type: text/plain; version=0.0.4\r\nContent-Length: {len(body)}\r\n\r\n"
+                connection.sendall(header.encode() + body)
+            except OSError:
+                pass
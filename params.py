@@ -0,0 +1,207 @@
+"""
+[PyWaveCLI Module]
+params.py -- A central struct-of-arrays store for the custom variables of every wave, and the lightweight views that waves and menu entries read it through.
+Author: FrickTown (https://github.com/FrickTown/)
+"""
+from __future__ import annotations
+import numpy
+import weakref
+
+class ParameterStore():
+    """ParameterStore keeps the value and increment of every custom variable in contiguous arrays, one slot per variable.
+    Slots are reference counted, so that a slot still referenced by e.g. an undoable edit isn't reused when its variable is removed."""
+    def __init__(self, capacity: int = 64):
+        self.values = numpy.zeros(capacity)
+        self.incrs = numpy.zeros(capacity)
+        self.originalValues = numpy.zeros(capacity)
+        self.originalIncrs = numpy.zeros(capacity)
+        self.active = numpy.zeros(capacity, dtype=bool)
+        self.refs = numpy.zeros(capacity, dtype=int)
+        self.size = 0
+        self.freeSlots: list[int] = []
+
+    def grow(self):
+        """Double the capacity of every array."""
+        capacity = len(self.values)
+        for name in ("values", "incrs", "originalValues", "originalIncrs", "active", "refs"):
+            old = getattr(self, name)
+            new = numpy.zeros(capacity * 2, dtype=old.dtype)
+            new[:capacity] = old
+            setattr(self, name, new)
+
+    def allocate(self, value: float, incr: float, active: bool = False) -> int:
+        """Reserve a slot for a variable, using its value and increment as its originals.
+
+        Returns:
+            int: The slot of the new variable
+        """
+        if self.freeSlots:
+            slot = self.freeSlots.pop()
+        else:
+            if self.size == len(self.values):
+                self.grow()
+            slot = self.size
+            self.size += 1
+        self.values[slot] = self.originalValues[slot] = value
+        self.incrs[slot] = self.originalIncrs[slot] = incr
+        self.active[slot] = active
+        self.refs[slot] = 1
+        return slot
+
+    def retain(self, slots: list[int]):
+        """Add a reference to slots, which keeps them from being reused until it is released."""
+        for slot in slots:
+            self.refs[slot] += 1
+
+    def release(self, slots: list[int]):
+        """Drop a reference to slots. Slots without references are handed back to the store so they can be reused."""
+        for slot in slots:
+            self.refs[slot] -= 1
+            if self.refs[slot] == 0:
+                self.active[slot] = False
+                self.incrs[slot] = 0
+                self.freeSlots.append(slot)
+
+    def copySlots(self, slots: list[int], active: bool = False) -> list[int]:
+        """Allocate new slots holding the same current and original values as the given slots."""
+        newSlots = [self.allocate(self.values[slot], self.incrs[slot], active) for slot in slots]
+        self.originalValues[newSlots] = self.originalValues[slots]
+        self.originalIncrs[newSlots] = self.originalIncrs[slots]
+        return newSlots
+
+    def step(self, slots: numpy.ndarray = None):
+        """Advance the value of every active variable (or only the given slots) by its increment."""
+        if slots is None:
+            numpy.add(self.values, self.incrs, out=self.values, where=self.active)
+        else:
+            self.values[slots] += self.incrs[slots]
+
+    def reset(self, slots: numpy.ndarray):
+        """Restore the values and increments of the given slots to their originals."""
+        self.values[slots] = self.originalValues[slots]
+        self.incrs[slots] = self.originalIncrs[slots]
+
+STORE = ParameterStore()
+
+
+class VariableView():
+    """Dict-like view of a single variable in a ParameterStore, readable and writable as {"value": ..., "incr": ...}."""
+    __slots__ = ("store", "slot")
+    KEYS = ("value", "incr")
+    FIELDS = {"value": "values", "incr": "incrs"}
+
+    def __init__(self, store: ParameterStore, slot: int):
+        self.store = store
+        self.slot = slot
+
+    def __getitem__(self, key: str) -> float:
+        return float(getattr(self.store, self.FIELDS[key])[self.slot])
+
+    def __setitem__(self, key: str, value: float):
+        getattr(self.store, self.FIELDS[key])[self.slot] = value
+
+    def __iter__(self):
+        return iter(self.KEYS)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.FIELDS
+
+    def keys(self):
+        return self.KEYS
+
+    def items(self):
+        return [(key, self[key]) for key in self.KEYS]
+
+    def update(self, row: dict):
+        for key, value in row.items():
+            self[key] = value
+
+
+class VariablesView():
+    """Dict-like view of all custom variables of one wave, mapping each variable name to a VariableView.
+    Variable order is insertion order, which is also the order of the arguments in the wave's lambda function."""
+    def __init__(self, variables: dict[str, dict[str, float]], store: ParameterStore = STORE):
+        self.store = store
+        self.active = False
+        self.names: dict[str, int] = {}
+        self.slotList: list[int] = [] # Mutated in place so the finalizer below always releases the current slots
+        self.refreshSlots()
+        for name, row in variables.items():
+            self.add(name, row["value"], row["incr"])
+        weakref.finalize(self, store.release, self.slotList)
+
+    def refreshSlots(self):
+        self.slotList[:] = self.names.values()
+        self.slots = numpy.array(self.slotList, dtype=int)
+
+    def add(self, name: str, value: float, incr: float):
+        """Add a new variable, whose value and increment also become its originals."""
+        self.names[name] = self.store.allocate(value, incr, self.active)
+        self.refreshSlots()
+
+    def remove(self, name: str):
+        slot = self.names.pop(name)
+        self.store.active[slot] = False
+        self.store.release([slot])
+        self.refreshSlots()
+
+    def rename(self, oldName: str, newName: str):
+        """Rename a variable while keeping its position in the argument order."""
+        self.names = {(newName if name == oldName else name): slot for name, slot in self.names.items()}
+
+    def restore(self, names: dict[str, int]):
+        """Point the view at a previous set of variables, e.g. when undoing an edit. The slots must still be referenced, see History."""
+        oldSlots = set(self.slotList)
+        self.store.retain([slot for slot in names.values() if slot not in oldSlots])
+        droppedSlots = [slot for slot in oldSlots if slot not in names.values()]
+        self.store.active[droppedSlots] = False
+        self.store.release(droppedSlots)
+        self.names = dict(names)
+        self.refreshSlots()
+        self.setActive(self.active)
+
+    def setActive(self, active: bool):
+        """Include (or exclude) this wave's variables in ParameterStore.step."""
+        self.active = active
+        self.store.active[self.slots] = active
+
+    def getValues(self) -> numpy.ndarray:
+        return self.store.values[self.slots]
+
+    def step(self):
+        self.store.step(self.slots)
+
+    def isStatic(self) -> bool:
+        """True if none of the variables change from frame to frame."""
+        return not self.store.incrs[self.slots].any()
+
+    def reset(self):
+        self.store.reset(self.slots)
+
+    def copy(self) -> VariablesView:
+        """Create a view over freshly allocated slots holding the same current and original values."""
+        duplicate = VariablesView({}, self.store)
+        duplicate.names = dict(zip(self.names.keys(), self.store.copySlots(self.slotList)))
+        duplicate.refreshSlots()
+        return duplicate
+
+    def asDict(self) -> dict[str, dict[str, float]]:
+        return {name: {"value": view["value"], "incr": view["incr"]} for name, view in self.items()}
+
+    def __getitem__(self, name: str) -> VariableView:
+        return VariableView(self.store, self.names[name])
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.names
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def keys(self):
+        return self.names.keys()
+
+    def items(self) -> list[tuple[str, VariableView]]:
+        return [(name, VariableView(self.store, slot)) for name, slot in self.names.items()]
@@ -0,0 +1,60 @@
+"""
+[PyWaveCLI Module]
+preview.py -- Debounced background compilation of the function being typed, for previewing it while editing.
+Author: FrickTown (https://github.com/FrickTown/)
+"""
+from __future__ import annotations
+import threading
+import time
+import weakref
+
+class PreviewCompiler():
+    """PreviewCompiler compiles the text of an InputWindow on a background thread, so that typing never waits on compilation.
+    Only the newest job is kept, and results are dropped if newer keystrokes arrived while they were compiled."""
+    debounce: float = 0.15 # Seconds without keystrokes before the text is compiled
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.job: tuple = None   # (owner, compile, submit time)
+        self.generation = 0
+        self.results: weakref.WeakKeyDictionary[object, tuple] = weakref.WeakKeyDictionary() # Last valid result per owner, shown while the text is invalid
+        self.thread: threading.Thread = None
+
+    def submit(self, owner, compile):
+        """Replace any pending job with a new one.
+
+        Args:
+            owner (object): The object the result belongs to, e.g. the InputWindow being typed in
+            compile (callable): Compiles the text and returns the result, raising an exception if the text is invalid
+        """
+        with self.condition:
+            self.job = (owner, compile, time.perf_counter())
+            self.generation += 1
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.workLoop, name="PreviewCompiler", daemon=True)
+                self.thread.start()
+            self.condition.notify()
+
+    def getResult(self, owner):
+        """Return the last valid result compiled for an owner, or None."""
+        with self.condition:
+            return self.results.get(owner)
+
+    def workLoop(self):
+        while True:
+            with self.condition:
+                while self.job is None or time.perf_counter() < self.job[2] + self.debounce:
+                    self.condition.wait(None if self.job is None else self.job[2] + self.debounce - time.perf_counter())
+                owner, compile, _ = self.job
+                self.job = None
+                generation = self.generation
+            try:
+                result = compile()
+            except Exception:
+                continue
+            with self.condition:
+                if generation == self.generation: # Stale if anything was typed while compiling
+                    self.results[owner] = result
+            del owner, compile
+
+PREVIEW = PreviewCompiler()
@@ -0,0 +1,88 @@
+"""
+[PyWaveCLI Module]
+profiler.py -- A low-overhead sampling profiler that can be started and stopped from inside the running application.
+Author: FrickTown (https://github.com/FrickTown/)
+"""
+from __future__ import annotations
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+class SamplingProfiler():
+    """SamplingProfiler periodically records the call stack of one thread (by default the one that created it) from a background thread.
+    Nothing is written to the terminal, the samples are written to files when it is stopped."""
+    interval: float = 0.005 # Seconds between samples
+    topCount: int = 25      # Functions listed in the summary
+
+    def __init__(self, prefix: str = None, threadId: int = None):
+        """Create a new SamplingProfiler.
+
+        Args:
+            prefix (str, optional): Path prefix of the output files. Defaults to pywavecli-profile-<timestamp> in the working directory.
+            threadId (int, optional): The thread to sample. Defaults to the calling thread.
+        """
+        self.prefix = prefix or time.strftime("pywavecli-profile-%Y%m%d-%H%M%S")
+        self.threadId = threadId or threading.get_ident()
+        self.stacks: Counter[tuple[str, ...]] = Counter()
+        self.sampleCount = 0
+        self.running = threading.Event()
+        self.thread: threading.Thread = None
+
+    def start(self):
+        self.running.set()
+        self.thread = threading.Thread(target=self.sampleLoop, name="SamplingProfiler", daemon=True)
+        self.thread.start()
+
+    def stop(self) -> tuple[str, str]:
+        """Stop sampling and write the output files.
+
+        Returns:
+            tuple[str, str]: The paths of the collapsed stack file and the summary file
+        """
+        self.running.clear()
+        self.thread.join()
+        return self.writeOutput()
+
+    def sampleLoop(self):
+        while self.running.is_set():
+            frame = sys._current_frames().get(self.threadId)
+            if frame is not None:
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                self.stacks[tuple(reversed(stack))] += 1
+                self.sampleCount += 1
+                del frame
+            time.sleep(self.interval)
+
+    def writeOutput(self) -> tuple[str, str]:
+        """Write <prefix>.collapsed, in the stack format read by flamegraph tools ("outer;inner;leaf count" per line),
+        and <prefix>.txt, the functions with the most samples by self time and by inclusive time."""
+        collapsedPath = self.prefix + ".collapsed"
+        summaryPath = self.prefix + ".txt"
+        with open(collapsedPath, "w") as collapsedFile:
+            for stack, count in self.stacks.most_common():
+                collapsedFile.write(";".join(stack) + f" {count}\n")
+
+        selfSamples: Counter[str] = Counter()
+        inclusiveSamples: Counter[str] = Counter()
+        for stack, count in self.stacks.items():
+            selfSamples[stack[-1]] += count
+            for function in set(stack): # Recursive functions only count once per sample
+                inclusiveSamples[function] += count
+        total = max(self.sampleCount, 1)
+        with open(summaryPath, "w") as summaryFile:
+            summaryFile.write(f"{self.sampleCount} samples, one every {self.interval * 1000:.1f} ms\n")
+            for title, samples in (("Self", selfSamples), ("Inclusive", inclusiveSamples)):
+                summaryFile.write(f"\nTop {self.topCount} functions by {title.lower()} samples:\n")
+                summaryFile.write(f"{title:>10} {'%':>7}  Function\n")
+                for function, count in samples.most_common(self.topCount):
+                    summaryFile.write(f"{count:>10} {count / total:>7.1%}  {function}\n")
+        return (collapsedPath, summaryPath)
+
+    def getStatus(self) -> str:
+        return f"[Profiling: {self.sampleCount} samples]"
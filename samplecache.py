@@ -0,0 +1,124 @@
+"""
+[PyWaveCLI Module]
+samplecache.py -- Caches of already evaluated samples for waves whose variables don't change between frames.
+Author: FrickTown (https://github.com/FrickTown/)
+"""
+from __future__ import annotations
+import numpy
+
+MEMORY_CAP = 4 * 1024 * 1024 # Default maximum size, in bytes, of the samples cached for a single wave
+
+class SampleBlock():
+    """A fixed-size run of samples at one level of a SamplePyramid, along with the absolute cell of each sample."""
+    __slots__ = ("ys", "cellKey", "absCols", "absRows", "lastUsed")
+
+    def __init__(self, ys: numpy.ndarray):
+        self.ys = ys
+        self.cellKey = None
+        self.absCols: numpy.ndarray = None
+        self.absRows: numpy.ndarray = None
+        self.lastUsed = 0
+
+    def getSize(self) -> int:
+        return self.ys.nbytes + (self.absCols.nbytes + self.absRows.nbytes if self.absCols is not None else 0)
+
+
+class SamplePyramid():
+    """SamplePyramid caches the samples of a static wave in blocks on the grid x = k * 2^-level of every ppcMagnitude it was drawn at.
+    The grid of a level is a subset of the grid of any level an integer higher, so samples are shared between levels."""
+    blockSize: int = 256          # Grid positions per block, so panning only evaluates the blocks that scroll into view
+    memoryCap: int = MEMORY_CAP   # Beyond this, the least recently used blocks are evicted, coarsest level first
+
+    def __init__(self):
+        self.key = None
+        self.levels: dict[float, dict[int, SampleBlock]] = {}
+        self.size = 0
+        self.tick = 0
+
+    def clear(self):
+        self.levels.clear()
+        self.size = 0
+
+    def fetch(self, key: tuple, cellKey: tuple, level: float, kStart: int, kStop: int, evaluate, toAbsoluteCells) -> tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]:
+        """Return the samples for the grid positions kStart (inclusive) to kStop (exclusive) of a level, evaluating only what isn't cached.
+
+        Args:
+            key (tuple): Identifies the function and variable values the samples were taken with
+            cellKey (tuple): Identifies the cell size the absolute cells were computed with
+            level (float): The ppcMagnitude of the samples, i.e. x = k * 2^-level
+            kStart (int): The first grid position
+            kStop (int): The grid position after the last
+            evaluate (callable): Maps an array of x values to an array of y values (samples along the last axis)
+            toAbsoluteCells (callable): Maps arrays of x and y values to arrays of absolute columns and rows
+
+        Returns:
+            tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]: The y values, absolute columns and absolute rows of the samples
+        """
+        if key != self.key:
+            self.clear()
+            self.key = key
+        self.tick += 1
+        stepSize = 2.0 ** -level
+        blocks = self.levels.setdefault(level, {})
+        parts = []
+        for blockIdx in range(kStart // self.blockSize, (kStop - 1) // self.blockSize + 1):
+            block = blocks.get(blockIdx)
+            if block is None:
+                block = SampleBlock(self.fillBlock(level, blockIdx, stepSize, evaluate))
+                blocks[blockIdx] = block
+                self.size += block.getSize()
+            if block.cellKey != cellKey:
+                self.size -= block.getSize()
+                xs = (numpy.arange(self.blockSize) + blockIdx * self.blockSize) * stepSize
+                block.absCols, block.absRows = toAbsoluteCells(xs, block.ys)
+                block.cellKey = cellKey
+                self.size += block.getSize()
+            block.lastUsed = self.tick
+            start = max(kStart - blockIdx * self.blockSize, 0)
+            stop = min(kStop - blockIdx * self.blockSize, self.blockSize)
+            parts.append((block.ys[..., start:stop], block.absCols[..., start:stop], block.absRows[..., start:stop]))
+        self.evict()
+        return tuple(numpy.concatenate([part[idx] for part in parts], axis=-1) for idx in range(3))
+
+    def fillBlock(self, level: float, blockIdx: int, stepSize: float, evaluate) -> numpy.ndarray:
+        """Create the samples of a block, copying every position that another level already knows and evaluating the rest."""
+        ks = numpy.arange(self.blockSize) + blockIdx * self.blockSize
+        known = numpy.zeros(self.blockSize, dtype=bool)
+        ys = None
+        for otherLevel, otherBlocks in self.levels.items():
+            shift = level - otherLevel
+            if shift == 0 or not float(shift).is_integer() or not otherBlocks:
+                continue
+            # Position k of this level is position k * 2^-shift of the other level, if that is a whole number
+            scale = 2.0 ** -shift
+            otherKs = ks * scale
+            candidates = ~known & (otherKs == numpy.floor(otherKs))
+            if not candidates.any():
+                continue
+            otherKs = otherKs.astype(int)
+            for otherBlockIdx in numpy.unique(otherKs[candidates] // self.blockSize).tolist():
+                otherBlock = otherBlocks.get(otherBlockIdx)
+                if otherBlock is None:
+                    continue
+                matches = candidates & (otherKs // self.blockSize == otherBlockIdx)
+                values = otherBlock.ys[..., otherKs[matches] - otherBlockIdx * self.blockSize]
+                if ys is None:
+                    ys = numpy.empty(values.shape[:-1] + (self.blockSize,))
+                ys[..., matches] = values
+                known |= matches
+                otherBlock.lastUsed = self.tick
+        if ys is None:
+            return numpy.array(evaluate(ks * stepSize))
+        if not known.all():
+            ys[..., ~known] = evaluate(ks[~known] * stepSize)
+        return ys
+
+    def evict(self):
+        """Drop the least recently used blocks, coarsest level first, until the pyramid fits within memoryCap."""
+        if self.size <= self.memoryCap:
+            return
+        candidates = sorted(((block.lastUsed, level, blockIdx) for level, blocks in self.levels.items() for blockIdx, block in blocks.items()))
+        for lastUsed, level, blockIdx in candidates:
+            if self.size <= self.memoryCap or lastUsed == self.tick:
+                break
+            self.size -= self.levels[level].pop(blockIdx).getSize()
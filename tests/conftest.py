@@ -0,0 +1,38 @@
+import io
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+
+@pytest.fixture
+def terminal():
+    """A terminal rendering into memory, holding one empty 80x23 graphspace."""
+    term = main.TerminalSpace(kind="xterm-256color", stream=io.StringIO(), force_styling=True)
+    term.addGraphspace(main.Graphspace(term, 80, 23, 15, 10, 2))
+    return term
+
+@pytest.fixture
+def graphspace(terminal):
+    return terminal.graphspaces[0]
+
+@pytest.fixture
+def addWave(graphspace):
+    """Add an animated wave to the graphspace, amp * math.sin(x + shift) by default."""
+    def add(func: str = "amp * math.sin(x + shift)", variables: dict = None) -> main.Wave:
+        wave = main.Wave(func, graphspace.parentTerminal.normal, variables or {"amp": {"value": 2, "incr": 0}, "shift": {"value": 0, "incr": 0.1}})
+        graphspace.addWave(wave)
+        return wave
+    return add
+
+
+class FakeWave():
+    """Stands in for a Wave where only its identity, visibility and sampling density matter."""
+    visible = True
+    ppcMagnitude = None
+
+@pytest.fixture
+def fakeWave():
+    return FakeWave
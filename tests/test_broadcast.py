@@ -0,0 +1,66 @@
+import random
+import re
+from broadcast import RESET, BroadcastServer, ViewerClient, encodeDelta, encodeKeyframe
+
+POSITION_PATTERN = re.compile(r"\x1b\[(\d+);1H")
+
+def replay(screen: dict[int, str], data: bytes) -> dict[int, str]:
+    """Apply what a viewer received to a screen of rows, as a terminal that draws whole rows would."""
+    text = data.decode()
+    if "\x1b[2J" in text:
+        screen = {}
+    parts = POSITION_PATTERN.split(text)
+    for row, content in zip(parts[1::2], parts[2::2]):
+        screen[int(row) - 1] = content.replace(RESET, "")
+    return screen
+
+def receive(client: ViewerClient) -> bytes:
+    data = b"".join(bytes(message) for message in client.pending)
+    client.pending.clear()
+    client.pendingBytes = 0
+    return data
+
+def createFrame(generator: random.Random, previous: list[str] = None, height: int = 6) -> list[str]:
+    """A frame of colored rows, changing about a third of the previous frame's rows."""
+    if previous and len(previous) == height:
+        return [f"\x1b[3{generator.randrange(8)}m{generator.random():.6f}" if generator.random() < 0.3 else row for row in previous]
+    return [f"\x1b[3{generator.randrange(8)}m{generator.random():.6f}" for _ in range(height)]
+
+def test_deltas_only_contain_changed_rows():
+    assert encodeDelta(["a", "b"], ["a", "b"]) == b""
+    assert encodeDelta(["a", "b", "c"], ["a", "x", "c"]) == ("\x1b[2;1H" + RESET + "x" + RESET).encode()
+    assert encodeKeyframe(["a"]) == (RESET + "\x1b[H\x1b[2J\x1b[1;1Ha" + RESET).encode()
+
+def test_viewers_see_every_frame():
+    generator = random.Random(3)
+    server = BroadcastServer("/nonexistent")
+    server.keyframeInterval = 7
+    server.clients.append(ViewerClient(None))
+    screens = [{}]
+    frame = None
+    for frameIdx in range(40):
+        frame = createFrame(generator, frame, height=6 if frameIdx < 20 else 9)
+        if frameIdx == 12:
+            server.clients.append(ViewerClient(None)) # Joins late, so starts with a keyframe
+            screens.append({})
+        server.publish(frame)
+        for clientIdx, client in enumerate(server.clients):
+            screens[clientIdx] = replay(screens[clientIdx], receive(client))
+            assert screens[clientIdx] == dict(enumerate(frame))
+
+def test_viewers_that_fall_behind_skip_to_a_keyframe():
+    generator = random.Random(5)
+    server = BroadcastServer("/nonexistent")
+    server.maxPendingBytes = 400 # Room for about two keyframes
+    client = ViewerClient(None)
+    server.clients.append(client)
+    frame = createFrame(generator)
+    server.publish(frame)
+    while not client.needsKeyframe:
+        frame = createFrame(generator, frame)
+        server.publish(frame)
+    assert len(client.pending) == 1 # Only the partially sent frame is kept
+    frame = createFrame(generator, frame)
+    server.publish(frame)
+    assert client.pending[-1].tobytes() == encodeKeyframe(frame)
+    assert replay({}, receive(client)) == dict(enumerate(frame))
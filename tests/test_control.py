@@ -0,0 +1,85 @@
+import json
+import math
+import os
+import socket
+import stat
+import time
+from control import ControlServer
+
+def test_batches_are_applied_and_answered_over_the_socket(tmp_path, terminal, addWave):
+    wave = addWave()
+    server = ControlServer(str(tmp_path / "control.sock"), terminal)
+    server.start()
+    try:
+        assert stat.S_IMODE(os.stat(server.path).st_mode) == 0o600 # Only the user running the session may connect
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.connect(server.path)
+            client.sendall(b'{"cmd": "set", "wave": 0, "var": "amp", "value": 5}\n{"cmd": "nope"}\n')
+            client.setblocking(False)
+            replies = b""
+            deadline = time.perf_counter() + 5
+            while replies.count(b"\n") < 2 and time.perf_counter() < deadline:
+                server.applyPending()
+                try:
+                    replies += client.recv(4096)
+                except BlockingIOError:
+                    time.sleep(0.01)
+        assert [json.loads(line)["ok"] for line in replies.splitlines()] == [True, False]
+        assert wave.customVars["amp"]["value"] == 5
+    finally:
+        server.stop()
+
+class RecordingClient():
+    """Stands in for a ControlClient, keeping the replies instead of sending them."""
+    def __init__(self):
+        self.replies = []
+
+    def reply(self, reply: dict):
+        self.replies.append(reply)
+
+def applyBatches(server: ControlServer, batches: list) -> list[dict]:
+    client = RecordingClient()
+    server.batches = [(client, batch if isinstance(batch, list) else [batch], None) for batch in batches] # As receive parses them
+    server.applyPending()
+    return client.replies
+
+def test_invalid_commands_reject_their_whole_batch(terminal, graphspace, addWave):
+    wave = addWave()
+    server = ControlServer("/nonexistent", terminal)
+    invalid = [
+        "set",
+        {"cmd": "set", "wave": 1, "var": "amp", "value": 1},
+        {"cmd": "set", "wave": True, "var": "amp", "value": 1},
+        {"cmd": "set", "wave": 0, "var": "nope", "value": 1},
+        {"cmd": "set", "wave": 0, "var": "amp", "value": "1"},
+        {"cmd": "set", "wave": 0, "var": "amp", "incr": False},
+        {"cmd": "func", "wave": 0, "func": 5},
+        {"cmd": "func", "wave": 0, "func": "math.sin("},
+        {"cmd": "func", "wave": 0, "func": "nope(x)"},
+        {"cmd": "zoom", "xRange": 0},
+        {"cmd": "zoom", "yRange": "10"},
+        {"cmd": "spin"},
+    ]
+    replies = applyBatches(server, [[{"cmd": "set", "wave": 0, "var": "amp", "value": 7}, command] for command in invalid])
+    assert all(not reply["ok"] and reply["error"] for reply in replies) and len(replies) == len(invalid)
+    assert wave.customVars["amp"]["value"] == 2 and wave.func == "amp * math.sin(x + shift)" and graphspace.xRange == 15
+
+def test_batches_coalesce_to_applying_them_in_order(terminal, graphspace, addWave):
+    waves = [addWave(), addWave()]
+    server = ControlServer("/nonexistent", terminal)
+    compiled = []
+    compileFunction = waves[0].compileFunction
+    waves[0].compileFunction = lambda func: compiled.append(func) or compileFunction(func)
+    replies = applyBatches(server, [
+        [{"cmd": "set", "wave": 0, "var": "amp", "value": 3, "incr": 0.5}, {"cmd": "visible", "wave": 1}],
+        {"cmd": "func", "wave": 0, "func": "amp * math.cos(x)"},
+        [{"cmd": "set", "wave": 0, "var": "amp", "value": 4}, {"cmd": "visible", "wave": 1}, {"cmd": "visible", "wave": 1}],
+        [{"cmd": "func", "wave": 0, "func": "amp * math.cos(x)"}, {"cmd": "zoom", "xRange": 20, "yRange": 5}],
+        [{"cmd": "zoom", "xRange": 30}, {"cmd": "nope"}], # Rejected, so its zoom isn't applied
+    ])
+    assert [reply["ok"] for reply in replies] == [True, True, True, True, False]
+    assert compiled == ["amp * math.cos(x)"] # Compiled once for both batches
+    assert waves[0].func == "amp * math.cos(x)" and waves[0].asFunction(1.0, 4.0, 0.0) == 4 * math.cos(1.0)
+    assert waves[0].customVars["amp"]["value"] == 4 and waves[0].customVars["amp"]["incr"] == 0.5
+    assert not waves[1].visible # Toggled three times
+    assert (graphspace.xRange, graphspace.yRange) == (20, 5)
@@ -0,0 +1,18 @@
+import os
+
+def test_exported_images_are_named_in_the_status_line(tmp_path, monkeypatch, terminal, graphspace, addWave):
+    addWave()
+    monkeypatch.chdir(tmp_path)
+    terminal.exportImage(graphspace, (64, 48))
+    path, = os.listdir(tmp_path)
+    assert path.startswith("pywavecli-") and path.endswith(".ppm")
+    with open(path, "rb") as image:
+        assert image.read().startswith(b"P6\n64 48\n255\n")
+    assert f"[Image written: {path}]" in terminal.getStatusText()
+
+def test_failed_exports_are_shown_in_the_status_line(tmp_path, monkeypatch, terminal, graphspace):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr("main.time.strftime", lambda format: "now")
+    os.mkdir("pywavecli-now.ppm") # In the way of the image
+    terminal.exportImage(graphspace, (64, 48))
+    assert "[Export failed: " in terminal.getStatusText()
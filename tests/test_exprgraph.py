@@ -0,0 +1,38 @@
+import numpy
+import exprgraph
+import main
+
+XS = numpy.linspace(-15, 15, 301)
+
+def createWave(func, variables):
+    return main.Wave(func, "", {name: {"value": value, "incr": 0} for name, value in variables.items()})
+
+def test_graph_matches_evaluating_each_wave():
+    waves = [createWave("amp * math.sin(x * freq + shift)", {"amp": 3, "freq": 1, "shift": 0.5}),
+             createWave("math.sin(x + shift) * -amp + x ** 2 / 4", {"shift": 0.5, "amp": 2}),
+             createWave("abs(math.tan(x + shift)) % 3 - math.pi", {"shift": 0.25})]
+    graph = exprgraph.EvaluationGraph()
+    assert all(graph.addWave(wave) for wave in waves)
+    for wave, ys in zip(waves, graph.evaluate(XS)):
+        numpy.testing.assert_array_equal(ys, wave.getYs(XS))
+
+def test_shared_subterms_are_evaluated_once():
+    graph = exprgraph.EvaluationGraph()
+    graph.addWave(createWave("a * math.sin(x + shift)", {"a": 1, "shift": 0.5}))
+    graph.addWave(createWave("math.sin(offset + x) * b", {"offset": 0.5, "b": 2})) # Same phase under another name, operands swapped
+    # x + shift and math.sin of it are shared, the products differ in their constant
+    assert graph.getSavedEvaluations(len(XS)) == 2 * len(XS)
+
+def test_constant_waves_are_broadcast():
+    graph = exprgraph.EvaluationGraph()
+    graph.addWave(createWave("amp * math.cos(shift)", {"amp": 2, "shift": 0}))
+    ys, = graph.evaluate(XS)
+    assert ys.shape == XS.shape and (ys == 2).all()
+    assert graph.getSavedEvaluations(len(XS)) == 0
+
+def test_unsupported_waves_leave_the_graph_unchanged():
+    graph = exprgraph.EvaluationGraph()
+    graph.addWave(createWave("math.sin(x)", {}))
+    nodeCount = len(graph.operations)
+    assert not graph.addWave(createWave("math.sin(x) if x > 0 else 0", {}))
+    assert len(graph.operations) == nodeCount and len(graph.roots) == 1
@@ -0,0 +1,36 @@
+import math
+import numpy
+import main
+
+def createFieldWave(graphspace) -> main.FieldWave:
+    wave = main.FieldWave("math.sin(x * freq) + y * y / 3", [graphspace.parentTerminal.normal], {"freq": {"value": 1.5, "incr": 0}})
+    graphspace.addWave(wave)
+    wave.tileWidth, wave.tileHeight = 8, 4
+    return wave
+
+def evaluateEachCell(dx, dy, xOffset, yOffset, colStart, rowStart, colCount, rowCount, freq=1.5) -> numpy.ndarray:
+    return numpy.array([[math.sin((col * dx + xOffset) * freq) + (row * dy + yOffset) ** 2 / 3
+                         for col in range(colStart, colStart + colCount)] for row in range(rowStart, rowStart + rowCount)])
+
+def test_stitched_tiles_match_evaluating_each_cell(graphspace):
+    wave = createFieldWave(graphspace)
+    for window in ((0, 0, 8, 4), (-13, -6, 21, 11), (5, 3, 1, 1), (-8, -4, 16, 8), (3, -1, 30, 2)):
+        grid = wave.evaluateGrid(0.25, 0.5, 0.1, -0.2, *window)
+        assert grid.shape == (window[3], window[2])
+        numpy.testing.assert_allclose(grid, evaluateEachCell(0.25, 0.5, 0.1, -0.2, *window), rtol=1e-12, atol=1e-12)
+
+def test_panning_keeps_the_shared_tiles(graphspace):
+    wave = createFieldWave(graphspace)
+    wave.evaluateGrid(0.25, 0.5, 0, 0, 0, 0, 16, 8)
+    shared = wave.tileCache[(0, 1)]
+    grid = wave.evaluateGrid(0.25, 0.5, 0, 0, 8, 0, 16, 8)
+    assert wave.tileCache[(0, 1)] is shared
+    assert (0, 0) not in wave.tileCache # Scrolled out of the window
+    numpy.testing.assert_allclose(grid, evaluateEachCell(0.25, 0.5, 0, 0, 8, 0, 16, 8), rtol=1e-12, atol=1e-12)
+
+def test_changed_variables_discard_the_tiles(graphspace):
+    wave = createFieldWave(graphspace)
+    wave.evaluateGrid(0.25, 0.5, 0, 0, 0, 0, 16, 8)
+    wave.customVars["freq"]["value"] = 2.0
+    grid = wave.evaluateGrid(0.25, 0.5, 0, 0, 0, 0, 16, 8)
+    numpy.testing.assert_allclose(grid, evaluateEachCell(0.25, 0.5, 0, 0, 0, 0, 16, 8, freq=2.0), rtol=1e-12, atol=1e-12)
@@ -0,0 +1,47 @@
+import math
+from framecache import FrameCache, getPhaseVariables
+
+def test_phase_variables():
+    assert getPhaseVariables("math.sin(x + shift)", ("shift",)) == (True,)
+    assert getPhaseVariables("amp * math.cos(2 * shift - x)", ("amp", "shift")) == (False, True)
+    assert getPhaseVariables("math.sin(x + math.sin(shift))", ("shift",)) == (True,)
+    assert getPhaseVariables("x * x / amp - shift", ("amp", "shift")) == (False, False)
+    assert getPhaseVariables("math.sin(x * shift)", ("shift",)) == (False,)
+    assert getPhaseVariables("math.sin(shift / 2)", ("shift",)) == (False,)
+    assert getPhaseVariables("math.sin(x + shift) + shift", ("shift",)) == (False,)
+    assert getPhaseVariables("math.sin(", ("shift",)) == (False,)
+
+def test_phase_states_repeat_modulo_tau(terminal, addWave):
+    wave = addWave("math.sin(x + shift)", {"shift": {"value": 0, "incr": math.pi / 2}})
+    cache = FrameCache()
+    key = cache.getStateKey(terminal)
+    wave.customVars["shift"]["value"] = 2 * math.pi
+    assert cache.getStateKey(terminal) == key
+
+def test_non_periodic_states_dont_repeat(terminal, addWave):
+    wave = addWave("x * x - shift", {"shift": {"value": 0, "incr": math.pi / 2}})
+    cache = FrameCache()
+    key = cache.getStateKey(terminal)
+    wave.customVars["shift"]["value"] = 2 * math.pi
+    assert cache.getStateKey(terminal) != key
+
+def test_frames_are_replayed_once_verified_and_verified_again():
+    cache = FrameCache()
+    cache.verifyInterval = 3
+    cache.store(b"a", ["x"], ["row"])
+    assert cache.get(b"a") is None
+    cache.store(b"a", ["x"], ["row"])
+    assert cache.get(b"a").rows == ["row"]
+    assert cache.get(b"a") is not None
+    assert cache.get(b"a") is None # The third hit is rendered again
+    cache.store(b"a", ["x"], ["row"])
+    assert cache.get(b"a") is not None
+
+def test_mismatches_replace_frames_until_too_many():
+    cache = FrameCache()
+    cache.store(b"a", ["x"], ["old"])
+    cache.store(b"a", ["x"], ["new"])
+    assert cache.enabled and cache.frames[b"a"].rows == ["new"]
+    for rows in range(cache.maxMismatches - 1):
+        cache.store(b"a", ["x"], [str(rows)])
+    assert not cache.enabled and not cache.frames
@@ -0,0 +1,62 @@
+from governor import OutputGovernor, QualityGovernor
+
+def simulate(governor: QualityGovernor, waves: list, baseline: float, frames: int, costPerSample: float = 1e-6) -> list[list[float]]:
+    """Run the governor on waves whose cost doubles with every level, returning the levels of every frame."""
+    history = []
+    for _ in range(frames):
+        for wave in waves:
+            governor.measure(wave, costPerSample * 100 * 2 ** (wave.ppcMagnitude if wave.ppcMagnitude is not None else baseline), [0.0, 2.0, 4.0], 1, 40)
+        governor.adjust(waves, baseline)
+        history.append([wave.ppcMagnitude for wave in waves])
+    return history
+
+def test_levels_stay_whole_steps_from_a_fractional_baseline(fakeWave):
+    waves = [fakeWave() for _ in range(3)]
+    history = simulate(QualityGovernor(0.002), waves, 4.3, 300)
+    assert all(float(level - 4.3).is_integer() for levels in history for level in levels)
+
+def test_levels_settle_at_the_budget_boundary(fakeWave):
+    waves = [fakeWave() for _ in range(3)]
+    history = simulate(QualityGovernor(0.003), waves, 6.5, 400)
+    assert history[-1] != [6.5] * 3 # The budget can't afford the baseline
+    assert all(levels == history[-1] for levels in history[-100:])
+
+def test_baseline_changes_keep_the_offset(fakeWave):
+    wave = fakeWave()
+    wave.ppcMagnitude = 2.5
+    QualityGovernor(1).adjust([wave], 4.0)
+    assert wave.ppcMagnitude in (2.0, 3.0)
+
+def test_status_comes_before_the_key_bindings_on_narrow_terminals(terminal, graphspace):
+    terminal.governor = OutputGovernor(terminal, 100000, 90)
+    graphspace.toggleAutoPPC()
+    terminal.render()
+    statusRow = terminal.strip_seqs(terminal.stream.getvalue().split("\n")[0])
+    assert "[Out: " in statusRow and "[Auto PPC: " in statusRow # Within the 80 columns of the fixture's terminal
+
+def recordWindows(governor: OutputGovernor, monkeypatch, windows: list[tuple[int, float]]) -> list[int]:
+    """Write one frame per window with the given (bytes, blocking time), on a fake clock, returning the level after each."""
+    clock = [0.0]
+    monkeypatch.setattr("governor.time.perf_counter", lambda: clock[0])
+    governor.windowStart = 0.0
+    levels = []
+    for byteCount, blockingTime in windows:
+        clock[0] += governor.windowLength / 2
+        governor.recordWrite(byteCount, blockingTime) # Half a window: measured, but not decided on yet
+        assert governor.level == (levels[-1] if levels else 0)
+        clock[0] += governor.windowLength / 2
+        governor.recordWrite(0, 0.0)
+        levels.append(governor.level)
+    return levels
+
+def test_output_steps_down_over_budget_and_back_up_after_calm_windows(terminal, monkeypatch):
+    governor = OutputGovernor(terminal, 1000, 60)
+    over, calm, near = (2000, 0.0), (100, 0.0), (800, 0.0)
+    levels = recordWindows(governor, monkeypatch, [over] * 6 + [calm, calm, near, calm, calm, calm])
+    assert levels == [1, 2, 3, 4, 4, 4, 4, 4, 4, 4, 4, 3] # The near window restarts the count of calm windows
+    assert governor.bytesPerSecond == 100
+    assert governor.frameInterval() == governor.LEVELS[3][2] / 60
+
+def test_output_steps_down_when_blocked(terminal, monkeypatch):
+    governor = OutputGovernor(terminal, 1000, 60)
+    assert recordWindows(governor, monkeypatch, [(100, governor.maxBlocking * 1.1), (100, 0.0)]) == [1, 1]
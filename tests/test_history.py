@@ -0,0 +1,80 @@
+import params
+
+def test_undo_and_redo_a_function_edit(graphspace, addWave):
+    wave = addWave()
+    with graphspace.history.edit([wave]):
+        wave.tryUpdateWaveFunction("amp * math.cos(x)", {})
+    assert graphspace.history.undo()
+    assert wave.func == "amp * math.sin(x + shift)"
+    assert graphspace.history.redo()
+    assert wave.func == "amp * math.cos(x)"
+
+def test_edits_without_changes_are_not_recorded(graphspace, addWave):
+    wave = addWave()
+    with graphspace.history.edit([wave]):
+        pass
+    assert not graphspace.history.undo()
+
+def test_undo_keeps_animated_values_the_edit_didnt_change(graphspace, addWave):
+    wave = addWave()
+    with graphspace.history.edit([wave]):
+        wave.termColor = "red"
+    wave.customVars["shift"]["value"] = 5.0 # The animation moved on
+    graphspace.history.undo()
+    assert wave.termColor == graphspace.parentTerminal.normal
+    assert wave.customVars["shift"]["value"] == 5.0
+
+def test_viewport_changes_close_together_coalesce(graphspace):
+    xRange = graphspace.xRange
+    graphspace.alterScale("x", 1)
+    graphspace.alterScale("x", 1)
+    graphspace.history.undo()
+    assert graphspace.xRange == xRange
+    assert not graphspace.history.undo()
+
+def test_nested_edits_are_recorded_as_one(graphspace, addWave):
+    wave = addWave()
+    with graphspace.history.edit([wave], viewport=True):
+        wave.visible = False
+        graphspace.alterScale("x", 3)
+    assert len(graphspace.history.undoStack) == 1
+    graphspace.history.undo()
+    assert wave.visible and graphspace.xRange == 15
+
+def test_removed_variable_slots_are_kept_while_undoable(graphspace, addWave):
+    store = params.ParameterStore()
+    wave = addWave()
+    wave.customVars = params.VariablesView({"amp": {"value": 2, "incr": 0}}, store)
+    slot = wave.customVars.names["amp"]
+    with graphspace.history.edit([wave]):
+        wave.customVars.remove("amp")
+    assert slot not in store.freeSlots
+    graphspace.history.undo()
+    assert wave.customVars.names == {"amp": slot}
+    assert wave.customVars["amp"]["value"] == 2
+
+def test_undone_additions_are_released_once_they_cant_be_redone(graphspace, addWave):
+    store = params.ParameterStore()
+    wave = addWave()
+    wave.customVars = params.VariablesView({}, store)
+    for _ in range(20):
+        with graphspace.history.edit([wave]):
+            wave.customVars.add("freq", 1, 0)
+        graphspace.history.undo()
+    assert store.size - len(store.freeSlots) <= 1 # Only the slot the redo stack can still bring back
+
+def test_control_batches_leave_the_users_edits_undoable(terminal, graphspace, addWave):
+    from control import ControlServer
+    wave = addWave()
+    with graphspace.history.edit([wave]):
+        wave.termColor = "red"
+    server = ControlServer("/nonexistent", terminal)
+    for batch in range(graphspace.history.maxEdits + 1):
+        plan = {}
+        server.planCommand(graphspace, {"cmd": "set", "wave": 0, "var": "amp", "value": batch}, plan, plan, {})
+        server.planCommand(graphspace, {"cmd": "zoom", "xRange": 16 + batch % 2}, plan, plan, {})
+        server.applyPlan(graphspace, plan, {})
+    assert len(graphspace.history.undoStack) == 1
+    graphspace.history.undo()
+    assert wave.termColor == graphspace.parentTerminal.normal
+    assert wave.customVars["amp"]["value"] == graphspace.history.maxEdits and graphspace.xRange == 16
@@ -0,0 +1,62 @@
+import pytest
+from governor import QualityGovernor
+from lookahead import LookaheadQueue
+
+def fillQueue(queue):
+    """Let the queue produce frames in the background until it is full."""
+    queue.start()
+    with queue.condition:
+        queue.condition.wait_for(lambda: len(queue.frames) == queue.depth and not queue.producing)
+    queue.pause()
+
+def test_discard_rewinds_values(terminal, addWave):
+    wave = addWave()
+    queue = LookaheadQueue(terminal, 3)
+    fillQueue(queue)
+    assert abs(wave.customVars["shift"]["value"] - 0.3) < 1e-9
+    queue.pop()
+    queue.discard()
+    assert abs(wave.customVars["shift"]["value"] - 0.1) < 1e-9
+    assert queue.pop() is None
+    queue.stop()
+
+def test_pop_waits_for_the_frame_being_produced(terminal, addWave):
+    addWave()
+    queue = LookaheadQueue(terminal, 2)
+    queue.start()
+    assert queue.pop() is not None
+    queue.discard()
+    queue.stop()
+
+def test_errors_are_raised_on_the_popping_thread(terminal):
+    def failingFrame():
+        raise ZeroDivisionError()
+    terminal.produceFrame = failingFrame
+    queue = LookaheadQueue(terminal, 2)
+    queue.start()
+    with pytest.raises(ZeroDivisionError):
+        queue.pop()
+    queue.stop()
+
+def test_discard_rewinds_quality_governor(terminal, graphspace, addWave):
+    wave = addWave()
+    graphspace.qualityGovernor = QualityGovernor(0) # Every frame is over budget, so each adjustment lowers the wave
+    graphspace.qualityGovernor.holdFrames = graphspace.qualityGovernor.cooldownFrames = 0
+    terminal.render()
+    ppcMagnitude, costs = wave.ppcMagnitude, dict(graphspace.qualityGovernor.costs)
+    queue = LookaheadQueue(terminal, 2)
+    fillQueue(queue)
+    assert wave.ppcMagnitude < ppcMagnitude
+    queue.discard()
+    assert wave.ppcMagnitude == ppcMagnitude and graphspace.qualityGovernor.costs == costs
+    queue.stop()
+
+def test_discard_rewinds_trails(terminal, graphspace, addWave):
+    addWave()
+    graphspace.toggleTrails(8)
+    terminal.render()
+    queue = LookaheadQueue(terminal, 3)
+    fillQueue(queue)
+    queue.discard()
+    assert graphspace.trails.frame == 1
+    queue.stop()
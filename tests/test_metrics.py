@@ -0,0 +1,51 @@
+import re
+from metrics import METRIC_INFO, Metrics, formatLabels
+
+SAMPLE = re.compile(r"^([a-zA-Z_:][a-zA-Z0-9_:]*)(\{.*\})? \S+$")
+
+def parseFamilies(text: str) -> tuple[dict[str, str], list[str]]:
+    """Return the TYPE of every family, and the name of every sample."""
+    types = {}
+    names = []
+    for line in text.splitlines():
+        if line.startswith("# TYPE "):
+            _, _, name, metricType = line.split(" ")
+            types[name] = metricType
+        elif not line.startswith("#"):
+            names.append(SAMPLE.match(line).group(1))
+    return types, names
+
+def familyOf(name: str, types: dict[str, str]) -> str:
+    for suffix in ("", "_sum", "_count"):
+        if suffix and name.endswith(suffix) and types.get(name[:-len(suffix)]) == "summary":
+            return name[:-len(suffix)]
+    return name
+
+def test_every_sample_belongs_to_a_typed_family():
+    metrics = Metrics()
+    metrics.increment("pywavecli_tty_bytes_written", 100)
+    metrics.recordFrame(0.01, 1 / 90)
+    metrics.setGauge("pywavecli_trail_bytes", 4096)
+    metrics.observe("pywavecli_input_latency_seconds", 0.002, (("key", "+"),))
+    types, names = parseFamilies(metrics.format())
+    assert names
+    for name in names:
+        assert familyOf(name, types) in types, name
+
+def test_counters_are_typed_with_the_total_suffix():
+    types, _ = parseFamilies(Metrics().format())
+    for name, (metricType, _) in METRIC_INFO.items():
+        assert types[f"{name}_total" if metricType == "counter" else name] == metricType
+
+def test_counter_values_and_summary_quantiles():
+    metrics = Metrics()
+    metrics.increment("pywavecli_control_commands", 3)
+    for value in (1.0, 2.0, 3.0):
+        metrics.observe("pywavecli_input_latency_seconds", value, (("key", "a"),))
+    text = metrics.format()
+    assert "pywavecli_control_commands_total 3\n" in text
+    assert 'pywavecli_input_latency_seconds{key="a",quantile="0.5"} 2.000000' in text
+    assert 'pywavecli_input_latency_seconds_count{key="a"} 3' in text
+
+def test_label_values_are_escaped():
+    assert formatLabels((("wave", 'a"b\\c\nd'),)) == '{wave="a\\"b\\\\c\\nd"}'
@@ -0,0 +1,69 @@
+import numpy
+import params
+
+def test_released_slots_are_reused():
+    store = params.ParameterStore(capacity=2)
+    first = store.allocate(1.0, 0.1)
+    second = store.allocate(2.0, 0.2)
+    third = store.allocate(3.0, 0.3) # Grows the store
+    assert (first, second, third) == (0, 1, 2) and len(store.values) == 4
+    store.release([second])
+    assert store.allocate(4.0, 0.0) == second
+    assert store.values[second] == 4.0 and store.refs[second] == 1
+
+def test_retained_slots_are_not_reused_until_released():
+    store = params.ParameterStore()
+    slot = store.allocate(1.0, 0.1, active=True)
+    store.retain([slot])
+    store.release([slot])
+    assert slot not in store.freeSlots and store.active[slot]
+    store.release([slot])
+    assert slot in store.freeSlots and not store.active[slot] and store.incrs[slot] == 0
+
+def test_empty_view_has_slots():
+    view = params.VariablesView({}, params.ParameterStore())
+    assert len(view.slots) == 0
+    assert view.isStatic() and len(view.getValues()) == 0
+
+def test_add_remove_and_rename_keep_argument_order():
+    store = params.ParameterStore()
+    view = params.VariablesView({"a": {"value": 1, "incr": 0}, "b": {"value": 2, "incr": 0}, "c": {"value": 3, "incr": 0}}, store)
+    view.remove("b")
+    view.rename("a", "z")
+    view.add("d", 4, 0)
+    assert list(view) == ["z", "c", "d"]
+    assert list(view.getValues()) == [1, 3, 4]
+
+def test_step_only_advances_active_variables():
+    store = params.ParameterStore()
+    active = params.VariablesView({"shift": {"value": 0, "incr": 0.5}}, store)
+    inactive = params.VariablesView({"shift": {"value": 0, "incr": 0.5}}, store)
+    active.setActive(True)
+    store.step()
+    assert active["shift"]["value"] == 0.5 and inactive["shift"]["value"] == 0
+    assert not active.isStatic()
+
+def test_reset_restores_originals():
+    view = params.VariablesView({"amp": {"value": 2, "incr": 0.1}}, params.ParameterStore())
+    view.step()
+    view["amp"]["incr"] = 0
+    view.reset()
+    assert view.asDict() == {"amp": {"value": 2, "incr": 0.1}}
+
+def test_copy_uses_new_slots_with_the_same_originals():
+    view = params.VariablesView({"amp": {"value": 2, "incr": 0.1}}, params.ParameterStore())
+    view.step()
+    duplicate = view.copy()
+    assert not numpy.intersect1d(duplicate.slots, view.slots).size
+    assert duplicate.asDict() == view.asDict()
+    duplicate.reset()
+    assert duplicate["amp"]["value"] == 2
+
+def test_restore_releases_dropped_slots():
+    store = params.ParameterStore()
+    view = params.VariablesView({"amp": {"value": 2, "incr": 0}}, store)
+    names = dict(view.names)
+    view.add("shift", 0, 0.1)
+    shiftSlot = view.names["shift"]
+    view.restore(names)
+    assert list(view) == ["amp"] and shiftSlot in store.freeSlots
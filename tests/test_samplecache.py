@@ -0,0 +1,71 @@
+import numpy
+from samplecache import SamplePyramid
+
+class CountingFunction():
+    """y = sin(3x) + x / 7, remembering every x it was evaluated at."""
+    def __init__(self):
+        self.evaluated = []
+
+    def __call__(self, xs: numpy.ndarray) -> numpy.ndarray:
+        self.evaluated.extend(xs.tolist())
+        return numpy.sin(3 * xs) + xs / 7
+
+def toAbsoluteCells(xs, ys):
+    return numpy.floor(xs * 4).astype(int), numpy.floor(ys * 4).astype(int)
+
+def fetchAndCompare(pyramid, function, level, kStart, kStop, cellKey=(1,)):
+    """Fetch a range from the pyramid and compare it with evaluating every position directly."""
+    ys, absCols, absRows = pyramid.fetch(("f",), cellKey, level, kStart, kStop, function, toAbsoluteCells)
+    xs = numpy.arange(kStart, kStop) * 2.0 ** -level
+    expected = numpy.sin(3 * xs) + xs / 7
+    numpy.testing.assert_array_equal(ys, expected)
+    expectedCols, expectedRows = toAbsoluteCells(xs, expected)
+    numpy.testing.assert_array_equal(absCols, expectedCols)
+    numpy.testing.assert_array_equal(absRows, expectedRows)
+
+def test_fetches_match_direct_evaluation_across_blocks():
+    pyramid = SamplePyramid()
+    function = CountingFunction()
+    for kStart, kStop in ((-300, 10), (5, 700), (-1000, -999), (255, 257)):
+        fetchAndCompare(pyramid, function, 2, kStart, kStop)
+    assert len(function.evaluated) == len(set(function.evaluated)) # Each block was only evaluated once
+
+def test_panning_only_evaluates_the_blocks_that_scroll_into_view():
+    pyramid = SamplePyramid()
+    function = CountingFunction()
+    fetchAndCompare(pyramid, function, 0, 0, 512)
+    function.evaluated.clear()
+    fetchAndCompare(pyramid, function, 0, 100, 612)
+    assert len(function.evaluated) == pyramid.blockSize
+
+def test_finer_levels_reuse_the_samples_of_coarser_ones():
+    pyramid = SamplePyramid()
+    function = CountingFunction()
+    fetchAndCompare(pyramid, function, 0, 0, 256)
+    function.evaluated.clear()
+    fetchAndCompare(pyramid, function, 1, 0, 512)
+    assert len(function.evaluated) == 256 # Only the odd positions of level 1 are new
+    assert all(x % 1 == 0.5 for x in function.evaluated)
+    function.evaluated.clear()
+    fetchAndCompare(pyramid, function, -1, 0, 128) # Every other position of level 0
+    assert min(function.evaluated) == 256 # The block is filled beyond the fetched range, where level 0 is unknown
+
+def test_new_keys_and_cell_sizes_invalidate():
+    pyramid = SamplePyramid()
+    function = CountingFunction()
+    fetchAndCompare(pyramid, function, 0, 0, 256)
+    function.evaluated.clear()
+    fetchAndCompare(pyramid, function, 0, 0, 256, cellKey=(2,))
+    assert not function.evaluated # Only the absolute cells are computed again
+    pyramid.fetch(("g",), (2,), 0, 0, 256, function, toAbsoluteCells)
+    assert len(function.evaluated) == 256
+
+def test_least_recently_used_blocks_are_evicted_beyond_the_cap():
+    pyramid = SamplePyramid()
+    function = CountingFunction()
+    fetchAndCompare(pyramid, function, 0, 0, 256)
+    pyramid.memoryCap = pyramid.size * 2
+    fetchAndCompare(pyramid, function, 0, 256, 512)
+    fetchAndCompare(pyramid, function, 0, 512, 768)
+    assert sorted(pyramid.levels[0]) == [1, 2]
+    assert pyramid.size == sum(block.getSize() for block in pyramid.levels[0].values())
@@ -0,0 +1,71 @@
+import types
+import numpy
+import trails
+
+def createGraphspace(width=20, height=7, xPan=0):
+    return types.SimpleNamespace(xCellCount=width, yCellCount=height, xRange=15, yRange=10, xPan=xPan, yPan=0, waves=[])
+
+def recordFrames(persistence, graphspace, wave, frames):
+    for cellIds in frames:
+        persistence.begin(graphspace)
+        persistence.record(wave, numpy.array(cellIds, dtype=int))
+        persistence.end()
+
+def getExpectedCells(persistence, frames) -> dict[int, int]:
+    """The youngest bracket each cell was hit in, found by walking the frames from the newest to the oldest."""
+    expected = {}
+    for age, cellIds in enumerate(reversed(frames[-persistence.depth:]), start=1):
+        bracket = next(bracket for bracket, (start, stop) in enumerate(persistence.brackets) if start <= age < stop)
+        for cellId in cellIds:
+            expected.setdefault(cellId, bracket)
+    return expected
+
+def getCellBrackets(persistence, wave) -> dict[int, int]:
+    return {cellId: bracket for bracket, cellIds in persistence.getCells(wave) for cellId in cellIds.tolist()}
+
+def test_cells_are_shaded_by_their_youngest_bracket(fakeWave):
+    generator = numpy.random.default_rng(1)
+    graphspace = createGraphspace()
+    wave = fakeWave()
+    graphspace.waves.append(wave)
+    for depth in (1, 5, 16):
+        persistence = trails.PersistenceTrails(depth)
+        frames = []
+        for _ in range(40):
+            frames.append(sorted(set(generator.integers(0, 140, 6).tolist())))
+            recordFrames(persistence, graphspace, wave, frames[-1:])
+            assert getCellBrackets(persistence, wave) == getExpectedCells(persistence, frames)
+
+def test_rewind_forgets_later_frames(fakeWave):
+    graphspace = createGraphspace()
+    wave = fakeWave()
+    graphspace.waves.append(wave)
+    persistence = trails.PersistenceTrails(8)
+    frames = [[cellId] for cellId in range(12)]
+    recordFrames(persistence, graphspace, wave, frames)
+    persistence.rewind(9)
+    kept = frames[12 - 8:9] # Frames 0 to 3 were overwritten in the ring by the frames that were rewound
+    assert getCellBrackets(persistence, wave) == getExpectedCells(persistence, kept)
+    recordFrames(persistence, graphspace, wave, [[100]])
+    assert getCellBrackets(persistence, wave) == getExpectedCells(persistence, kept + [[100]])
+
+def test_viewport_changes_clear_trails(fakeWave):
+    graphspace = createGraphspace()
+    wave = fakeWave()
+    graphspace.waves.append(wave)
+    persistence = trails.PersistenceTrails(4)
+    recordFrames(persistence, graphspace, wave, [[1, 2], [3]])
+    graphspace.xPan = 1
+    persistence.begin(graphspace)
+    assert persistence.getCells(wave) == []
+
+def test_memory_usage_is_one_bit_per_cell_and_frame(fakeWave):
+    graphspace = createGraphspace(width=100, height=30)
+    waves = [fakeWave() for _ in range(3)]
+    graphspace.waves.extend(waves)
+    persistence = trails.PersistenceTrails(32)
+    persistence.begin(graphspace)
+    for wave in waves:
+        persistence.record(wave, numpy.array([0, 2999]))
+    persistence.end()
+    assert persistence.getMemoryUsage() == len(waves) * 32 * -(-3000 // 64) * 8
@@ -0,0 +1,32 @@
+import math
+import numpy
+import vecmath
+
+def compileBoth(body: str):
+    lambdafied = f"lambda x, amp: {body}"
+    return vecmath.compileVectorized(lambdafied), eval(lambdafied, {"math": math})
+
+def evaluateEachSample(scalarFunction, xs, args) -> numpy.ndarray:
+    def call(*callArgs):
+        try:
+            return float(scalarFunction(*callArgs))
+        except Exception:
+            return math.nan
+    with numpy.errstate(all="ignore"): # 1 / x is inf at 0, as in the vectorized function
+        return numpy.array([call(x, *(numpy.broadcast_to(arg, xs.shape)[idx] for arg in args)) for idx, x in enumerate(xs)])
+
+def test_vectorized_and_fallback_functions_match_direct_evaluation():
+    xs = numpy.linspace(-3, 3, 61)
+    for body in ("amp * math.sin(x)", "max(x, 0) * amp", "math.sqrt(x) * amp", "1 / x", "math.log(x, 2) if x > 1 else amp",
+                 "math.factorial(int(abs(x))) + amp", "math.atan2(x, amp)"):
+        vectorFunction, scalarFunction = compileBoth(body)
+        for args in ([2.0], [numpy.linspace(1, 2, 61)]):
+            ys = vecmath.evaluate(vectorFunction, scalarFunction, xs, args)
+            assert ys.shape == xs.shape
+            numpy.testing.assert_allclose(ys, evaluateEachSample(scalarFunction, xs, args), rtol=1e-12, equal_nan=True, err_msg=body)
+
+def test_fallback_broadcasts_scalar_arguments():
+    vectorFunction, scalarFunction = compileBoth("max(x, amp)")
+    xs = numpy.arange(6.0).reshape(2, 3)
+    ys = vecmath.evaluate(vectorFunction, scalarFunction, xs, [numpy.array([[1.5], [4.5]])])
+    numpy.testing.assert_array_equal(ys, [[1.5, 1.5, 2], [4.5, 4.5, 5]])
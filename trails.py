@@ -0,0 +1,113 @@
+"""
+[PyWaveCLI Module]
+trails.py -- Oscilloscope-style persistence, fading out the last frames of every wave behind the current one.
+Author: FrickTown (https://github.com/FrickTown/)
+"""
+from __future__ import annotations
+import numpy
+from metrics import METRICS
+
+TRAILSIGNS = "o•·." # A trail's shading, from the frames right behind the current one to the oldest
+
+class WaveTrail():
+    """The cells a single wave was plotted in during each of the last frames, as a ring of packed bitmasks (one bit per cell)."""
+    def __init__(self, depth: int, cellCount: int, frame: int):
+        self.words = numpy.zeros((depth, (cellCount + 63) // 64), dtype=numpy.uint64) # ORed together a word (64 cells) at a time
+        self.bits = self.words.view(numpy.uint8)
+        self.oldest = frame # The first frame number held in the ring. Frames before it were never recorded, or have been overwritten.
+
+
+class PersistenceTrails():
+    """PersistenceTrails keeps the plotted cells of the last frames of every wave in a graphspace, and draws them as fading trails.
+    Each cell is shaded by the youngest age bracket (one per sign in TRAILSIGNS) it was plotted in."""
+    def __init__(self, depth: int):
+        """Create a new PersistenceTrails.
+
+        Args:
+            depth (int): The number of frames, before the current one, that trails are kept for
+        """
+        self.depth = depth
+        self.frame = 0 # The number of the frame being rendered
+        self.trails: dict[object, WaveTrail] = {}
+        self.viewport: tuple = None
+        self.cellCount = 0
+        self.memoryUsage = 0
+        # The ages (in frames) of each bracket, as a range from the youngest to one past the oldest
+        bounds = [1 + depth * bracket // len(TRAILSIGNS) for bracket in range(len(TRAILSIGNS) + 1)]
+        self.brackets = [(start, stop) for start, stop in zip(bounds, bounds[1:]) if start < stop]
+
+    def begin(self, graphspace):
+        """Prepare for recording a new frame of a graphspace, dropping the trails of waves that are gone and all trails if the viewport changed."""
+        viewport = (graphspace.xCellCount, graphspace.yCellCount, graphspace.xRange, graphspace.yRange, graphspace.xPan, graphspace.yPan)
+        if viewport != self.viewport: # Trails are stored in viewport cells
+            self.viewport = viewport
+            self.cellCount = graphspace.xCellCount * graphspace.yCellCount
+            self.trails.clear()
+        visibleWaves = {wave for wave in graphspace.waves if wave.visible}
+        for wave in [wave for wave in self.trails if wave not in visibleWaves]:
+            del self.trails[wave]
+
+    def record(self, wave, cellIds: numpy.ndarray):
+        """Store the cells (as indices into the flattened viewport) that a wave is plotted in during the current frame."""
+        trail = self.trails.get(wave)
+        if trail is None:
+            trail = self.trails[wave] = WaveTrail(self.depth, self.cellCount, self.frame)
+        hit = numpy.zeros(len(trail.bits[0]) * 8, dtype=bool)
+        hit[cellIds] = True
+        trail.bits[self.frame % self.depth] = numpy.packbits(hit) # Overwrites the oldest frame in place
+
+    def end(self):
+        """Finish recording the current frame."""
+        self.frame += 1
+        self.memoryUsage = self.getMemoryUsage()
+        METRICS.setGauge("pywavecli_trail_bytes", self.memoryUsage)
+
+    def rewind(self, frame: int):
+        """Forget every frame recorded from the given frame number on, e.g. frames rendered ahead that were never shown."""
+        if frame >= self.frame:
+            return
+        for trail in self.trails.values():
+            trail.oldest = min(max(trail.oldest, self.frame - self.depth), frame)
+        self.frame = frame
+
+    def getCells(self, wave) -> list[tuple[int, numpy.ndarray]]:
+        """Return the cells a wave was plotted in during the earlier frames, grouped by the youngest bracket they were plotted in.
+
+        Returns:
+            list[tuple[int, numpy.ndarray]]: The index of each bracket (into TRAILSIGNS), with the indices of its cells in the flattened viewport
+        """
+        trail = self.trails.get(wave)
+        if trail is None:
+            return []
+        oldestAge = self.frame - max(trail.oldest, self.frame - self.depth)
+        claimed = numpy.zeros(trail.words.shape[1], dtype=numpy.uint64) # Cells already shaded by a younger bracket
+        cells = []
+        for bracket, (start, stop) in enumerate(self.brackets):
+            stop = min(stop, oldestAge + 1)
+            if start >= stop:
+                break
+            rows = (self.frame - numpy.arange(start, stop)) % self.depth
+            hits = numpy.bitwise_or.reduce(trail.words[rows], axis=0) & ~claimed
+            claimed |= hits
+            hitBytes = hits.view(numpy.uint8)
+            byteIds = numpy.flatnonzero(hitBytes) # Trails are sparse, only the bytes that aren't zero are unpacked
+            bits = numpy.unpackbits(hitBytes[byteIds, None], axis=1).astype(bool)
+            cells.append((bracket, (byteIds[:, None] * 8 + numpy.arange(8))[bits]))
+        return cells
+
+    def draw(self, graphspace):
+        """Print the trail of every recorded wave to a graphspace's buffer. Later waves are printed on top of earlier ones."""
+        normal = graphspace.parentTerminal.normal
+        width = graphspace.xCellCount
+        for wave in [wave for wave in graphspace.waves if wave in self.trails]:
+            for bracket, cellIds in self.getCells(wave):
+                sign = f"{wave.termColor}{TRAILSIGNS[bracket]}{normal}"
+                for cellId in cellIds.tolist():
+                    graphspace.buffer[cellId // width][cellId % width] = sign
+
+    def getMemoryUsage(self) -> int:
+        """The bytes taken up by the rings of every wave."""
+        return sum(trail.bits.nbytes for trail in self.trails.values())
+
+    def getStatus(self) -> str:
+        return f"[Trails: {self.depth} frames, {self.memoryUsage / 1024:.0f} KiB]" # As of the last frame, which may be produced on another thread
@@ -0,0 +1,142 @@
+"""
+[PyWaveCLI Module]
+unixsocket.py -- The plumbing shared by the servers that other processes connect to over a local UNIX socket.
+Author: FrickTown (https://github.com/FrickTown/)
+"""
+from __future__ import annotations
+import collections
+import os
+import selectors
+import socket
+import threading
+
+class SocketClient():
+    """The connection to one client, along with the bytes that haven't been sent to it yet."""
+    def __init__(self, connection: socket.socket):
+        self.connection = connection
+        self.pending: collections.deque[memoryview] = collections.deque()
+        self.pendingBytes = 0
+
+    def queue(self, message: bytes):
+        self.pending.append(memoryview(message))
+        self.pendingBytes += len(message)
+
+
+class UnixSocketServer():
+    """UnixSocketServer accepts clients on a UNIX socket and sends them their queued bytes from a background thread, without blocking.
+    Subclasses create their clients in createClient and handle what the clients send in receive."""
+    threadName: str = "UnixSocketServer"
+    socketMode: int = None # Permissions of the socket file, e.g. 0o600 to keep out other users. Defaults to the umask.
+
+    def __init__(self, path: str):
+        """Create a new UnixSocketServer.
+
+        Args:
+            path (str): The path of the UNIX socket to listen on
+        """
+        self.path = path
+        self.clients: list[SocketClient] = []
+        self.lock = threading.Lock() # Guards the clients, their queues and anything else shared with the background thread
+        self.running = threading.Event()
+        self.thread: threading.Thread = None
+        self.selector = selectors.DefaultSelector()
+        self.wakeReader, self.wakeWriter = socket.socketpair()
+        self.server: socket.socket = None
+
+    def start(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.server.bind(self.path)
+        if self.socketMode is not None:
+            os.chmod(self.path, self.socketMode)
+        self.server.listen()
+        self.server.setblocking(False)
+        self.wakeReader.setblocking(False)
+        self.wakeWriter.setblocking(False)
+        self.running.set()
+        self.thread = threading.Thread(target=self.serveLoop, name=self.threadName, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running.clear()
+        self.wake()
+        self.thread.join()
+        for client in self.clients:
+            client.connection.close()
+        self.server.close()
+        os.unlink(self.path)
+
+    def wake(self):
+        """Interrupt the background thread's wait, e.g. so that it starts sending newly queued bytes."""
+        try:
+            self.wakeWriter.send(b"\0")
+        except BlockingIOError:
+            pass # Already woken
+
+    def serveLoop(self):
+        self.selector.register(self.server, selectors.EVENT_READ, "accept")
+        self.selector.register(self.wakeReader, selectors.EVENT_READ, "wake")
+        while self.running.is_set():
+            with self.lock:
+                for client in self.clients:
+                    self.selector.modify(client.connection, selectors.EVENT_READ | (selectors.EVENT_WRITE if client.pending else 0), client)
+            for key, events in self.selector.select(timeout=1.0):
+                if key.data == "accept":
+                    self.accept()
+                elif key.data == "wake":
+                    try:
+                        while self.wakeReader.recv(4096): pass
+                    except BlockingIOError:
+                        pass
+                else:
+                    if events & selectors.EVENT_READ and not self.receive(key.data):
+                        continue
+                    if events & selectors.EVENT_WRITE:
+                        self.send(key.data)
+
+    def createClient(self, connection: socket.socket) -> SocketClient:
+        return SocketClient(connection)
+
+    def accept(self):
+        try:
+            connection, _ = self.server.accept()
+        except BlockingIOError:
+            return
+        connection.setblocking(False)
+        client = self.createClient(connection)
+        with self.lock:
+            self.clients.append(client)
+        self.selector.register(connection, selectors.EVENT_READ, client)
+
+    def disconnect(self, client: SocketClient):
+        with self.lock:
+            self.clients.remove(client)
+        self.selector.unregister(client.connection)
+        client.connection.close()
+
+    def receive(self, client: SocketClient) -> bool:
+        """Handle a client becoming readable. Returns False if the client was disconnected.
+        By default clients aren't expected to send anything, so readable means closed."""
+        self.disconnect(client)
+        return False
+
+    def send(self, client: SocketClient):
+        """Send as much of a client's queue as its socket accepts without blocking."""
+        with self.lock:
+            while client.pending:
+                message = client.pending[0]
+                try:
+                    sent = client.connection.send(message)
+                except BlockingIOError:
+                    return
+                except OSError:
+                    break
+                client.pendingBytes -= sent
+                if sent < len(message):
+                    client.pending[0] = message[sent:]
+                    return
+                client.pending.popleft()
+            else:
+                return
+        self.disconnect(client)
@@ -0,0 +1,72 @@
+"""
+[PyWaveCLI Module]
+vecmath.py -- A numpy-backed stand-in for the math module, allowing wave functions to be evaluated over whole arrays of x at once.
+Author: FrickTown (https://github.com/FrickTown/)
+"""
+from __future__ import annotations
+import math
+import numpy
+
+# math functions whose numpy counterpart goes by a different name
+ALIASES = {
+    "asin": "arcsin", "acos": "arccos", "atan": "arctan", "atan2": "arctan2",
+    "asinh": "arcsinh", "acosh": "arccosh", "atanh": "arctanh",
+    "fabs": "abs", "pow": "power",
+}
+
+def _log(x, base = None):
+    """math.log accepts an optional base, numpy.log does not."""
+    if base is None:
+        return numpy.log(x)
+    return numpy.log(x) / numpy.log(base)
+
+class VectorMath():
+    """Drop-in replacement for the math module inside wave function strings, resolving functions to their numpy equivalents.
+    Functions without one are wrapped with numpy.vectorize."""
+    def __getattr__(self, name: str):
+        if name == "log":
+            resolved = _log
+        elif callable(getattr(numpy, ALIASES.get(name, name), None)) and callable(getattr(math, name, None)):
+            resolved = getattr(numpy, ALIASES.get(name, name))
+        else:
+            resolved = getattr(math, name) # Raises AttributeError for names that math doesn't have either
+            if callable(resolved):
+                resolved = numpy.vectorize(resolved, otypes=[float])
+        setattr(self, name, resolved) # Cache the lookup, __getattr__ is only hit on the first access
+        return resolved
+
+VECTOR_MATH = VectorMath()
+
+def compileVectorized(lambdafied: str):
+    """Compile a lambda string so that any reference to math resolves to VECTOR_MATH."""
+    return eval(lambdafied, {"math": VECTOR_MATH, "numpy": numpy})
+
+def evaluate(vectorFunction, scalarFunction, xs: numpy.ndarray, args: list) -> numpy.ndarray:
+    """Evaluate a wave function over an array of x values (and possibly arrays of arguments).
+
+    The vectorized function is tried first. If the expression can't handle arrays (e.g. it uses a builtin like max),
+    the scalar function is called once per element instead. Samples that fail to evaluate become NaN.
+
+    Args:
+        vectorFunction: The lambda compiled with compileVectorized
+        scalarFunction: The lambda compiled against the regular math module
+        xs (numpy.ndarray): The x values to sample at
+        args (list): The custom variable values, scalars or arrays broadcastable against xs
+
+    Returns:
+        numpy.ndarray: The sampled y values, in the broadcast shape of xs and args
+    """
+    shape = numpy.broadcast_shapes(numpy.shape(xs), *[numpy.shape(a) for a in args])
+    with numpy.errstate(all="ignore"):
+        try:
+            ys = numpy.asarray(vectorFunction(xs, *args), dtype=float)
+            return numpy.broadcast_to(ys, shape)
+        except Exception:
+            pass
+
+        def safeCall(*callArgs):
+            try:
+                return float(scalarFunction(*callArgs))
+            except Exception:
+                return math.nan
+        return numpy.broadcast_to(numpy.vectorize(safeCall, otypes=[float])(xs, *args), shape)